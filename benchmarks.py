@@ -0,0 +1,226 @@
+# Benchmark suite for the hot paths: map generation, enemy creation, player power, rank odds and headless battles
+# Parametrized benchmarks are run at several sizes and print a scaling curve with its fitted exponent
+# Timings are divided by a fixed calibration loop, --save stores them and a later run fails if any benchmark got slower than the tolerance allows
+# The calibration only evens out load and clock speed between runs on one host, CPU and Python version still shift the ratios, so the check is relative to the host that recorded the baseline
+# The committed benchmarks_baseline.json is such a recording, regenerate it with --save on the machine the check runs on before relying on it
+# Run directly: python benchmarks.py [--save] [--check] [--tolerance 1.0] [--only name] [--quick], --check fails when there is no baseline to compare against
+
+import gc
+import io
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import contextlib
+import defs
+import objs
+import mapgen
+import gamelogic
+import eventbus
+import simulation
+import powerleveltesting
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+
+#-------------------------------------------------
+#BENCHMARKS
+#-------------------------------------------------
+
+# name -> (setup function returning the callable to time, sizes or None)
+benchmarks = {}
+
+def benchmark(name, sizes=None):
+    def register(setup):
+        benchmarks[name] = (setup, sizes)
+        return setup
+    return register
+
+@benchmark("map_generation", sizes=[(4, 10, 0.2), (8, 18, 0.5), (16, 36, 0.5), (32, 72, 0.8)])
+def map_generation(size):
+    width, height, density = size
+    def run():
+        random.seed(0)                                  # The same map every call, map sizes vary too much between seeds to compare
+        new_map = mapgen.Map(width, height, density)
+        new_map.generate_map()
+        new_map.assign_events()
+    return run
+
+@benchmark("create_enemy_vehicle")
+def create_enemy_vehicle(_):
+    battle = mapgen.Battle("Battle", {"starter": 1})
+    return battle.create_enemy_vehicle
+
+# Power level of inventories holding size random sample parts, read the same way as Game.update_player_power
+@benchmark("update_player_power", sizes=[10, 100, 1000, 10000])
+def update_player_power(size):
+    inventory = defs.Inventory()
+    for _ in range(size):
+        inventory.add(random.choice(powerleveltesting.sample_parts))
+    return lambda: inventory.power_tracker.power_level(gamelogic.RANK_CONFIG)
+
+# Adding and removing a part, what keeps update_player_power cheap, on inventories of growing size
+@benchmark("inventory_add_remove", sizes=[10, 100, 1000, 10000])
+def inventory_add_remove(size):
+    inventory = defs.Inventory()
+    for _ in range(size):
+        inventory.add(random.choice(powerleveltesting.sample_parts))
+    part = powerleveltesting.rare_engine
+    def run():
+        inventory.add(part)
+        inventory.remove(part)
+    return run
+
+@benchmark("rank_probabilities")
+def rank_probabilities(_):
+    table = gamelogic.RankOddsTable(gamelogic.RANK_CONFIG)
+    power_levels = [random.uniform(0, 80) for _ in range(100)]
+    def run():
+        for power_level in power_levels:
+            table.lookup(power_level)
+    return run
+
+@benchmark("calculate_rank_probabilities")
+def calculate_rank_probabilities(_):
+    power_levels = [random.uniform(0, 80) for _ in range(100)]
+    def run():
+        for power_level in power_levels:
+            gamelogic.calculate_rank_probabilities(power_level, gamelogic.RANK_CONFIG)
+    return run
+
+def starter_builds():
+    player = objs.Vehicle("Lada", "Player", [objs.lada, objs.bicycle, objs.mopedeng, objs.spikes, objs.smg, objs.harpoon])
+    enemy = objs.Vehicle("Tractor", "Enemy", [objs.tractor, objs.tractorwh, objs.steameng, objs.tractorshovel, objs.flamethrower])
+    return player, enemy
+
+@benchmark("headless_battle")
+def headless_battle(_):
+    player, enemy = starter_builds()
+    def run():
+        random.seed(0)
+        with eventbus.using(eventbus.NullSink()):
+            simulation.simulate_battle(player, enemy)
+    return run
+
+@benchmark("timed_battle")
+def timed_battle(_):
+    player, enemy = starter_builds()
+    auto_act = lambda player_vehicle, enemy_vehicle: defs.enemy_act(enemy_vehicle, player_vehicle)
+    def run():
+        random.seed(0)
+        with eventbus.using(eventbus.NullSink()):
+            defs.timed_battle(player.instantiate(), enemy.instantiate(), auto_act)
+    return run
+
+#-------------------------------------------------
+#RUNNER
+#-------------------------------------------------
+
+# Seconds per call, the best of several repeats of enough calls to take about min_time each, timed with the garbage collector off like timeit
+def measure(function, repeats=5, min_time=0.05):
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return best_time(function, repeats, min_time)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def best_time(function, repeats, min_time):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    best = elapsed / number
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+# Time of a fixed pure Python loop, benchmark timings are reported as multiples of it
+def calibrate():
+    def loop():
+        total = 0
+        for index in range(10000):
+            total += index * index % 7
+        return total
+    return measure(loop)
+
+def key(name, size):
+    return name if size is None else f"{name}[{size}]"
+
+# Runs the benchmarks (only those whose names contain only, if given), returns {key: normalized time}
+def run_benchmarks(only=None, quick=False, seed=0):
+    calibration = calibrate()
+    results = {}
+    for name, (setup, sizes) in benchmarks.items():
+        if only and only not in name:
+            continue
+        curve = []
+        for size in (sizes or [None]):
+            random.seed(seed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                function = setup(size)
+            seconds = measure(function, repeats=2 if quick else 5, min_time=0.01 if quick else 0.05)
+            results[key(name, size)] = seconds / calibration
+            curve.append((size, seconds))
+            print(f"{key(name, size):40} {seconds * 1e6:12.1f} us  {seconds / calibration:10.3f} x calibration")
+        if len(curve) > 1:
+            print(f"{'':40} scaling exponent {scaling_exponent(curve):.2f}")
+    return results
+
+# Slope of log time over log size between the smallest and largest size, map sizes given as (width, height, density) use the node count width * height
+def scaling_exponent(curve):
+    magnitude = lambda size: size[0] * size[1] if isinstance(size, tuple) else size
+    (first_size, first_time), (last_size, last_time) = curve[0], curve[-1]
+    return math.log(last_time / first_time) / math.log(magnitude(last_size) / magnitude(first_size))
+
+# Benchmarks slower than their baseline by more than the tolerance, as (key, baseline, current)
+def regressions(results, baseline, tolerance):
+    return [(name, baseline[name], value) for name, value in results.items() if name in baseline and value > baseline[name] * (1 + tolerance)]
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline for this host")
+    parser.add_argument("--check", action="store_true", help="fail if there is no baseline, instead of only running the benchmarks, the baseline has to come from this host")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed slowdown over the baseline, 1.0 is twice as slow")
+    parser.add_argument("--only", help="only run benchmarks whose name contains this")
+    parser.add_argument("--keep-best", action="store_true", help="with --save, keep the faster of the stored and new result")
+    parser.add_argument("--quick", action="store_true", help="fewer and shorter repeats")
+    options = parser.parse_args(arguments)
+
+    results = run_benchmarks(options.only, options.quick)
+    if options.save:
+        baseline = {}
+        with contextlib.suppress(FileNotFoundError):
+            with open(options.baseline) as file:
+                baseline = json.load(file)
+        baseline.update({name: min(value, baseline.get(name, value)) for name, value in results.items()} if options.keep_best else results)
+        with open(options.baseline, "w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {options.baseline}")
+        return 0
+    try:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f"No baseline at {options.baseline}, run with --save to create one")
+        return 1 if options.check else 0
+    slower = regressions(results, baseline, options.tolerance)
+    for name, before, after in slower:
+        print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} x calibration ({after / before - 1:+.0%})")
+    return 1 if slower else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# This file holds the build solver, which fills a chassis' slots from a pool of parts to maximize an objective within the chassis' tech points
+# Objectives that add up over parts (a stat, the power score or any per part score) are solved exactly with a knapsack DP per part type followed by one across types
+# Whole build objectives, like a simulated win rate, rerank a shortlist of the best builds by an additive objective
+
+import heapq
+import objs
+
+PART_TYPES = ("wheels", "engine", "bumper", "item_mount", "turret")
+
+# Rank weights of the power score, the same as Game's rank_config prob_multiplier values
+RANK_MULTIPLIERS = {"starter": 0.5, "common": 1.0, "uncommon": 1.5, "rare": 2.0, "epic": 3.0}
+
+# Objectives the player can pick from in vehicle_edit
+OBJECTIVES = ("power",) + tuple(stat for stat, _ in objs.Part.stat_fields)
+
+# Power score of a part, the per part term of PowerTracker.power_level
+def part_power(part, tech_point_multiplier=0.1):
+    return RANK_MULTIPLIERS[part.rank] + tech_point_multiplier * part.tech_points
+
+# Turns an objective (a vehicle stat name, "power" or a callable scoring a single part) into a part scoring function
+def part_scorer(objective):
+    if callable(objective):
+        return objective
+    if objective == "power":
+        return part_power
+    fields = dict(objs.Part.stat_fields)
+    if objective not in fields:
+        raise ValueError(f"Unknown build objective {objective!r}")
+    field_name = fields[objective]
+    return lambda part: getattr(part, field_name)
+
+# Keeps the best `limit` (score, parts) entries of several lists
+def best_entries(entries, limit):
+    if limit == 1:
+        return [max(entries, key=lambda entry: entry[0])] if entries else []
+    return heapq.nlargest(limit, entries, key=lambda entry: entry[0])
+
+class BuildSolver():
+    def __init__(self, parts, objective="power", shortlist=1):
+        self.score = part_scorer(objective)
+        self.shortlist = shortlist                  # Best builds kept per subproblem, more than one lets evaluate rerank them
+        self.parts = {part_type: [] for part_type in PART_TYPES}
+        for part in parts:
+            if part.type in self.parts:
+                self.parts[part.type].append(part)
+        self.type_tables = {}                       # (part type, slots, tech points) -> best parts per exact tech point cost
+        self.builds = {}                            # (slots, tech points) -> best builds per exact tech point cost
+
+    # Parts of a type worth considering: only parts scoring above zero, and at most `slots + shortlist - 1` of them per tech point cost
+    # A set using a part ranked lower than that within its cost is beaten by at least `shortlist` sets swapping it for a better unused one, so it could never make the shortlist
+    def candidates(self, part_type, slots, tech_points):
+        by_cost = {}
+        for part in self.parts[part_type]:
+            if part.tech_points <= tech_points:
+                score = self.score(part)
+                if score > 0:
+                    by_cost.setdefault(part.tech_points, []).append((score, part))
+        candidates = []
+        for group in by_cost.values():
+            candidates.extend(heapq.nlargest(slots + self.shortlist - 1, group, key=lambda entry: entry[0]))
+        return candidates
+
+    # Best sets of at most `slots` parts of one type for every exact tech point cost up to tech_points, as lists of (score, parts)
+    def type_table(self, part_type, slots, tech_points):
+        key = (part_type, slots, tech_points)
+        if key not in self.type_tables:
+            # table[count][cost] holds the best sets of exactly count parts costing exactly cost
+            table = [[[] for _ in range(tech_points + 1)] for _ in range(slots + 1)]
+            table[0][0] = [(0, ())]
+            for score, part in self.candidates(part_type, slots, tech_points):
+                cost = part.tech_points
+                for count in range(slots, 0, -1):
+                    for spent in range(tech_points, cost - 1, -1):
+                        previous = table[count - 1][spent - cost]
+                        if previous:
+                            extended = [(total + score, chosen + (part,)) for total, chosen in previous]
+                            table[count][spent] = best_entries(table[count][spent] + extended, self.shortlist)
+            self.type_tables[key] = [best_entries([entry for count in range(slots + 1) for entry in table[count][spent]], self.shortlist) for spent in range(tech_points + 1)]
+        return self.type_tables[key]
+
+    # Best builds for a chassis' slots and tech points, as (score, parts) sorted best first, the chassis itself is not included
+    def solve_slots(self, slots, tech_points):
+        key = (tuple(slots.items()), tech_points)
+        if key not in self.builds:
+            totals = [[] for _ in range(tech_points + 1)]
+            totals[0] = [(0, ())]
+            for part_type, amount in slots.items():
+                if amount <= 0 or part_type not in self.parts:
+                    continue
+                table = self.type_table(part_type, amount, tech_points)
+                combined = [[] for _ in range(tech_points + 1)]
+                for spent, builds in enumerate(totals):
+                    if not builds:
+                        continue
+                    for cost in range(tech_points - spent + 1):
+                        if table[cost]:
+                            entries = [(total + score, chosen + parts) for total, chosen in builds for score, parts in table[cost]]
+                            combined[spent + cost] = best_entries(combined[spent + cost] + entries, self.shortlist)
+                totals = combined
+            self.builds[key] = best_entries([entry for builds in totals for entry in builds], self.shortlist)
+        return self.builds[key]
+
+    # Best build for a chassis as (parts including the chassis, score)
+    # With evaluate, a function scoring a whole Vehicle, the shortlist is reranked by it and its score is returned instead
+    def solve(self, chassis, evaluate=None):
+        builds = self.solve_slots(chassis.slots, chassis.tech_points)
+        if evaluate is None:
+            score, parts = builds[0]
+            return [chassis, *parts], score + self.score(chassis)
+        scored = [(evaluate(objs.Vehicle("Candidate", "Player", [chassis, *parts])), parts) for _, parts in builds]
+        score, parts = max(scored, key=lambda entry: entry[0])
+        return [chassis, *parts], score
+
+    # Best build over several chassis, chassis sharing slots and tech points reuse the same solution
+    def best(self, chassis_list, evaluate=None):
+        return max((self.solve(chassis, evaluate) for chassis in chassis_list), key=lambda build: build[1])
+
+# Best build from an inventory, over all its chassis unless one is given
+def solve_build(inventory, objective="power", chassis=None, evaluate=None, shortlist=None):
+    parts = [part for part_type in PART_TYPES for part in inventory.get(part_type, ())]
+    solver = BuildSolver(parts, objective, shortlist or (8 if evaluate else 1))
+    return solver.best([chassis] if chassis else inventory["chassis"], evaluate)
+
+# Whole build objective: mean win rate of a build against the given enemy builds, from simulated battles
+def win_rate(opponents, battles=200, engine="object", seed=0):
+    import simulation
+    def evaluate(vehicle):
+        return sum(simulation.simulate_battles(vehicle, opponent, battles, workers=1, seed=seed, engine=engine).win_rate for opponent in opponents) / len(opponents)
+    return evaluate
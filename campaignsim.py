@@ -0,0 +1,130 @@
+# This file holds the campaign simulator, which plays whole runs of gamelogic.Game with bot decisions to measure how far runs get
+# Runs are spread over a process pool in chunks with chunkpool, every chunk comes back already aggregated and is merged as soon as it finishes, so no run is kept in memory after it has been counted
+
+import os
+import random
+import contextlib
+from collections import Counter
+import defs
+import eventbus
+import decisions
+import gamelogic
+import chunkpool
+
+# Bot providers a campaign can be played with, by name so they can be sent to worker processes
+PROVIDERS = {
+    "heuristic": lambda seed: decisions.HeuristicProvider(),
+    "random": lambda seed: decisions.RandomProvider(seed),
+}
+
+#-------------------------------------------------
+#SINGLE RUNS
+#-------------------------------------------------
+
+# Plays one run from a fresh inventory and vehicle with no sink listening and printed menus discarded, returns Game.run_summary()
+# The seed drives the bot and the game's map generator, which runs in a background thread and so can't share the random module with the game
+def simulate_campaign(provider="heuristic", max_maps=None, seed=None):
+    defs.reset_player_state()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), eventbus.using(eventbus.NullSink()):
+        game = gamelogic.Game(map_prefetch_limit=3, decision_provider=PROVIDERS[provider](seed), max_maps=max_maps, map_seed=seed)
+    return game.run_summary()
+
+#-------------------------------------------------
+#RESULT AGGREGATION
+#-------------------------------------------------
+
+# Aggregated run summaries, distributions are value -> count histograms and the power curve is kept as sums per map so chunks merge cheaply
+class CampaignStats(chunkpool.Stats):
+    def __init__(self):
+        self.runs = 0
+        self.survived = 0
+        self.battles_fought = 0
+        self.battles_won = 0
+        self.maps_played = Counter()
+        self.nodes_visited = Counter()
+        self.node_types = Counter()
+        self.map_sizes = Counter()
+        self.power_sums = []                        # Sum of power levels over runs, per map reached (index 0 is after the tutorial)
+        self.power_counts = []                      # Amount of runs that reached each map
+
+    def add(self, summary):
+        self.runs += 1
+        self.survived += summary["survived"]
+        self.battles_fought += summary["battles_fought"]
+        self.battles_won += summary["battles_won"]
+        self.maps_played[summary["maps_played"]] += 1
+        self.nodes_visited[summary["nodes_visited"]] += 1
+        self.node_types.update(summary["node_types"])
+        self.map_sizes.update(summary["map_sizes"])
+        for depth, power_level in enumerate(summary["power_curve"]):
+            if depth == len(self.power_sums):
+                self.power_sums.append(0.0)
+                self.power_counts.append(0)
+            self.power_sums[depth] += power_level
+            self.power_counts[depth] += 1
+
+    def merge(self, other):
+        self.runs += other.runs
+        self.survived += other.survived
+        self.battles_fought += other.battles_fought
+        self.battles_won += other.battles_won
+        self.maps_played.update(other.maps_played)
+        self.nodes_visited.update(other.nodes_visited)
+        self.node_types.update(other.node_types)
+        self.map_sizes.update(other.map_sizes)
+        for depth in range(len(other.power_sums)):
+            if depth == len(self.power_sums):
+                self.power_sums.append(0.0)
+                self.power_counts.append(0)
+            self.power_sums[depth] += other.power_sums[depth]
+            self.power_counts[depth] += other.power_counts[depth]
+        return self
+
+    @property
+    def battle_win_rate(self):
+        return self.battles_won / self.battles_fought if self.battles_fought else 0.0
+
+    # Mean power level of the runs that reached each map
+    def power_curve(self):
+        return [power_sum / count for power_sum, count in zip(self.power_sums, self.power_counts)]
+
+    # Share of runs that reached each map, the survival curve over depth
+    def reach_curve(self):
+        return [count / self.runs for count in self.power_counts] if self.runs else []
+
+    def summary(self):
+        return {
+            "runs": self.runs,
+            "survival_rate": self.survived / self.runs if self.runs else 0.0,
+            "battle_win_rate": self.battle_win_rate,
+            "maps_played": self.describe(self.maps_played),
+            "nodes_visited": self.describe(self.nodes_visited),
+            "map_nodes": self.describe(self.map_sizes),
+            "node_types": dict(self.node_types.most_common()),
+            "power_curve": [round(power, 2) for power in self.power_curve()],
+            "reach_curve": [round(share, 4) for share in self.reach_curve()],
+        }
+
+#-------------------------------------------------
+#PROCESS POOL
+#-------------------------------------------------
+
+# Worker entry point, plays one chunk of runs and aggregates them before sending anything back
+def run_campaign_chunk(runs, provider, max_maps, seed):
+    random.seed(seed)
+    stats = CampaignStats()
+    for index in range(runs):
+        stats.add(simulate_campaign(provider, max_maps, seed * 1000003 + index))
+    return stats
+
+# Plays the given amount of runs over a process pool (workers=1 runs in the current process) and returns their CampaignStats
+# At most two chunks per worker are in flight at once, on_chunk(stats) is called with the running totals after every merged chunk
+def simulate_campaigns(runs=1000, provider="heuristic", max_maps=None, workers=None, chunk_size=50, seed=None, on_chunk=None):
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+    chunks = [(min(chunk_size, runs - start), provider, max_maps, base_seed + index) for index, start in enumerate(range(0, runs, chunk_size))]
+    return chunkpool.run_chunks(run_campaign_chunk, chunks, CampaignStats(), workers, on_chunk)
+
+#Campaign simulation testing, plays heuristic and random runs of up to 10 maps
+if __name__ == "__main__":
+    print(simulate_campaigns(runs=1000, provider="heuristic", max_maps=10).summary())
+    print(simulate_campaigns(runs=1000, provider="random", max_maps=10).summary())
@@ -0,0 +1,169 @@
+# This file holds the SQLite backed part catalog, a drop-in replacement for objs.PartCatalog that keeps chassis, parts and actions in a database file
+# Filters run as indexed queries and only the parts that are actually drawn are turned into objects, with the most recently used ones kept in a bounded cache
+# install(path) makes a database the game's part catalog in place of the one objs builds at import
+# Run directly to export the parts defined in objs.py into a database: python catalogdb.py parts.db
+
+import os
+import sys
+import random
+import sqlite3
+import weakref
+from collections import OrderedDict
+import objs
+
+SLOT_NAMES = ("wheels", "engine", "bumper", "item_mount", "turret")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    integrity_change INTEGER NOT NULL DEFAULT 0,
+    damage INTEGER NOT NULL DEFAULT 0,
+    cooldown INTEGER NOT NULL DEFAULT 0,
+    max_uses INTEGER NOT NULL DEFAULT 0,
+    energy_cost INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS parts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL,
+    rank TEXT NOT NULL,
+    tech_points INTEGER NOT NULL,
+    max_integrity INTEGER NOT NULL,
+    weight INTEGER NOT NULL,
+    speed INTEGER NOT NULL DEFAULT 0,
+    dodge INTEGER NOT NULL DEFAULT 0,
+    energy_pool INTEGER NOT NULL DEFAULT 0,
+    energy_regen INTEGER NOT NULL DEFAULT 0,
+    action_id INTEGER REFERENCES actions(id),
+    slot_wheels INTEGER,
+    slot_engine INTEGER,
+    slot_bumper INTEGER,
+    slot_item_mount INTEGER,
+    slot_turret INTEGER
+);
+CREATE INDEX IF NOT EXISTS parts_by_type_rank_tech_points ON parts (type, rank, tech_points, id);
+CREATE INDEX IF NOT EXISTS parts_by_rank_tech_points ON parts (rank, tech_points, id);
+"""
+
+SELECT_PART = """
+SELECT parts.name, parts.type, parts.rank, parts.tech_points, parts.max_integrity, parts.weight, parts.speed, parts.dodge, parts.energy_pool, parts.energy_regen,
+       parts.slot_wheels, parts.slot_engine, parts.slot_bumper, parts.slot_item_mount, parts.slot_turret,
+       actions.name, actions.integrity_change, actions.damage, actions.cooldown, actions.max_uses, actions.energy_cost
+FROM parts LEFT JOIN actions ON actions.id = parts.action_id
+WHERE parts.id = ?
+"""
+
+# Builds the WHERE clause for a type/rank/tech point filter, each combination of given filters maps to one fixed statement so sqlite3 can reuse it prepared
+def filter_clause(type, rank, max_tech_points):
+    conditions = []
+    parameters = []
+    for column, operator, value in (("type", "=", type), ("rank", "=", rank), ("tech_points", "<=", max_tech_points)):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            parameters.append(value)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+class SQLitePartCatalog():
+    def __init__(self, path, cache_size=256, cached_statements=64):
+        self.connection = sqlite3.connect(path, cached_statements=cached_statements)
+        self.connection.executescript(SCHEMA)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()                  # part id -> materialized template, least recently used first
+        self.live = weakref.WeakValueDictionary()   # part id -> every template still referenced anywhere, evicted from the cache or not
+
+    # Turns a part row into a Part or Chassis template, going through the LRU cache
+    # Templates evicted from the cache but still held elsewhere (by part instances, inventories or the flyweight actions) are handed out again, so a part keeps one identity for as long as it is in use
+    def materialize(self, part_id):
+        if part_id in self.cache:
+            self.cache.move_to_end(part_id)
+            return self.cache[part_id]
+        part = self.live.get(part_id)
+        if part is None:
+            part = self.load(part_id)
+            self.live[part_id] = part
+        self.cache[part_id] = part
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return part
+
+    def load(self, part_id):
+        row = self.connection.execute(SELECT_PART, (part_id,)).fetchone()
+        name, type, rank, tech_points, max_integrity, weight, speed, dodge, energy_pool, energy_regen = row[:10]
+        slots = row[10:15]
+        action = objs.Action(*row[15:21]) if row[15] is not None else None
+        if type == "chassis":
+            part = objs.Chassis(name, type, rank, tech_points, list(slots), max_integrity, weight, speed, dodge, energy_pool, energy_regen, action)
+        else:
+            part = objs.Part(name, type, rank, tech_points, max_integrity, weight, speed, dodge, energy_pool, energy_regen, action)
+        return part
+
+    def register(self, *parts):                     # Insert parts (and their actions) into the database, a part with the same name as a stored one replaces it
+        with self.connection:
+            for part in parts:
+                replaced = self.connection.execute("SELECT id, action_id FROM parts WHERE name = ?", (part.name,)).fetchone()
+                if replaced:
+                    self.connection.execute("DELETE FROM parts WHERE id = ?", (replaced[0],))
+                    self.connection.execute("DELETE FROM actions WHERE id = ?", (replaced[1],))
+                    self.cache.pop(replaced[0], None)
+                    self.live.pop(replaced[0], None)
+                action_id = None
+                if part.action is not None:
+                    action = part.action
+                    action_id = self.connection.execute(
+                        "INSERT INTO actions (name, integrity_change, damage, cooldown, max_uses, energy_cost) VALUES (?, ?, ?, ?, ?, ?)",
+                        (action.name, action.integrity_change, action.damage, action.cooldown, action.max_uses, action.energy_cost),
+                    ).lastrowid
+                slots = [part.slots[slot] for slot in SLOT_NAMES] if part.type == "chassis" else [None] * len(SLOT_NAMES)
+                self.connection.execute(
+                    "INSERT INTO parts (name, type, rank, tech_points, max_integrity, weight, speed, dodge, energy_pool, energy_regen, action_id, slot_wheels, slot_engine, slot_bumper, slot_item_mount, slot_turret) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (part.name, part.type, part.rank, part.tech_points, part.max_integrity, part.weight, part.speed, part.dodge, part.energy_pool, part.energy_regen, action_id, *slots),
+                )
+
+    def get(self, name):                            # Part with the given name, None if there is none
+        row = self.connection.execute("SELECT id FROM parts WHERE name = ?", (name,)).fetchone()
+        return self.materialize(row[0]) if row else None
+
+    def find(self, type=None, rank=None, max_tech_points=None):    # Parts of the given type and rank costing at most max_tech_points, ordered by tech points
+        where, parameters = filter_clause(type, rank, max_tech_points)
+        rows = self.connection.execute(f"SELECT id FROM parts{where} ORDER BY tech_points, id", parameters).fetchall()
+        return [self.materialize(part_id) for part_id, in rows]
+
+    def count(self, type=None, rank=None, max_tech_points=None):
+        where, parameters = filter_clause(type, rank, max_tech_points)
+        return self.connection.execute(f"SELECT COUNT(*) FROM parts{where}", parameters).fetchone()[0]
+
+    # Uniformly random part of the given type and rank within budget, None if there are none
+    # Counts the matches and takes the one at a random offset, both walk the (type, rank, tech_points, id) index in the same order find uses
+    def random_part(self, type, rank, max_tech_points=None):
+        total = self.count(type, rank, max_tech_points)
+        if total == 0:
+            return None
+        where, parameters = filter_clause(type, rank, max_tech_points)
+        part_id = self.connection.execute(f"SELECT id FROM parts{where} ORDER BY tech_points, id LIMIT 1 OFFSET ?", parameters + [random.randrange(total)]).fetchone()[0]
+        return self.materialize(part_id)
+
+    @property
+    def parts(self):                                # Every part in the database, materialized, for the few callers that need the whole catalog
+        return self.find()
+
+    def close(self):
+        self.connection.close()
+
+# Writes the given parts (by default every part registered in objs) into a new or existing database file, parts already in it are updated
+def export_catalog(path, parts=None):
+    catalog = SQLitePartCatalog(path)
+    catalog.register(*(objs.part_catalog.parts if parts is None else parts))
+    catalog.close()
+
+# Makes the database at path the game's part catalog, exporting the parts defined in objs into it first if the file doesn't exist yet
+# Call sites look the catalog up through the module (objs.part_catalog), so this takes effect everywhere; returns the previous catalog
+def install(path, cache_size=256):
+    if not os.path.exists(path):
+        export_catalog(path)
+    previous = objs.part_catalog
+    objs.part_catalog = SQLitePartCatalog(path, cache_size)
+    return previous
+
+if __name__ == "__main__":
+    export_catalog(sys.argv[1] if len(sys.argv) > 1 else "parts.db")
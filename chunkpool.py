@@ -0,0 +1,47 @@
+# This file holds what the simulators share: running chunks of work over a process pool, merging the aggregated stats of every chunk as soon as it finishes, and the base of those stats
+# Used by simulation (battles), campaignsim (whole runs) and mapanalytics (map topology), every chunk comes back already aggregated so no single result is kept in memory after it has been counted
+
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Mean, min and max of a value -> count histogram
+def describe(histogram):
+    total = sum(histogram.values())
+    if not total:
+        return {"mean": 0.0, "min": 0, "max": 0}
+    mean = sum(value * count for value, count in histogram.items()) / total
+    return {"mean": mean, "min": min(histogram), "max": max(histogram)}
+
+# Base of the aggregated results, subclasses provide add, merge (returning self) and summary
+class Stats():
+    describe = staticmethod(describe)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.summary()})"
+
+# Calls function(*chunk) for every argument tuple in chunks and merges the returned stats into stats, which is returned
+# workers=1 or a single chunk runs in the current process, otherwise at most two chunks per worker are in flight at once; on_chunk(stats) is called with the running totals after every merge
+def run_chunks(function, chunks, stats, workers=None, on_chunk=None):
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            stats.merge(function(*chunk))
+            if on_chunk:
+                on_chunk(stats)
+        return stats
+    workers = workers or os.cpu_count()
+    pending = iter(chunks)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        while True:
+            for chunk in pending:
+                in_flight.add(executor.submit(function, *chunk))
+                if len(in_flight) >= 2 * workers:
+                    break
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stats.merge(future.result())
+                if on_chunk:
+                    on_chunk(stats)
+    return stats
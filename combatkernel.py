@@ -0,0 +1,203 @@
+# This file holds the batched combat kernel, which advances thousands of independent battles together as NumPy arrays
+# It follows the same rules as defs.battle driven by simulation.auto_player_turn: energy regen, cooldowns and availability at turn start, the enemy heuristic for both sides, dodge rolls and the turn 100 stalemate rule
+
+import numpy as np
+import defs
+import objs
+import simulation
+
+PLAYER = 0
+ENEMY = 1
+SPECIAL_ACTIONS = ("RAM!", "Reload")       # Handled by the kernel itself instead of being picked from the action arrays
+
+#-------------------------------------------------
+#STATE ENCODING
+#-------------------------------------------------
+
+# Parallel arrays for every lane of a batch, stat arrays have shape (2, lanes) and action arrays (2, actions, lanes), indexed by side first
+# Lanes are kept as the last axis so per-lane reductions over the few actions run as element-wise operations
+class BattleLanes():
+    def __init__(self, player_builds, enemy_builds):
+        lanes = len(player_builds)
+        sides = (player_builds, enemy_builds)
+        action_lists = [[[action for action in build.actions if action.name not in SPECIAL_ACTIONS] for build in builds] for builds in sides]
+        action_count = max(1, max(len(actions) for side in action_lists for actions in side))
+
+        # One (2, lanes, stats) array from the builds' fixed layout stat vectors, sliced per stat
+        stat_values = np.array([[build.stats.values for build in builds] for builds in sides], dtype=np.int32)
+        stat = lambda key: np.ascontiguousarray(stat_values[:, :, objs.STAT_INDEX[key]])
+        self.integrity = stat("integrity")
+        self.max_integrity = stat("max_integrity")
+        self.energy = stat("curr_energy")
+        self.energy_pool = stat("energy_pool")
+        self.energy_regen = stat("energy_regen")
+        self.dodge = stat("dodge")
+        self.weight = stat("weight")
+        self.speed = stat("speed")
+
+        shape = (2, action_count, lanes)
+        self.valid = np.zeros(shape, dtype=bool)
+        self.integrity_change = np.zeros(shape, dtype=np.int32)
+        self.damage = np.zeros(shape, dtype=np.int32)
+        self.cooldown = np.zeros(shape, dtype=np.int32)
+        self.max_uses = np.zeros(shape, dtype=np.int32)
+        self.energy_cost = np.zeros(shape, dtype=np.int32)
+        self.curr_cooldown = np.zeros(shape, dtype=np.int32)
+        self.curr_uses = np.zeros(shape, dtype=np.int32)
+        self.available = np.zeros(shape, dtype=bool)
+        for side, side_actions in enumerate(action_lists):
+            for lane, actions in enumerate(side_actions):
+                for index, action in enumerate(actions):
+                    self.valid[side, index, lane] = True
+                    self.integrity_change[side, index, lane] = action.integrity_change
+                    self.damage[side, index, lane] = action.damage
+                    self.cooldown[side, index, lane] = action.cooldown
+                    self.max_uses[side, index, lane] = action.max_uses
+                    self.energy_cost[side, index, lane] = action.energy_cost
+                    self.curr_cooldown[side, index, lane] = action.curr_cooldown
+                    self.curr_uses[side, index, lane] = action.curr_uses
+                    self.available[side, index, lane] = action.available
+
+        self.alive = self.integrity > 0
+        for side, builds in enumerate(sides):
+            self.alive[side] = [build.alive for build in builds]
+
+    # Builds a batch where every lane holds the same matchup
+    @classmethod
+    def repeat(cls, player_build, enemy_build, lanes):
+        lane_set = cls([player_build], [enemy_build])
+        for name, value in vars(lane_set).items():
+            axis_size = [1] * value.ndim
+            axis_size[-1] = lanes
+            setattr(lane_set, name, np.tile(value, axis_size))
+        return lane_set
+
+#-------------------------------------------------
+#KERNEL
+#-------------------------------------------------
+
+# Ram damage formula from defs.enemy_turn, applied element-wise
+def ram_damage(weight, speed, target_speed):
+    return np.where(weight > 50, weight ** 2, weight) * (speed - target_speed)
+
+# Vectorized turn_start: energy regen, cooldown reduction and action availability for the acting side of the given lanes
+def turn_start(state, side, lanes):
+    regenerated = np.minimum(state.energy[side] + state.energy_regen[side], state.energy_pool[side])
+    state.energy[side] = np.where(lanes, regenerated, state.energy[side])
+
+    active = lanes
+    cooldowns = state.curr_cooldown[side]
+    state.curr_cooldown[side] = cooldowns - (active & (cooldowns > 0) & (state.cooldown[side] > 0))
+
+    # Same override order as Vehicle.update_action_availability, the last applicable check wins
+    available = state.available[side]
+    available = np.where(active & (state.energy_cost[side] > 0), state.energy[side] >= state.energy_cost[side], available)
+    available = np.where(active & (state.max_uses[side] > 0), state.curr_uses[side] >= 1, available)
+    available = np.where(active & (state.cooldown[side] > 0), state.curr_cooldown[side] <= 0, available)
+    state.available[side] = available
+
+# Picks a uniformly random action among the masked ones for every lane, returns -1 where the mask is empty
+def random_masked_choice(mask, rng):
+    keys = np.where(mask, rng.random(mask.shape), -1.0)
+    choice = keys.argmax(axis=0)
+    return np.where(mask.any(axis=0), choice, -1)
+
+# Vectorized enemy_turn heuristic followed by Action.use, for the acting side of the given lanes
+def take_turn(state, side, lanes, rng):
+    target = 1 - side
+    turn_start(state, side, lanes)
+
+    candidates = state.available[side] & state.valid[side]
+    non_heal = candidates & (state.integrity_change[side] <= 0)
+    max_damage = np.where(candidates, state.damage[side], 0).max(axis=0)
+    ram_target = ram_damage(state.weight[side], state.speed[side], state.speed[target])
+    ram_vehicle = ram_damage(state.weight[target], state.speed[target], state.speed[side])
+
+    # RAM! only recalculates its numbers in Action.use, so choosing it ends the turn without effect
+    rams = lanes & (state.weight[side] > state.weight[target]) & (ram_target > max_damage) & (state.integrity[side] > ram_vehicle)
+    damaged = state.integrity[side] < state.max_integrity[side]
+    any_choice = lanes & ~rams & candidates.any(axis=0) & damaged
+    healthy_choice = lanes & ~rams & ~any_choice & non_heal.any(axis=0) & (state.integrity[side] == state.max_integrity[side])
+    reloads = lanes & ~rams & ~any_choice & ~healthy_choice
+
+    acting = any_choice | healthy_choice
+    lane_index = np.nonzero(acting)[0]
+    choice_mask = np.where(any_choice[lane_index], candidates[:, lane_index], non_heal[:, lane_index])
+    action_index = random_masked_choice(choice_mask, rng)
+    use_action(state, side, lane_index, action_index, rng)
+
+    reload_mask = reloads & (state.max_uses[side] > 0) & (state.curr_uses[side] < state.max_uses[side])
+    state.curr_uses[side] += reload_mask
+
+# Vectorized Action.use for one action per listed lane
+def use_action(state, side, lane_index, action_index, rng):
+    target = 1 - side
+    integrity_change = state.integrity_change[side, action_index, lane_index]
+    integrity = state.integrity[side, lane_index]
+    healed = np.minimum(integrity + integrity_change, state.max_integrity[side, lane_index])
+    integrity = np.where(integrity_change > 0, healed, integrity)
+    integrity = np.where(integrity_change < 0, integrity - integrity_change, integrity)
+    state.integrity[side, lane_index] = integrity
+
+    state.energy[side, lane_index] -= state.energy_cost[side, action_index, lane_index]
+    state.curr_cooldown[side, action_index, lane_index] = state.cooldown[side, action_index, lane_index]
+    state.curr_uses[side, action_index, lane_index] -= state.max_uses[side, action_index, lane_index] > 0
+
+    damage = state.damage[side, action_index, lane_index]
+    dodged = rng.random(len(lane_index)) * 100 < state.dodge[target, lane_index]
+    hits = (damage > 0) & ~dodged
+    hit_lanes = lane_index[hits]
+    remaining = state.integrity[target, hit_lanes] - damage[hits]
+    state.integrity[target, hit_lanes] = np.maximum(remaining, 0)
+    state.alive[target, hit_lanes] = remaining > 0
+
+# Runs every lane of the batch to completion, returns (player_won, turns) arrays
+def run_lanes(state, rng, max_turns=defs.STALEMATE_TURN):
+    lanes = state.alive.all(axis=0)
+    player_won = state.alive[PLAYER] & ~state.alive[ENEMY]
+    turns = np.ones(lanes.shape, dtype=np.int32)
+    turn = 1
+    while lanes.any():
+        turns[lanes] = turn
+        # Stalemate breaking, highest integrity percentage wins
+        if turn >= max_turns:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratios = state.integrity / state.max_integrity
+            player_won = np.where(lanes, ~(ratios[ENEMY] > ratios[PLAYER]), player_won)
+            break
+
+        take_turn(state, PLAYER, lanes, rng)
+        enemy_destroyed = lanes & ~state.alive[ENEMY]
+        player_won |= enemy_destroyed
+        lanes &= ~enemy_destroyed
+
+        take_turn(state, ENEMY, lanes, rng)
+        lanes &= state.alive[PLAYER]
+        turn += 1
+    return player_won, turns
+
+# Collects the finished batch into a simulation.BattleStats, so results compare directly with the object based path
+def collect_stats(state, player_won, turns):
+    stats = simulation.BattleStats()
+    stats.battles = len(player_won)
+    stats.player_wins = int(player_won.sum())
+    stats.stalemates = int((turns >= defs.STALEMATE_TURN).sum())
+    histograms = (
+        (stats.turns, turns),
+        (stats.damage_to_enemy, state.max_integrity[ENEMY] - state.integrity[ENEMY]),
+        (stats.damage_to_player, state.max_integrity[PLAYER] - state.integrity[PLAYER]),
+    )
+    for histogram, values in histograms:
+        unique, counts = np.unique(values, return_counts=True)
+        histogram.update(dict(zip(unique.tolist(), counts.tolist())))
+    return stats
+
+# Runs the given amount of battles of one matchup in batches of lane_count lanes
+def simulate_matchup(player_build, enemy_build, battles=100000, lane_count=10000, seed=None):
+    rng = np.random.default_rng(seed)
+    stats = simulation.BattleStats()
+    for start in range(0, battles, lane_count):
+        state = BattleLanes.repeat(player_build, enemy_build, min(lane_count, battles - start))
+        player_won, turns = run_lanes(state, rng)
+        stats.merge(collect_stats(state, player_won, turns))
+    return stats
@@ -0,0 +1,173 @@
+# This file holds the decision providers, defs.select_option_from_list hands every choice in the game to the installed provider
+# ConsoleProvider asks the player, ScriptedProvider replays a fixed list of answers, RandomProvider and HeuristicProvider are bots that let whole runs play out unattended
+# Every provider gets the options, the prompt and the tech points left (for part choices), and returns one of the options or None to skip
+# Bots announce their choices on the event bus as "decision" events instead of printing the options
+
+import random
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import objs
+import eventbus
+import buildsolver
+
+# Whether the options can be skipped with 0, actions can't be skipped so the player always acts on their turn
+def skippable(options):
+    return not options or not isinstance(options[0], (objs.Action, objs.ActionInstance))
+
+# Options the player can actually take, parts costing more tech points than are left are left out
+def selectable(options, tp_left=None):
+    if tp_left is None:
+        return list(options)
+    return [option for option in options if getattr(option, "tech_points", 0) <= tp_left]
+
+class DecisionProvider(ABC):
+    @abstractmethod
+    def select(self, options, prompt, tp_left=None):
+        pass
+
+#-------------------------------------------------
+#CONSOLE
+#-------------------------------------------------
+
+# Lists the options and reads the index of the chosen one from input, until a valid one is given
+class ConsoleProvider(DecisionProvider):
+    def select(self, options, prompt, tp_left=None):
+        eventbus.flush()                                                # Show everything that happened before asking
+        print(prompt)
+        for index, option in enumerate(options):
+            print(f"{index + 1}: {option}")
+
+        while True:
+            choice = input("Enter the index of the option you want to select (0 to skip): ")
+            print("")
+            try:
+                index = int(choice) - 1
+                if index == -1 and skippable(options):
+                    return None                                         # Skip this option
+                elif 0 <= index < len(options) and tp_left is not None and hasattr(options[index], "tech_points"):
+                    tp_needed = options[index].tech_points
+                    if tp_needed > tp_left:
+                        print("Not enough tech points available. Please try again.")
+                        continue
+                    return options[index]
+                elif 0 <= index < len(options):
+                    return options[index]
+                else:
+                    print("Invalid index. Please try again.")
+            except ValueError:
+                print("Invalid input. Please enter a valid index.")
+
+#-------------------------------------------------
+#BOTS
+#-------------------------------------------------
+
+# Base of the providers that answer by themselves, picks from the selectable options and reports the choice
+class BotProvider(DecisionProvider):
+    def select(self, options, prompt, tp_left=None):
+        choices = selectable(options, tp_left)
+        choice = self.choose(choices, prompt) if choices else None
+        if choice is None and not skippable(options):                   # Actions must be taken, fall back to the first one
+            choice = options[0]
+        if eventbus.listening:
+            eventbus.emit("decision", prompt.strip() or "Select an option:", "skip" if choice is None else getattr(choice, "name", None) or str(choice).strip())
+        return choice
+
+    @abstractmethod
+    def choose(self, choices, prompt):
+        pass
+
+# Replays answers given the same way as console input, 1 for the first option that can be taken and 0 to skip, or as the option itself
+# Once the answers run out the fallback provider takes over, without one an exhausted or invalid answer raises ValueError
+class ScriptedProvider(BotProvider):
+    def __init__(self, answers, fallback=None):
+        self.answers = list(answers)
+        self.position = 0
+        self.fallback = fallback
+
+    def select(self, options, prompt, tp_left=None):
+        if self.position >= len(self.answers) and self.fallback is not None:
+            return self.fallback.select(options, prompt, tp_left)
+        return super().select(options, prompt, tp_left)
+
+    def choose(self, choices, prompt):
+        if self.position >= len(self.answers):
+            raise ValueError(f"Scripted answers ran out at {prompt.strip()!r}")
+        answer = self.answers[self.position]
+        self.position += 1
+        if isinstance(answer, int):
+            if answer == 0:
+                return None
+            if not 1 <= answer <= len(choices):
+                raise ValueError(f"Scripted answer {answer} out of range for {prompt.strip()!r}, {len(choices)} options")
+            return choices[answer - 1]
+        if answer not in choices:
+            raise ValueError(f"Scripted answer {answer!r} is not an option of {prompt.strip()!r}")
+        return answer
+
+# Picks uniformly among the options, skipping optional choices with skip_chance
+class RandomProvider(BotProvider):
+    def __init__(self, seed=None, skip_chance=0.0):
+        self.random = random.Random(seed)
+        self.skip_chance = skip_chance
+
+    def choose(self, choices, prompt):
+        if self.skip_chance and skippable(choices) and self.random.random() < self.skip_chance:
+            return None
+        return self.random.choice(choices)
+
+# Simple rules per kind of option: hardest hitting action, strongest part, the node types most worth visiting and the richest map
+class HeuristicProvider(BotProvider):
+    node_preference = {"treasure": 5, "garage": 4, "choice": 3, "merchant": 2, "battle": 1, "boss": 0}   # Higher is preferred, boss nodes are always the only option
+
+    def choose(self, choices, prompt):
+        first = choices[0]
+        if isinstance(first, (objs.Action, objs.ActionInstance)):
+            return self.choose_action(choices)
+        if hasattr(first, "tech_points"):
+            return max(choices, key=lambda part: (buildsolver.part_power(part), part.tech_points))
+        if hasattr(first, "connections_to"):
+            return max(choices, key=lambda node: self.node_preference.get(node.type, 0))
+        if hasattr(first, "assign_events"):
+            return max(choices, key=self.map_value)
+        if "power" in choices:
+            return "power"
+        return first
+
+    # Hardest hitting attack, otherwise the biggest heal, otherwise Reload
+    def choose_action(self, actions):
+        attacks = [action for action in actions if action.damage > 0]
+        if attacks:
+            return max(attacks, key=lambda action: action.damage)
+        heals = [action for action in actions if action.integrity_change > 0]
+        if heals:
+            return max(heals, key=lambda action: action.integrity_change)
+        reload = [action for action in actions if action.name == "Reload"]
+        return reload[0] if reload else actions[0]
+
+    def map_value(self, game_map):                      # Average preference of the map's nodes
+        nodes = [node for step in game_map.map for node in step]
+        return sum(self.node_preference.get(node.type, 0) for node in nodes) / max(len(nodes), 1)
+
+#-------------------------------------------------
+#INSTALLED PROVIDER
+#-------------------------------------------------
+
+provider = ConsoleProvider()
+
+def install(new_provider):                              # Makes new_provider answer every decision, returns the previous provider
+    global provider
+    previous = provider
+    provider = new_provider
+    return previous
+
+def select(options, prompt, tp_left=None):
+    return provider.select(options, prompt, tp_left)
+
+# Installs a provider for the duration of a with block, restoring the previous one afterwards
+@contextmanager
+def using(new_provider):
+    previous = install(new_provider)
+    try:
+        yield new_provider
+    finally:
+        install(previous)
@@ -1,8 +1,15 @@
 # This file will hold all function definitions and game logic
 
+import os
 import objs
-from copy import deepcopy
+import buildsolver
+import scheduler
+import profiling
+import eventbus
+import decisions
 import random
+import heapq
+from collections import Counter, deque
 
 #-------------------------------------------------
 #FUNCTION DEFINITIONS
@@ -11,36 +18,128 @@ import random
 #Game loop logic
 #-------------------------------------------------
 
-# Basic option selection function
+# Basic option selection function, the installed decisions provider makes the choice (the console by default)
 def select_option_from_list(options, prompt, tp_left = None):
-    print(prompt)
-    for index, option in enumerate(options):
-        print(f"{index + 1}: {option}")
-
-    while True:
-        choice = input("Enter the index of the option you want to select (0 to skip): ")
-        print("")
-        try:
-            index = int(choice) - 1
-            if index == -1 and type(options[0]) != objs.Action:
-                return None                                         # Skip this option
-            elif 0 <= index < len(options) and tp_left is not None and hasattr(options[index], "tech_points"):
-                tp_needed = options[index].tech_points
-                if tp_needed > tp_left:
-                    print("Not enough tech points available. Please try again.")
-                    continue
-                return options[index]
-            elif 0 <= index < len(options):
-                return options[index]
-            else:
-                print("Invalid index. Please try again.")
-        except ValueError:
-            print("Invalid input. Please enter a valid index.")
+    return decisions.select(options, prompt, tp_left)
+
+# Base class for weighted samplers, read-only dictionary-like access to the outcome weights so they can be passed wherever odds dictionaries are
+class WeightedSampler():
+    def __init__(self, probabilities_dict):
+        self.outcomes = list(probabilities_dict.keys())
+        self.positions = {outcome: index for index, outcome in enumerate(self.outcomes)}
+        self.weights = [probabilities_dict[outcome] for outcome in self.outcomes]
+
+    def __getitem__(self, outcome):
+        return self.weights[self.positions[outcome]]
+
+    def __contains__(self, outcome):
+        return outcome in self.positions
+
+    def __iter__(self):
+        return iter(self.outcomes)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def keys(self):
+        return list(self.outcomes)
+
+    def values(self):
+        return list(self.weights)
+
+    def items(self):
+        return list(zip(self.outcomes, self.weights))
 
-# Weighted probability roll function, accomodates dynamic adjustment of odds in the given dictionary
-def dynamic_weighted_choice(probabilities_dict):
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())})"
+
+# Sampler for odds that do not change between draws (like Game.rank_odds), Walker's alias method gives O(1) draws after an O(n) setup
+class AliasSampler(WeightedSampler):
+    def __init__(self, probabilities_dict):
+        super().__init__(probabilities_dict)
+        count = len(self.weights)
+        total = sum(self.weights)
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+        if total <= 0:                                              # No odds at all, always draw the first outcome like dynamic_weighted_choice does
+            self.probability = [1.0] + [0.0] * (count - 1)
+            self.alias = [0] * count
+            return
+        scaled = [weight * count / total for weight in self.weights]
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            low = small.pop()
+            high = large[-1]
+            self.probability[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1 - scaled[low]
+            if scaled[high] < 1:
+                small.append(large.pop())
+        # Leftovers only differ from 1 by rounding error
+        for index in small + large:
+            self.probability[index] = 1.0
+
+    def choice(self, rng=random):
+        roll = rng.random() * len(self.outcomes)
+        index = int(roll)
+        if roll - index < self.probability[index]:
+            return self.outcomes[index]
+        return self.outcomes[self.alias[index]]
+
+# Sampler for odds that change between draws (like the event odds in Map.assign_events), a Fenwick tree over the weights gives O(log n) draws and updates
+class FenwickSampler(WeightedSampler):
+    def __init__(self, probabilities_dict):
+        super().__init__(probabilities_dict)
+        self.tree = [0] + list(self.weights)                        # 1-indexed partial sums, built in O(n)
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+        self.total = sum(self.weights)
+
+    def __setitem__(self, outcome, weight):                         # Update the weight of an outcome
+        position = self.positions[outcome]
+        delta = weight - self.weights[position]
+        self.weights[position] = weight
+        self.total += delta
+        index = position + 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def choice(self, rng=random):
+        if self.total <= 0:
+            return self.outcomes[0]
+        remaining = rng.random() * self.total
+        # Descend the tree for the first outcome whose cumulative weight exceeds the roll
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            next_position = position + step
+            if next_position < len(self.tree) and self.tree[next_position] <= remaining:
+                position = next_position
+                remaining -= self.tree[next_position]
+            step >>= 1
+        # Guard against float drift pushing the roll past the last outcome with weight
+        position = min(position, len(self.weights) - 1)
+        while self.weights[position] <= 0 and position > 0:
+            position -= 1
+        return self.outcomes[position]
+
+# Wraps odds that are not yet a sampler in an AliasSampler, for odds that are drawn from many times without changing
+def static_sampler(probabilities_dict):
+    if isinstance(probabilities_dict, WeightedSampler):
+        return probabilities_dict
+    return AliasSampler(probabilities_dict)
+
+# Weighted probability roll function, accomodates dynamic adjustment of odds in the given dictionary, samplers draw through their own tables
+# Rolls come from rng, the random module unless a random.Random instance is given
+def dynamic_weighted_choice(probabilities_dict, rng=random):
+    if isinstance(probabilities_dict, WeightedSampler):
+        return probabilities_dict.choice(rng)
     total = sum(probabilities_dict.values())
-    r = random.uniform(0, total)
+    r = rng.uniform(0, total)
     cumulative = 0
     for outcome, prob in probabilities_dict.items():
         cumulative += prob
@@ -55,9 +154,12 @@ def turn_start(vehicle):
 
 # Player turn handling
 def player_turn(player_vehicle, enemy_vehicle):
-
     turn_start(player_vehicle)
-    
+    return player_act(player_vehicle, enemy_vehicle)
+
+# Player's choice and use of an action, returns the action used
+def player_act(player_vehicle, enemy_vehicle):
+
     # List action options
     available_actions = []                                          # Create a list to store available action
     for action in player_vehicle.actions:
@@ -67,11 +169,22 @@ def player_turn(player_vehicle, enemy_vehicle):
     chosen_action = select_option_from_list(available_actions,action_select_string)
     if chosen_action is not None:                                   # Unnecessary if statement, but just so VS Code stops incorrectly linting it
         chosen_action.use(player_vehicle, enemy_vehicle)
+    return chosen_action
 
 # Enemy turn handling
 def enemy_turn(player_vehicle, enemy_vehicle):
-    
     turn_start(enemy_vehicle)
+    return enemy_act(player_vehicle, enemy_vehicle)
+
+# Enemy's choice and use of an action, returns the action used
+def enemy_act(player_vehicle, enemy_vehicle):
+
+    # Enemies with a policy let it pick the action
+    if enemy_vehicle.ai is not None:
+        action = enemy_vehicle.ai.choose_action(enemy_vehicle, player_vehicle)
+        eventbus.emit("enemy_action", action.name)
+        action.use(enemy_vehicle, player_vehicle)
+        return action
 
     available_actions = [action for action in enemy_vehicle.actions if action.available and action.name != "RAM!" and action.name != "Reload"]
     non_heal_actions = [action for action in available_actions if action.integrity_change <= 0]
@@ -86,85 +199,296 @@ def enemy_turn(player_vehicle, enemy_vehicle):
         max_damage = 0
     #Check if ramming would deal more damage than highest available damage dealing equipment and if there is enough integrity left
     if enemy_vehicle.stats["weight"] > player_vehicle.stats["weight"] and ram_damage_target > max_damage and enemy_vehicle.stats["integrity"] > ram_damage_vehicle:
-        print(f"The opponent uses {objs.ram.name}\n")
+        eventbus.emit("enemy_action", objs.ram.name)
         objs.ram.use(enemy_vehicle, player_vehicle)
+        return objs.ram
     #Check for available actions including heals, if damaged
     elif len(available_actions) > 0 and enemy_vehicle.stats["integrity"] < enemy_vehicle.stats["max_integrity"]:
         action = random.choice(available_actions)
-        print(f"The opponent uses {action.name}.\n")
+        eventbus.emit("enemy_action", action.name)
         action.use(enemy_vehicle, player_vehicle)
+        return action
     #Check for available actions including heals, if not damaged
     elif len(non_heal_actions) > 0 and enemy_vehicle.stats["integrity"] == enemy_vehicle.stats["max_integrity"]:
         action = random.choice(non_heal_actions)
-        print(f"The opponent uses {action.name}.\n")
+        eventbus.emit("enemy_action", action.name)
         action.use(enemy_vehicle, player_vehicle)
+        return action
     #Reload if none available
     else:
         objs.reload.use(enemy_vehicle, player_vehicle)
-        print("The opponent reloads all their equipment.\n")
+        eventbus.emit("enemy_reload")
+        return objs.reload
 
-def battle(player, enemy):
-    # Logic for executing a battle event
-    print("A battle event occurred!")
+# Battle loop, the player's side is driven by player_turn_function so it can be swapped for an automated one. Returns the winning vehicle and the turn the battle ended on
+# Battles still going on this turn are decided by integrity percentage
+STALEMATE_TURN = 100
 
-    player_parts = [part.name for part in player.parts]
-    enemy_parts = [part.name for part in enemy.parts]
-    print(f"Player vehicle: {player_parts}\nPlayer stats:{player.stats}")
-    print(f"Enemy vehicle: {enemy_parts}\nEnemy stats:{enemy.stats}")
+def battle(player, enemy, player_turn_function=player_turn):
+    # Logic for executing a battle event
+    eventbus.emit("battle_start")
+    if eventbus.listening:
+        eventbus.emit("vehicle", "Player", [part.name for part in player.parts], dict(player.stats))
+        eventbus.emit("vehicle", "Enemy", [part.name for part in enemy.parts], dict(enemy.stats))
     turn = 1
     # Battle loop
     while player.alive and enemy.alive:
 
         # Stalemate breaking, highest integrity percentage wins
-        if turn >= 100:
+        if turn >= STALEMATE_TURN:
             if enemy.stats["integrity"] / enemy.stats["max_integrity"] > player.stats["integrity"] / player.stats["max_integrity"]:
-                print("Game Over! Your vehicle ran out of fuel.")
-                break
+                eventbus.emit("player_out_of_fuel")
+                player.alive = False                                # Losing on fuel ends the run like being destroyed
+                return enemy, turn
             else:
-                print("Congratulations! The enemy vehicle ran out of fuel.")
-                break
+                eventbus.emit("enemy_out_of_fuel")
+                enemy.alive = False
+                return player, turn
 
         # Player's turn
-        print(f"Turn: {turn}\n\n{player.name} has {player.stats['integrity']} integrity and {player.stats['curr_energy']} energy left.\n{enemy.name} has {enemy.stats['integrity']} integrity and {enemy.stats['curr_energy']} energy left.\n")
-        player_turn(player, enemy)
+        if eventbus.listening:
+            eventbus.emit("turn", turn, player.name, player.stats["integrity"], player.stats["curr_energy"], enemy.name, enemy.stats["integrity"], enemy.stats["curr_energy"])
+        with profiling.span("player_turn"):
+            player_turn_function(player, enemy)
 
         # Check if enemy vehicle is destroyed
         if not enemy.alive:
-            print("Congratulations! You destroyed the enemy vehicle.")
-            break
+            eventbus.emit("enemy_destroyed")
+            return player, turn
 
         # Enemy's turn
-        enemy_turn(player, enemy)
+        with profiling.span("enemy_turn"):
+            enemy_turn(player, enemy)
 
         # Check if player vehicle is destroyed
         if not player.alive:
-            print("Game Over! Your vehicle was destroyed by the enemy.")
-            break
+            eventbus.emit("player_destroyed")
+            return enemy, turn
 
         turn += 1
+    # One of the vehicles was already destroyed before the battle started
+    return (player if player.alive else enemy), turn
+
+# Battle loop on the time unit scheduler, each side acts whenever its next action comes up, at intervals set by its speed and the energy cost of its last action
+# Cooldowns run out as scheduled events and only the actions whose state changed are rechecked, instead of every action on every turn. Returns the winning vehicle and the time the battle ended at
+def timed_battle(player, enemy, player_act_function=player_act, time_limit=100 * scheduler.TURN_LENGTH):
+    eventbus.emit("battle_start")
+    if eventbus.listening:
+        eventbus.emit("vehicle", "Player", [part.name for part in player.parts], dict(player.stats))
+        eventbus.emit("vehicle", "Enemy", [part.name for part in enemy.parts], dict(enemy.stats))
+    clock = scheduler.Scheduler()
+    # Actions whose availability depends on energy or uses, the only ones to recheck after regeneration or a reload
+    energy_actions = {id(vehicle): [action for action in vehicle.actions if action.energy_cost > 0] for vehicle in (player, enemy)}
+    limited_actions = {id(vehicle): [action for action in vehicle.actions if action.max_uses > 0] for vehicle in (player, enemy)}
+    cooldown_ends = {}                                              # id(action) -> time its cooldown runs out
+
+    def end_cooldown(vehicle, action):
+        action.curr_cooldown = 0
+        del cooldown_ends[id(action)]
+        vehicle.update_action_availability((action,))
+
+    def act(vehicle, act_function):
+        vehicle.regenerate_energy()
+        vehicle.update_action_availability(energy_actions[id(vehicle)])
+        # Search based enemies count cooldowns in their own turns, so the time left on each is converted into the vehicle's actions it still spans
+        if vehicle.ai is not None:
+            for action in vehicle.actions:
+                if id(action) in cooldown_ends:
+                    action.curr_cooldown = scheduler.turns_left(cooldown_ends[id(action)] - clock.now, vehicle.stats["speed"])
+        if eventbus.listening:
+            eventbus.emit("time_step", clock.now, vehicle.name, vehicle.stats["integrity"], vehicle.stats["curr_energy"])
+        action = act_function(player, enemy)
+        changed = list(energy_actions[id(vehicle)])
+        if action is not None:
+            if action.name == "Reload":
+                changed += limited_actions[id(vehicle)]
+            elif action.cooldown > 0 and action.curr_cooldown > 0:
+                clock.schedule(action.cooldown * scheduler.TURN_LENGTH, end_cooldown, vehicle, action)
+                cooldown_ends[id(action)] = clock.now + action.cooldown * scheduler.TURN_LENGTH
+                changed.append(action)
+            elif action.max_uses > 0:
+                changed.append(action)
+        vehicle.update_action_availability(changed)
+        clock.schedule(scheduler.action_delay(vehicle.stats["speed"], action.energy_cost if action else 0), act, vehicle, act_function)
+
+    player.update_action_availability()
+    enemy.update_action_availability()
+    clock.schedule(scheduler.action_delay(player.stats["speed"]), act, player, player_act_function)
+    clock.schedule(scheduler.action_delay(enemy.stats["speed"]), act, enemy, enemy_act)
+    while player.alive and enemy.alive:
+
+        # Stalemate breaking, highest integrity percentage wins
+        if clock.next_time() >= time_limit:
+            if enemy.stats["integrity"] / enemy.stats["max_integrity"] > player.stats["integrity"] / player.stats["max_integrity"]:
+                eventbus.emit("player_out_of_fuel")
+                player.alive = False                                # Losing on fuel ends the run like being destroyed
+                return enemy, clock.now
+            else:
+                eventbus.emit("enemy_out_of_fuel")
+                enemy.alive = False
+                return player, clock.now
+        with profiling.span("time_step"):
+            clock.run_next()
+
+    if not enemy.alive:
+        eventbus.emit("enemy_destroyed")
+        return player, clock.now
+    eventbus.emit("player_destroyed")
+    return enemy, clock.now
+
+# Battle events are fought on the time unit scheduler when this is set, instead of in alternating turns, TIMED_BATTLES=1 in the environment sets it
+timed_battles = os.environ.get("TIMED_BATTLES") == "1"
+
+# Functions called as listener(player, enemy, winner) after every fight, unlike event bus records they are called under the NullSink too
+fight_listeners = []
+
+# Fights a battle event with the battle loop timed_battles selects, returns the winning vehicle
+def fight(player, enemy):
+    if timed_battles:
+        winner = timed_battle(player, enemy)[0]
+    else:
+        winner = battle(player, enemy)[0]
+    for listener in fight_listeners:
+        listener(player, enemy, winner)
+    return winner
 
 #Vehicle build logic
 #-------------------------------------------------
 
-# Initialize player's inventory
-inventory = {
-    "chassis": [],
-    "wheels": [],
-    "engine": [],
-    "bumper": [],
-    "item_mount": [],
-    "turret": [],
-}
-
 # Reference variable for part rank hierarchy, used for determining player power level, enemy and reward generation
 rank_hierarchy = ["starter", "common", "uncommon", "rare", "epic"]
 
-# Choose a part from part_list, given a determined type and rank
+# Keeps the inventory's power level inputs up to date as parts come and go: the best chassis by tech points and by rank, the highest slot amount per part type and the parts of each type grouped by rank
+# Reproduces Game.update_player_power's choices exactly, including ties going to the part that entered the inventory first
+class PowerTracker():
+    def __init__(self, rank_list=rank_hierarchy):
+        self.rank_positions = {rank: index for index, rank in enumerate(rank_list)}
+        self.sequence = 0                                                   # Insertion counter, stands in for the position in the inventory lists
+        self.sequences = {}                                                 # id(part) -> deque of insertion numbers of that part still in the inventory, oldest first
+        self.parts = {}                                                     # part type -> one insertion-ordered {sequence: part} dictionary per rank
+        self.chassis = {}                                                   # sequence -> chassis still in the inventory
+        self.chassis_by_tech_points = []                                    # Heaps of (-key, sequence), removed chassis are skipped lazily
+        self.chassis_by_rank = []
+        self.slot_amounts = {}                                              # part type -> Counter of slot amounts over all chassis
+
+    def add(self, part):
+        self.sequence += 1
+        sequence = self.sequence
+        self.sequences.setdefault(id(part), deque()).append(sequence)
+        if part.type == "chassis":
+            self.chassis[sequence] = part
+            heapq.heappush(self.chassis_by_tech_points, (-part.tech_points, sequence))
+            heapq.heappush(self.chassis_by_rank, (-self.rank_positions[part.rank], sequence))
+            for part_type, slots in part.slots.items():
+                self.slot_amounts.setdefault(part_type, Counter())[slots] += 1
+        else:
+            ranks = self.parts.setdefault(part.type, [{} for _ in self.rank_positions])
+            ranks[self.rank_positions[part.rank]][sequence] = part
+
+    def remove(self, part):
+        sequence = self.sequences[id(part)].popleft()
+        if not self.sequences[id(part)]:
+            del self.sequences[id(part)]
+        if part.type == "chassis":
+            del self.chassis[sequence]
+            for part_type, slots in part.slots.items():
+                counts = self.slot_amounts[part_type]
+                counts[slots] -= 1
+                if not counts[slots]:
+                    del counts[slots]
+        else:
+            del self.parts[part.type][self.rank_positions[part.rank]][sequence]
+
+    def top_chassis(self, heap):                                            # Best live chassis in a heap, dropping removed entries on the way
+        while heap[0][1] not in self.chassis:
+            heapq.heappop(heap)
+        return self.chassis[heap[0][1]]
+
+    def top_parts(self, part_type, amount):                                 # Highest rank parts of a type, up to amount, in the order repeated max() calls would pick them
+        selected = []
+        for rank_parts in reversed(self.parts.get(part_type, ())):
+            for part in rank_parts.values():
+                if len(selected) == amount:
+                    return selected
+                selected.append(part)
+        return selected
+
+    def power_level(self, rank_config, tech_point_multiplier=0.1, chassis_multiplier=0.1):
+        if not self.chassis:
+            return 0
+        total_power_level = 0
+        for part_type, counts in self.slot_amounts.items():
+            for part in self.top_parts(part_type, max(counts, default=0)):
+                total_power_level += rank_config[part.rank]["prob_multiplier"] + tech_point_multiplier * part.tech_points
+        highest_rarity_chassis = self.top_chassis(self.chassis_by_rank)
+        highest_tech_point_chassis = self.top_chassis(self.chassis_by_tech_points)
+        highest_rarity_chassis_power = (rank_config[highest_rarity_chassis.rank]["prob_multiplier"] + tech_point_multiplier * highest_rarity_chassis.tech_points * chassis_multiplier)
+        highest_tech_point_chassis_power = (rank_config[highest_tech_point_chassis.rank]["prob_multiplier"] + tech_point_multiplier * highest_tech_point_chassis.tech_points * chassis_multiplier)
+        total_power_level += highest_rarity_chassis_power + highest_tech_point_chassis_power
+        return total_power_level
+
+# Parts of one type in the order they entered the inventory, read like a list but removing a part by identity is O(1) instead of a scan and shift
+# Parts are held in a dict keyed by insertion number, with id(part) -> insertion numbers of that part so the oldest copy is found without searching
+class PartList():
+    def __init__(self, parts=()):
+        self.parts = {}
+        self.keys = {}
+        self.counter = 0
+        for part in parts:
+            self.append(part)
+
+    def append(self, part):
+        self.counter += 1
+        self.parts[self.counter] = part
+        self.keys.setdefault(id(part), deque()).append(self.counter)
+
+    def remove(self, part):                                                 # Removes the oldest copy of part, like list.remove but by identity
+        keys = self.keys.get(id(part))
+        if not keys:
+            raise ValueError(f"{part!r} is not in the list")
+        del self.parts[keys.popleft()]
+        if not keys:
+            del self.keys[id(part)]
+
+    def __getitem__(self, index):                                           # The ends are O(1), other positions walk the dict
+        if index == 0 and self.parts:
+            return next(iter(self.parts.values()))
+        if index == -1 and self.parts:
+            return next(reversed(self.parts.values()))
+        return list(self.parts.values())[index]
+
+    def __iter__(self):
+        return iter(self.parts.values())
+
+    def __len__(self):
+        return len(self.parts)
+
+    def __eq__(self, other):
+        return list(self) == list(other) if isinstance(other, (PartList, list)) else NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+# Player inventory, lists of parts by type; parts should be added and removed through add and remove so the power tracker stays current
+class Inventory(dict):
+    def __init__(self, part_types=("chassis", "wheels", "engine", "bumper", "item_mount", "turret")):
+        super().__init__((part_type, PartList()) for part_type in part_types)
+        self.power_tracker = PowerTracker()
+
+    def add(self, part):
+        self[part.type].append(part)
+        self.power_tracker.add(part)
+
+    def remove(self, part):
+        self[part.type].remove(part)
+        self.power_tracker.remove(part)
+
+# Initialize player's inventory
+inventory = Inventory()
+
+# Choose a part from the part catalog, given a determined type and rank
 def select_part(type=None, rank=None):
-    filtered_parts = []
-    for part in objs.part_list:
-        if (type is None or part.type == type) and (rank is None or part.rank == rank):
-            filtered_parts.append(part)
+    filtered_parts = objs.part_catalog.find(type, rank)
 
     if not filtered_parts:
         print("No parts found.")
@@ -176,7 +500,7 @@ def select_part(type=None, rank=None):
     select_string = ""
     new_part = select_option_from_list(filtered_parts, select_string)
     if new_part is not None:
-        inventory[new_part.type].append(deepcopy(new_part))
+        inventory.add(new_part.instantiate())
     return None
 
 # Edit player vehicle
@@ -192,7 +516,7 @@ def vehicle_edit(vehicle):
         return vehicle_edit(vehicle)                                        #Restarts function so player can build their starter vehicle
     
     for part in vehicle.parts:                                              #Re-adds current build parts to inventory
-        inventory[part.type].append(part)
+        inventory.add(part)
     vehicle.parts = []                                                      #Resets parts and stats of current vehicle
     vehicle.reset_stats()
     
@@ -200,14 +524,25 @@ def vehicle_edit(vehicle):
     vehicle_parts = []
     if len(chassis) == 1:
         vehicle_parts.append(chassis[0])
-        chassis.remove(chassis[0])
+        inventory.remove(chassis[0])
     else:
         chassis_choice = select_option_from_list(chassis, string)
         vehicle_parts.append(chassis_choice)
-        chassis.remove(chassis_choice)
+        inventory.remove(chassis_choice)
     
+    # Offer to fill the slots with the best build for an objective instead of picking parts one by one
+    objective = select_option_from_list(list(buildsolver.OBJECTIVES), "Select an objective to fill the slots with the best build for it (0 to pick parts yourself):")
+    if objective is not None:
+        build, score = buildsolver.solve_build(inventory, objective, chassis=vehicle_parts[0])
+        for part in build[1:]:
+            inventory.remove(part)
+        print(f"Best {objective} build ({score:g}): {[part.name for part in build]}")
+        vehicle.parts = build
+        vehicle.update_stats()
+        return
+
     tp_left = vehicle_parts[0].tech_points
-    
+
     for part_type, slots in vehicle_parts[0].slots.items():
         for _ in range(slots):
             print(f"Tech Points left: {tp_left}")
@@ -215,7 +550,7 @@ def vehicle_edit(vehicle):
             if part_choice is not None:
                 tp_left -= part_choice.tech_points
                 vehicle_parts.append(part_choice)
-                inventory[part_type].remove(part_choice)
+                inventory.remove(part_choice)
     
     vehicle.parts = vehicle_parts
     vehicle.update_stats()
@@ -228,4 +563,10 @@ def player_init(vehicle_instance):
 
 player_vehicle = objs.Vehicle("Player Vehicle", "Player", [])
 
+# Starts a new run with an empty inventory and vehicle, a Game picks up the new ones when it is created
+def reset_player_state():
+    global inventory, player_vehicle
+    inventory = Inventory()
+    player_vehicle = objs.Vehicle("Player Vehicle", "Player", [])
+
 #-------------------------------------------------
\ No newline at end of file
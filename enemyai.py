@@ -0,0 +1,169 @@
+# This file holds the search based enemy policy, an alternative to the fixed heuristic in defs.enemy_turn for tougher enemies
+# The enemy looks ahead over its own and the player's turns with expectimax: it picks the action with the best expected outcome, averaging over the player's possible answers and over dodge rolls
+# Searches deepen one turn at a time until the time budget runs out, and positions already evaluated are kept in a transposition table for the rest of the battle
+
+import time
+
+RELOAD = -1                                                 # Move number of reloading, the other moves are indices into SideModel.actions
+WIN = 1000.0                                                # Value of a destroyed player, a destroyed enemy is -WIN
+DISCOUNT = 0.9                                              # Per move discount on later outcomes, so sooner damage and wins are preferred
+
+# Search settings of the enemy tiers, an enemy without a tier keeps the heuristic enemy turn
+TIERS = {
+    "normal": {"max_depth": 2, "time_budget": 0.002},
+    "hard": {"max_depth": 4, "time_budget": 0.005},
+    "brutal": {"max_depth": 8, "time_budget": 0.005},
+}
+
+class SearchTimeout(Exception):
+    pass
+
+# The parts of a vehicle that stay fixed during a battle, plus reading its changing state as a tuple of (integrity, energy, cooldowns, uses, availability flags)
+# RAM! and Reload are left out of the actions, reloading is its own move and RAM! does not change the battle
+class SideModel():
+    __slots__ = ("vehicle", "actions", "templates", "max_integrity", "energy_pool", "energy_regen", "dodge")
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self.actions = [action for action in vehicle.actions if action.name not in ("RAM!", "Reload")]
+        self.templates = tuple((action.integrity_change, action.damage, action.cooldown, action.max_uses, action.energy_cost) for action in self.actions)
+        self.max_integrity = vehicle.stats["max_integrity"]
+        self.energy_pool = vehicle.stats["energy_pool"]
+        self.energy_regen = vehicle.stats["energy_regen"]
+        self.dodge = min(max(vehicle.stats["dodge"] / 100, 0.0), 1.0)
+
+    def signature(self):
+        return (self.templates, self.max_integrity, self.energy_pool, self.energy_regen, self.dodge)
+
+    def state(self):
+        return (self.vehicle.stats["integrity"], self.vehicle.stats["curr_energy"], tuple(action.curr_cooldown for action in self.actions), tuple(action.curr_uses for action in self.actions), tuple(action.available for action in self.actions))
+
+    # Moves available in a state, following Vehicle.update_action_availability where cooldown overrides uses, which override energy
+    def moves(self, state):
+        moves = [index for index, available in enumerate(state[4]) if available]
+        moves.append(RELOAD)
+        return moves
+
+    # Same as defs.turn_start: energy regeneration, cooldown reduction and availability update
+    def turn_start(self, state):
+        integrity, energy, cooldowns, uses, available = state
+        energy = self.energy_pool if energy + self.energy_regen > self.energy_pool else energy + self.energy_regen
+        cooldowns = tuple(curr - 1 if curr > 0 and template[2] > 0 else curr for curr, template in zip(cooldowns, self.templates))
+        flags = []
+        for index, (_, _, cooldown, max_uses, energy_cost) in enumerate(self.templates):
+            flag = available[index]
+            if energy_cost > 0:
+                flag = energy >= energy_cost
+            if max_uses > 0:
+                flag = uses[index] >= 1
+            if cooldown > 0:
+                flag = cooldowns[index] <= 0
+            flags.append(flag)
+        return (integrity, energy, cooldowns, uses, tuple(flags))
+
+    # Outcomes of a move as (probability, own state, target state), following Action.use
+    def apply(self, state, target, target_state, move):
+        integrity, energy, cooldowns, uses, available = state
+        if move == RELOAD:
+            uses = tuple(curr + 1 if template[3] > 0 and curr < template[3] else curr for curr, template in zip(uses, self.templates))
+            return [(1.0, (integrity, energy, cooldowns, uses, available), target_state)]
+        integrity_change, damage, cooldown, max_uses, energy_cost = self.templates[move]
+        if integrity_change > 0:
+            integrity = min(integrity + integrity_change, self.max_integrity)
+        elif integrity_change < 0:
+            integrity = integrity - integrity_change                # Vehicle.take_damage with the negative change, as Action.use does
+        energy -= energy_cost
+        cooldowns = cooldowns[:move] + (cooldown,) + cooldowns[move + 1:]
+        if max_uses > 0:
+            uses = uses[:move] + (uses[move] - 1,) + uses[move + 1:]
+        state = (integrity, energy, cooldowns, uses, available)
+        if damage <= 0:
+            return [(1.0, state, target_state)]
+        hit_state = (max(target_state[0] - damage, 0),) + target_state[1:]
+        outcomes = []
+        if target.dodge > 0:
+            outcomes.append((target.dodge, state, target_state))
+        if target.dodge < 1:
+            outcomes.append((1 - target.dodge, state, hit_state))
+        return outcomes
+
+class EnemyAI():
+    def __init__(self, max_depth=4, time_budget=0.005, table_limit=20000):
+        if max_depth < 1:
+            raise ValueError(f"max_depth must be at least 1, got {max_depth}")
+        self.max_depth = max_depth                          # Deepest search in moves, one move is one vehicle's turn
+        self.time_budget = time_budget                      # Seconds per decision, the deepest fully searched depth is used
+        self.table_limit = table_limit                      # Transposition table entries kept before it is cleared, small enough that clearing and growing it stay well inside the budget
+        self.table = {}                                     # (enemy state, player state, mover) -> (searched depth, value)
+        self.signature = None                               # Fixed stats of the battle the table belongs to
+        self.last_depth = 0                                 # Depth reached by the last decision
+
+    # Picks the enemy's action for this turn, called after the enemy's turn start, returns one of the enemy vehicle's actions
+    def choose_action(self, enemy_vehicle, player_vehicle):
+        deadline = time.perf_counter() + self.time_budget
+        enemy = SideModel(enemy_vehicle)
+        player = SideModel(player_vehicle)
+        signature = (enemy.signature(), player.signature())
+        if signature != self.signature or len(self.table) > self.table_limit:
+            self.table.clear()
+            self.signature = signature
+        self.enemy, self.player = enemy, player
+        enemy_state, player_state = enemy.state(), player.state()
+        moves = enemy.moves(enemy_state)
+        self.last_depth = 0
+        for depth in range(1, self.max_depth + 1):
+            # Depth 1 is always searched in full, so the action played has been evaluated even when the budget is already spent
+            self.deadline = float("inf") if depth == 1 else deadline
+            try:
+                values = [self.expected(enemy, enemy_state, player, player_state, move, 0, depth) for move in moves]
+            except SearchTimeout:
+                break
+            # Near ties go to the earlier move, so equal lines keep acting now rather than reloading through rounding noise
+            best_value = max(values)
+            best = next(move for move, value in zip(moves, values) if value >= best_value - 1e-9)
+            self.last_depth = depth
+        if best == RELOAD:
+            return next(action for action in enemy_vehicle.actions if action.name == "Reload")
+        return enemy.actions[best]
+
+    # Value of a move for the enemy, averaged over its dodge outcomes
+    # A move is worth the integrity shares it changes right away plus the discounted value of the position after it, so damage dealt sooner counts for more
+    def expected(self, mover, mover_state, target, target_state, move, mover_index, depth):
+        value = 0.0
+        mover_max = max(mover.max_integrity, 1)
+        target_max = max(target.max_integrity, 1)
+        for probability, new_mover_state, new_target_state in mover.apply(mover_state, target, target_state, move):
+            gain = (target_state[0] - new_target_state[0]) / target_max + (new_mover_state[0] - mover_state[0]) / mover_max
+            if mover_index == 0:
+                value += probability * (gain + DISCOUNT * self.search(new_mover_state, target.turn_start(new_target_state), 1, depth - 1))
+            else:
+                value += probability * (DISCOUNT * self.search(target.turn_start(new_target_state), new_mover_state, 0, depth - 1) - gain)
+        return value
+
+    # Value of a position for the enemy, mover 0 is the enemy to act and mover 1 the player, both after their turn start
+    def search(self, enemy_state, player_state, mover, depth):
+        if player_state[0] <= 0:
+            return WIN
+        if enemy_state[0] <= 0:
+            return -WIN
+        if depth == 0:
+            return 0.0
+        key = (enemy_state, player_state, mover)            # The state itself rather than its hash, so colliding states never share a value
+        stored = self.table.get(key)
+        if stored is not None and stored[0] >= depth:
+            return stored[1]
+        if time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if mover == 0:
+            value = max(self.expected(self.enemy, enemy_state, self.player, player_state, move, 0, depth) for move in self.enemy.moves(enemy_state))
+        else:
+            # The player is a chance node: any available action is equally likely, reloading only when nothing else is available
+            moves = self.player.moves(player_state)
+            moves = moves[:-1] or moves
+            value = sum(self.expected(self.player, player_state, self.enemy, enemy_state, move, 1, depth) for move in moves) / len(moves)
+        self.table[key] = (depth, value)
+        return value
+
+# New enemy policy for a tier name from TIERS
+def for_tier(tier):
+    return EnemyAI(**TIERS[tier])
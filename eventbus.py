@@ -0,0 +1,132 @@
+# This file holds the event bus, combat and map events are emitted as small (kind, values...) records to the installed sink instead of being printed
+# Sinks: NullSink drops everything (simulations), TerminalSink formats records into text and writes them in batches (play), Recorder keeps the raw records (logs)
+# While the NullSink is installed emit is swapped for a function that does nothing, and call sites only build costly values (part lists, stat copies) when listening is True
+# Call sites go through the module (eventbus.emit, eventbus.listening) so installing a sink takes effect everywhere
+
+import sys
+import json
+import atexit
+from contextlib import contextmanager
+
+# Text of every event kind, filled in with the record's values in order
+FORMATS = {
+    "battle_start": "A battle event occurred!",
+    "vehicle": "{0} vehicle: {1}\n{0} stats:{2}",                            # side, part names, stats
+    "turn": "Turn: {0}\n\n{1} has {2} integrity and {3} energy left.\n{4} has {5} integrity and {6} energy left.\n",
+    "time_step": "Time: {0}\n\n{1} has {2} integrity and {3} energy left.\n",
+    "enemy_action": "The opponent uses {0}.\n",
+    "enemy_reload": "The opponent reloads all their equipment.\n",
+    "damage": "The {0} takes {1} integrity damage!\n",
+    "heal": "The {0} is healed for {1} integrity.\n",
+    "dodge": "The {0} dodged the {1}!\n",
+    "enemy_destroyed": "Congratulations! You destroyed the enemy vehicle.",
+    "player_destroyed": "Game Over! Your vehicle was destroyed by the enemy.",
+    "enemy_out_of_fuel": "Congratulations! The enemy vehicle ran out of fuel.",
+    "player_out_of_fuel": "Game Over! Your vehicle ran out of fuel.",
+    "node_entered": "Entering node ({0}, {1}) - {2}",
+    "reward": "You received a {0}!",
+    "treasure_empty": "The treasure was empty.",
+    "decision": "{0}\n> {1}\n",                                             # prompt, chosen option, made by a bot
+}
+
+def format_record(record):
+    return FORMATS[record[0]].format(*record[1:])
+
+#-------------------------------------------------
+#SINKS
+#-------------------------------------------------
+
+class NullSink():
+    def emit(self, *record):
+        pass
+
+    def flush(self):
+        pass
+
+# Formats records as they arrive and writes them to the stream in batches, the buffer is flushed before every input prompt so the player always sees the whole fight first
+class TerminalSink():
+    def __init__(self, stream=None, buffer_size=64):
+        self.stream = stream                                # None writes to the current sys.stdout, so redirect_stdout still applies
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def emit(self, *record):
+        self.buffer.append(FORMATS[record[0]].format(*record[1:]))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(self.buffer) + "\n")
+            stream.flush()
+            self.buffer = []
+
+# Keeps the raw records, at most limit of the latest ones if given, and writes them as one JSON array per line
+class Recorder():
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.records = []
+
+    def emit(self, *record):
+        self.records.append(record)
+        if self.limit is not None and len(self.records) > 2 * self.limit:  # Trimmed in bulk, instead of on every record
+            del self.records[:-self.limit]
+
+    def flush(self):
+        if self.limit is not None:
+            del self.records[:-self.limit]
+
+    def counts(self):                                       # Amount of records of every kind
+        counts = {}
+        for record in self.records:
+            counts[record[0]] = counts.get(record[0], 0) + 1
+        return counts
+
+    def text(self):
+        self.flush()
+        return "\n".join(format_record(record) for record in self.records)
+
+    def write_jsonl(self, path):
+        self.flush()
+        with open(path, "w") as file:
+            for record in self.records:
+                file.write(json.dumps(record) + "\n")
+
+def read_jsonl(path):
+    with open(path) as file:
+        return [tuple(json.loads(line)) for line in file]
+
+#-------------------------------------------------
+#BUS
+#-------------------------------------------------
+
+def null_emit(*record):
+    pass
+
+sink = TerminalSink()
+listening = True
+emit = sink.emit
+
+def install(new_sink):                                      # Makes new_sink the receiver of every event, returns the previous sink
+    global sink, listening, emit
+    previous = sink
+    previous.flush()
+    sink = new_sink
+    listening = not isinstance(new_sink, NullSink)
+    emit = new_sink.emit if listening else null_emit
+    return previous
+
+def flush():
+    sink.flush()
+
+# Installs a sink for the duration of a with block, restoring the previous one afterwards
+@contextmanager
+def using(new_sink):
+    previous = install(new_sink)
+    try:
+        yield new_sink
+    finally:
+        install(previous)
+
+atexit.register(flush)
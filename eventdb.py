@@ -0,0 +1,128 @@
+# This file holds the JSON event store: authored events kept in one JSON file per node type (events/battle.json, events/choice.json, ...)
+# A type's file is only parsed and validated the first time that type is needed, normally when a map containing it is entered, and the compiled templates are kept for the rest of the run
+# Templates are turned into fresh mapgen.Event objects for every node, since events carry state such as the enemy vehicle or the chosen outcome
+
+import os
+import json
+import random
+from functools import partial
+import defs
+import mapgen
+import enemyai
+
+EVENT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "events")
+
+# Event class, required fields and optional fields of every node type, fields map to the class' constructor arguments
+EVENT_SCHEMAS = {
+    "battle": (mapgen.Battle, {"name": str}, {"ai_tier": str}),
+    "choice": (mapgen.Choice, {"name": str, "flavor_text": str, "choices": dict}, {}),
+    "treasure": (mapgen.Treasure, {"name": str}, {"rank_floor": str, "rank_ceiling": str, "part_type": str, "player_chooses": bool}),
+    "garage": (mapgen.Garage, {"name": str}, {}),
+    "merchant": (mapgen.Merchant, {"name": str}, {}),
+    "boss": (mapgen.Boss, {"name": str, "faction": str}, {}),
+}
+
+# Events that scale with the player, they receive the game's current rank odds when built
+RANK_SCALED = (mapgen.Battle, mapgen.Treasure)
+
+PART_TYPES = ("chassis", "wheels", "engine", "bumper", "item_mount", "turret")
+
+# Validated event, ready to be built any number of times
+class EventTemplate():
+    __slots__ = ("event_class", "fields", "choices", "next")
+
+    def __init__(self, event_class, fields, choices=None, next=None):
+        self.event_class = event_class
+        self.fields = fields                        # Constructor arguments taken straight from the JSON
+        self.choices = choices                      # Choice text -> EventTemplate or None, for choice events
+        self.next = next                            # EventTemplate resolved after this one, if any
+
+    def build(self, rank_odds):
+        fields = dict(self.fields)
+        if self.event_class in RANK_SCALED:
+            fields["rank_odds_dict"] = rank_odds
+        if self.choices is not None:
+            fields["choices"] = {text: partial(outcome.build, rank_odds) if outcome else None for text, outcome in self.choices.items()}   # Built once chosen, so unchosen battles never create their enemy
+        fields["next"] = self.next.build(rank_odds) if self.next else None
+        return self.event_class(**fields)
+
+# Checks one JSON event against the schema of its type and compiles it, nested events (choice outcomes and next) carry their own "type"
+def compile_event(node_type, spec, where):
+    if node_type not in EVENT_SCHEMAS:
+        raise ValueError(f"{where}: unknown event type {node_type!r}")
+    if not isinstance(spec, dict):
+        raise ValueError(f"{where}: event must be an object")
+    event_class, required, optional = EVENT_SCHEMAS[node_type]
+    allowed = {**required, **optional}
+    for key in required:
+        if key not in spec:
+            raise ValueError(f"{where}: missing field {key!r}")
+    fields = {}
+    for key, value in spec.items():
+        if key in ("type", "next"):
+            continue
+        if key not in allowed:
+            raise ValueError(f"{where}: unknown field {key!r} for a {node_type} event")
+        if not isinstance(value, allowed[key]):
+            raise ValueError(f"{where}: field {key!r} must be of type {allowed[key].__name__}")
+        fields[key] = value
+    for key in ("rank_floor", "rank_ceiling"):
+        if key in fields and fields[key] not in defs.rank_hierarchy:
+            raise ValueError(f"{where}: unknown rank {fields[key]!r}")
+    if "ai_tier" in fields and fields["ai_tier"] not in enemyai.TIERS:
+        raise ValueError(f"{where}: unknown enemy tier {fields['ai_tier']!r}")
+    if "part_type" in fields and fields["part_type"] not in PART_TYPES:
+        raise ValueError(f"{where}: unknown part type {fields['part_type']!r}")
+
+    choices = None
+    if "choices" in fields:
+        choices = {}
+        for text, outcome in fields.pop("choices").items():
+            choices[text] = compile_nested(outcome, f"{where}.choices[{text!r}]") if outcome is not None else None
+    next = compile_nested(spec["next"], f"{where}.next") if spec.get("next") is not None else None
+    return EventTemplate(event_class, fields, choices, next)
+
+def compile_nested(spec, where):
+    if not isinstance(spec, dict) or "type" not in spec:
+        raise ValueError(f"{where}: nested events need a \"type\" field")
+    return compile_event(spec["type"], spec, where)
+
+# Loads and compiles the events of a single type, the file holds a list of events
+def load_event_file(path, node_type):
+    with open(path, encoding="utf-8") as file:
+        specs = json.load(file)
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a list of events")
+    return [compile_event(node_type, spec, f"{path}[{index}]") for index, spec in enumerate(specs)]
+
+class EventStore():
+    def __init__(self, directory=EVENT_DIRECTORY):
+        self.directory = directory
+        self.templates = {}                         # node type -> compiled templates, filled on first use of the type
+        self.drawn = set()                          # Templates already used on the current map
+
+    def load(self, node_type):
+        if node_type not in self.templates:
+            path = os.path.join(self.directory, f"{node_type}.json")
+            self.templates[node_type] = load_event_file(path, node_type) if os.path.exists(path) else []
+        return self.templates[node_type]
+
+    # Loads the event types present on a map ahead of play, and starts a fresh record of drawn events for it
+    def prepare(self, game_map):
+        self.drawn.clear()
+        for node_type in {node.type for step in game_map.map for node in step}:
+            if node_type:
+                self.load(node_type)
+
+    # Builds an event for a node, avoiding events already seen on the current map while unseen ones are left
+    # Battles and bosses without authored events fall back to a generic battle, other types without events return None
+    def create(self, node_type, rank_odds):
+        templates = self.load(node_type) if node_type else []
+        if not templates:
+            if node_type in ("battle", "boss"):
+                return mapgen.Battle("Battle", rank_odds)
+            return None
+        unseen = [template for template in templates if template not in self.drawn]
+        template = random.choice(unseen or templates)
+        self.drawn.add(template)
+        return template.build(rank_odds)
@@ -1,174 +1,284 @@
+import os
 import random
+import queue
+import threading
 import defs
 import mapgen
-from copy import deepcopy
+import eventdb
+import profiling
+import eventbus
+import decisions
+import catalogdb
+from bisect import bisect_right
+from collections import Counter
+
+# With PART_CATALOG set to a database path, parts come from that SQLite catalog instead of the one objs builds, the file is exported from objs first if missing
+if os.environ.get("PART_CATALOG"):
+    catalogdb.install(os.environ["PART_CATALOG"])
 
 #-------------------------------------------------
 #GAME LOGIC
 #-------------------------------------------------
 
+# Power level thresholds and odds multipliers of every rank, each Game starts from a copy
+RANK_CONFIG = {
+    "starter": {"floor": 0, "ceiling": 0, "prob_multiplier": 0.5},
+    "common": {"floor": 5, "ceiling": 0, "prob_multiplier": 1.0},
+    "uncommon": {"floor": 15, "ceiling": 8, "prob_multiplier": 1.5},
+    "rare": {"floor": 45, "ceiling": 25, "prob_multiplier": 2.0},
+    "epic": {"floor": float("inf"), "ceiling": 50, "prob_multiplier": 3.0}}
+
+# Rank probabilities for a given power level, ranks between the floor and ceiling the power level reaches get the best odds
+def calculate_rank_probabilities(power_level, rank_config):
+    rank_list = [r for r in rank_config.keys()]
+    probabilities = {}
+    rank_floor = ""
+    rank_ceiling = ""
+    # Cache for probability multipliers to avoid repeated lookups
+    prob_multiplier_cache = {}
+    # Loop through each rank to check floor and ceiling thresholds
+    for rank in rank_list:
+        # Cache multiplier for later use
+        prob_multiplier = rank_config[rank]["prob_multiplier"]
+        prob_multiplier_cache[rank] = prob_multiplier
+        # Check if power level meets floor and ceiling thresholds
+        if power_level >= rank_config[rank]["floor"]:
+            rank_floor = rank
+        if power_level >= rank_config[rank]["ceiling"]:
+            rank_ceiling = rank
+    # Get list of ranks between floor and ceiling and list of ranks below floor
+    in_threshold_ranks = [r for r in rank_list if rank_list.index(r) >= rank_list.index(rank_floor) and rank_list.index(r) <= rank_list.index(rank_ceiling)]
+    lower_than_threshold = [r for r in rank_list if rank_list.index(r) < rank_list.index(rank_floor)]
+    # Loop through ranks again to calculate probabilities, ranks below treshold get lowest odds, ranks within thresholds get best odds, ranks above treshold get low odds
+    for rank in rank_list:
+        if rank in in_threshold_ranks:
+            probabilities[rank] = round(80 / prob_multiplier_cache[rank])
+        elif rank in lower_than_threshold:
+            probabilities[rank] = round(5 / prob_multiplier_cache[rank])
+        else:
+            probabilities[rank] = round(15 / prob_multiplier_cache[rank])
+    # All ranks below floor, if any, should have equal odds, set as the lowest of them
+    min_below_floor = min((value for rank, value in probabilities.items() if rank in lower_than_threshold), default=None)
+    for rank in rank_list:
+        if rank in lower_than_threshold and min_below_floor:
+            probabilities[rank] = min_below_floor
+    return probabilities
+
+# Rank odds compiled from a rank_config, the odds only change where the power level crosses a configured floor or ceiling, so they are calculated once per interval and looked up by bisect
+class RankOddsTable():
+    def __init__(self, rank_config):
+        self.rank_config = rank_config
+        self.rank_list = [r for r in rank_config.keys()]
+        # Sorted floor and ceiling values, each one starts an interval of constant odds
+        self.breakpoints = sorted({config[threshold] for config in rank_config.values() for threshold in ("floor", "ceiling")})
+        self.odds = [calculate_rank_probabilities(breakpoint, rank_config) for breakpoint in self.breakpoints]
+        self.odds_matrix = None                                     # Odds as an array of shape (intervals, ranks), built on the first vectorized lookup
+
+    def lookup(self, power_level):
+        index = bisect_right(self.breakpoints, power_level) - 1
+        if index < 0:                                               # Below every threshold, outside the compiled table
+            return calculate_rank_probabilities(power_level, self.rank_config)
+        return dict(self.odds[index])
+
+    # Vectorized lookup for an array of power levels, returns an array of shape (len(power_levels), ranks) with columns in rank_list order
+    def lookup_many(self, power_levels):
+        import numpy as np
+        if self.odds_matrix is None:
+            self.odds_matrix = np.array([[odds[rank] for rank in self.rank_list] for odds in self.odds])
+        indices = np.searchsorted(self.breakpoints, power_levels, side="right") - 1
+        if np.any(indices < 0):
+            raise ValueError(f"Power levels below the lowest rank threshold {self.breakpoints[0]} have no rank floor")
+        return self.odds_matrix[indices]
+
+# Generates maps in a background thread ahead of time, so map choices are ready when the player gets to them
+# At most `limit` maps are held at once, counting the one being generated
+class MapPrefetcher():
+    def __init__(self, generate, limit=6):
+        if limit < 1:
+            raise ValueError(f"MapPrefetcher needs a limit of at least 1 map, got {limit}")
+        self.generate = generate                    # Function returning a new, fully generated map
+        self.maps = queue.Queue()
+        self.free_slots = threading.Semaphore(limit)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # Worker loop, waits for a free slot before generating each map
+    def run(self):
+        while not self.stopped.is_set():
+            if self.free_slots.acquire(timeout=0.1):
+                self.maps.put(self.generate())
+
+    # Takes the given amount of maps, waiting for the worker if not enough are ready yet
+    def take(self, amount):
+        taken = []
+        for _ in range(amount):
+            taken.append(self.maps.get())
+            self.free_slots.release()
+        return taken
+
+    # Stops the worker and waits for it, a map being generated is finished first
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
 class Game():
-    def __init__(self):
+    def __init__(self, map_prefetch_limit=6, event_store=None, decision_provider=None, max_maps=None, map_seed=None, streaming=False, stream_height=None):
         self.current_node = None  # Initialize the current node as None
+        self.current_map = None   # Map the current node belongs to
+        self.event_store = event_store or eventdb.EventStore()  # Authored events, loaded per node type as maps need them
+        self.map_prefetch_limit = map_prefetch_limit  # Maximum amount of map choices generated ahead of time
+        self.decision_provider = decision_provider  # Makes the player's choices for the run, the console when None
+        self.max_maps = max_maps  # Amount of maps after the tutorial before the run ends, None plays until the player vehicle is destroyed
+        self.streaming = streaming  # After the tutorial, play one StreamingMap generated as the player advances instead of choosing between maps
+        self.stream_height = stream_height  # Steps of the streamed map before its boss, None streams endlessly until the player vehicle is destroyed
+        self.map_random = random.Random(map_seed)  # Only used by map generation, the same seed gives the same maps even while they are generated in the background
+        self.maps_played = 0
+        # Run statistics
+        self.nodes_visited = 0
+        self.node_types = Counter()  # Visited node types
+        self.battles_fought = 0
+        self.battles_won = 0
+        self.map_sizes = []  # Node count of every chosen map, a streamed map has none
+        self.power_curve = []  # Power level after the tutorial and after every map
         self.inventory = defs.inventory
-        self.power_level = self.update_player_power()
-        self.rank_config = {
-            "starter": {"floor": 0, "ceiling": 0, "prob_multiplier": 0.5},
-            "common": {"floor": 5, "ceiling": 0, "prob_multiplier": 1.0},
-            "uncommon": {"floor": 15, "ceiling": 8, "prob_multiplier": 1.5},
-            "rare": {"floor": 45, "ceiling": 25, "prob_multiplier": 2.0},
-            "epic": {"floor": float("inf"), "ceiling": 50, "prob_multiplier": 3.0}}
+        self.rank_config = {rank: dict(config) for rank, config in RANK_CONFIG.items()}
         self.rank_list = [r for r in self.rank_config.keys()]
-        self.rank_odds = self.rank_probabilities()
+        self.rank_odds_table = RankOddsTable(self.rank_config)
+        self.refresh_rank_odds()
         self.player_vehicle = defs.player_vehicle
         self.play()
     
     # Helper function to track player's power through their inventory to use as baseline for determining map generation difficulty and rewards
+    # The inventory's power tracker is updated as parts are added and removed, so this only reads off its current best chassis and parts by rank
     def update_player_power(self):
-        # Create deepcopy of inventory, so that it can be modified without affecting the actual inventory
-        copied_inventory = deepcopy(self.inventory)
-        tech_point_multiplier = 0.1
-        chassis_multiplier = 0.1
-        # Get highest Tech Point chassis in player's inventory        
-        highest_tech_point_chassis = max(copied_inventory["chassis"], key=lambda chassis: chassis.tech_points)
-        # Get highest rarity chassis in player's inventory
-        highest_rarity_chassis = max(copied_inventory["chassis"], key=lambda chassis: self.rank_list.index(chassis.rank))
-        # Get highest slot amount for each part type from all the chassis in player's inventory
-        highest_slot_amounts = {}
-        for chassis in copied_inventory["chassis"]:
-            for part_type, slots in chassis.slots.items():
-                highest_slot_amounts[part_type] = max(highest_slot_amounts.get(part_type, 0), slots)
-        # Get highest rarity parts of each type up to amount of slots established by last step
-        highest_rarity_parts = {}
-        for part_type in highest_slot_amounts.keys():
-            parts_of_type = copied_inventory[part_type]
-            selected_parts = []
-            while len(selected_parts) < highest_slot_amounts[part_type] and parts_of_type:
-                highest_rarity_part = max(parts_of_type, key=lambda part: self.rank_list.index(part.rank))
-                selected_parts.append(highest_rarity_part)
-                parts_of_type.remove(highest_rarity_part)
-            highest_rarity_parts[part_type] = selected_parts
-        # Calculate individual power levels of each of those parts, and sum it up
-        total_power_level = 0
-        for part_list in highest_rarity_parts.values():
-            for part in part_list:
-                part_power_level = (self.rank_config[part.rank]["prob_multiplier"] + tech_point_multiplier * part.tech_points)
-                total_power_level += part_power_level
-        # Calculate the power level of the highest rarity chassis with a higher weight
-        highest_rarity_chassis_power = (self.rank_config[highest_rarity_chassis.rank]["prob_multiplier"] + tech_point_multiplier * highest_rarity_chassis.tech_points * chassis_multiplier)
-        # Calculate the power level of the highest TP chassis with a higher weight
-        highest_tech_point_chassis_power = (self.rank_config[highest_tech_point_chassis.rank]["prob_multiplier"] + tech_point_multiplier * highest_tech_point_chassis.tech_points * chassis_multiplier)
-        # Add the power levels of the highest rarity and highest TP chassis with a higher weight
-        total_power_level += highest_rarity_chassis_power + highest_tech_point_chassis_power
-
-        return total_power_level
+        with profiling.span("update_player_power"):
+            return self.inventory.power_tracker.power_level(self.rank_config)
         # FOR LATER: do the equivalent for mods
 
-    # Helper function that updates rank probabilities based on player power level
-    def rank_probabilities(self):    
-        probabilities = {}
-        rank_floor = ""
-        rank_ceiling = ""
-        # Cache for probability multipliers to avoid repeated lookups
-        prob_multiplier_cache = {}
-        # Loop through each rank to check floor and ceiling thresholds
-        for rank in self.rank_list:
-            # Cache multiplier for later use
-            prob_multiplier = self.rank_config[rank]["prob_multiplier"]
-            prob_multiplier_cache[rank] = prob_multiplier
-            # Check if power level meets floor and ceiling thresholds
-            if self.power_level >= self.rank_config[rank]["floor"]:
-                rank_floor = rank
-            if self.power_level >= self.rank_config[rank]["ceiling"]:
-                rank_ceiling = rank
-        # Get list of ranks between floor and ceiling and list of ranks below floor
-        in_threshold_ranks = [r for r in self.rank_list if self.rank_list.index(r) >= self.rank_list.index(rank_floor) and self.rank_list.index(r) <= self.rank_list.index(rank_ceiling)]
-        lower_than_threshold = [r for r in self.rank_list if self.rank_list.index(r) < self.rank_list.index(rank_floor)]
-        # Loop through ranks again to calculate probabilities, ranks below treshold get lowest odds, ranks within thresholds get best odds, ranks above treshold get low odds
-        for rank in self.rank_list:
-            if rank in in_threshold_ranks:
-                probabilities[rank] = round(80 / prob_multiplier_cache[rank])
-            elif rank in lower_than_threshold:
-                probabilities[rank] = round(5 / prob_multiplier_cache[rank])
-            else:
-                probabilities[rank] = round(15 / prob_multiplier_cache[rank])
-        # All ranks below floor, if any, should have equal odds, set as the lowest of them
-        min_below_floor = min((value for rank, value in probabilities.items() if rank in lower_than_threshold), default=None)
-        for rank in self.rank_list:
-            if rank in lower_than_threshold and min_below_floor:
-                probabilities[rank] = min_below_floor
-        return probabilities
-
-
-    # Helper function to generate new maps
-    def generate_new_map(self, min_width, max_width, min_height, max_height, min_density, max_density):
-        new_map = mapgen.Map(random.randint(min_width, max_width), random.randint(min_height, max_height), round(random.uniform(min_density, max_density), 2))
-        new_map.generate_map()
-        new_map.assign_events()
+    # Recalculates power level and rank odds, after the inventory has changed
+    def refresh_rank_odds(self):
+        self.power_level = self.update_player_power()
+        self.rank_odds = defs.AliasSampler(self.rank_probabilities())
+
+    # Helper function that updates rank probabilities based on player power level, looked up in the precompiled rank odds table
+    def rank_probabilities(self):
+        return self.rank_odds_table.lookup(self.power_level)
+
+    # Helper function to generate new maps, every roll comes from rng (the random module if not given)
+    def generate_new_map(self, min_width, max_width, min_height, max_height, min_density, max_density, rng=random):
+        new_map = mapgen.Map(rng.randint(min_width, max_width), rng.randint(min_height, max_height), round(rng.uniform(min_density, max_density), 2), rng)
+        with profiling.span("generate_map"):
+            new_map.generate_map()
+        with profiling.span("assign_events"):
+            new_map.assign_events()
         return new_map
 
     # Prompts the player on which lowest step node they want to start on the current map
     def choose_starting_node(self, map):
-        first_node = defs.select_option_from_list(map.map[0], "Select your starting point:\n")
+        first_node = defs.select_option_from_list(map.step(0), "Select your starting point:\n")
         self.current_node = first_node
         return first_node
 
-    # Checks which type is associated with the current node, then either procedurally generates or choose the event from a list (for certain event types, should create a deepcopy of the event list and remove that entry, so it cannot be rolled again in the current map)
+    # Builds the event for the current node from the event store and resolves it, battles scale with the current rank odds and get a generic battle when no authored ones exist
     def execute_event(self):
         if not self.current_node:
             return
-        print(f"Entering node ({self.current_node.x}, {self.current_node.y}) - {self.current_node.type}")
-        # Battle events are already random by nature, so no list will exist, just retrieve the map's general power rating to determine rank_floor and rank_ceiling
-        if self.current_node.type == "battle":
-            battle_events = []      # Placeholder just to remove linting
-            event = random.choice(battle_events)
-            event.execute()
-        elif self.current_node.type == "choice":
-            choice_events = []      # Placeholder just to remove linting
-            event = random.choice(choice_events)
-            event.execute()
-        elif self.current_node.type == "garage":
-            garage_events = []      # Placeholder just to remove linting
-            event = random.choice(garage_events)
-            event.execute()
-        elif self.current_node.type == "boss":
-            boss_events = []      # Placeholder just to remove linting
-            event = random.choice(boss_events)
-            event.execute()
-        elif self.current_node.type == "treasure":
-            treasure_events = []      # Placeholder just to remove linting
-            event = random.choice(treasure_events)
-            event.execute()
-        elif self.current_node.type == "merchant":
-            merchant_events = []      # Placeholder just to remove linting
-            event = random.choice(merchant_events)
-            event.execute()
+        eventbus.emit("node_entered", self.current_node.x, self.current_node.y, self.current_node.type)
+        eventbus.flush()                                    # Events print their own text directly, after this
+        with profiling.span(f"event:{self.current_node.type}"):
+            event = self.event_store.create(self.current_node.type, self.rank_odds)
+            if event:
+                event.resolve()
+        self.nodes_visited += 1
+        self.node_types[self.current_node.type] += 1
+
+    # Fight listener counting every battle of the run, including ones an event leads into through its next events
+    def battle_finished(self, player, enemy, winner):
+        self.battles_fought += 1
+        self.battles_won += winner is player
 
     # Loops executing the current node, then checking if it has connections
     def move_to_next_node(self):
-        while self.current_node:
+        while self.current_node and self.player_vehicle.alive:
             self.execute_event()
+            # Events can change the inventory, so power level and rank odds are brought up to date after each one
+            self.refresh_rank_odds()
             # If so prompt for which to move on to, set the current node to that and restart the loop
             if self.current_node.connections_to:
+                # The next step has to be finished before its nodes are offered, a StreamingMap only assigns their events then
+                self.current_map.step(self.current_node.y + 1)
                 next_node = defs.select_option_from_list(self.current_node.connections_to, "Select your next area:\n")
                 self.current_node = next_node
             # Otherwise set current_node to None to terminate the loop
             else:
                 self.current_node = None
     
-    # Basic game play loop
+    # Statistics of the run so far, small enough to send back from worker processes
+    def run_summary(self):
+        return {
+            "maps_played": self.maps_played,
+            "nodes_visited": self.nodes_visited,
+            "node_types": dict(self.node_types),
+            "battles_fought": self.battles_fought,
+            "battles_won": self.battles_won,
+            "survived": self.player_vehicle.alive,
+            "map_sizes": list(self.map_sizes),
+            "power_curve": list(self.power_curve),
+        }
+
+    # Basic game play loop, with the choices made by the game's decision provider if it has one
     def play(self):
-        # Initialize player vehicle, with starter parts
-        if not self.player_vehicle.parts:
-            defs.player_init(self.player_vehicle)
-        # Create a tutorial map
-        tutorial_map = self.generate_new_map(1, 1, 5, 6, 1, 1)
-        self.current_node = tutorial_map.map[0][0]
-        self.move_to_next_node()
-        # After tutorial is finished, begin the proper game loop until player is dead
-        while self.player_vehicle.alive:
-            map_list = [self.generate_new_map(4, 8, 10, 18, 0.2, 0.5) for i in range(3)]
-            next_map = defs.select_option_from_list(map_list, "Select your next map:\n")
-            self.choose_starting_node(next_map)
+        if self.decision_provider is None:
+            return self.play_maps()
+        with decisions.using(self.decision_provider):
+            return self.play_maps()
+
+    def play_maps(self):
+        # Start generating map choices in the background while the player builds their vehicle and plays the tutorial
+        # The tutorial map gets its own generator, seeded before the thread starts, so the two never draw from the same one at once
+        # A streamed run draws its only map from map_random while it is played, so it has nothing to prefetch
+        tutorial_random = random.Random(self.map_random.getrandbits(64))
+        self.map_prefetcher = None if self.streaming else MapPrefetcher(lambda: self.generate_new_map(4, 8, 10, 18, 0.2, 0.5, self.map_random), self.map_prefetch_limit)
+        defs.fight_listeners.append(self.battle_finished)
+        try:
+            # Initialize player vehicle, with starter parts
+            if not self.player_vehicle.parts:
+                defs.player_init(self.player_vehicle)
+            # Create a tutorial map
+            tutorial_map = self.generate_new_map(1, 1, 5, 6, 1, 1, tutorial_random)
+            self.current_map = tutorial_map
+            self.event_store.prepare(tutorial_map)
+            self.current_node = tutorial_map.map[0][0]
             self.move_to_next_node()
+            self.power_curve.append(self.power_level)
+            if self.streaming:
+                if self.player_vehicle.alive:
+                    self.play_stream()
+                return
+            # After tutorial is finished, begin the proper game loop until player is dead
+            while self.player_vehicle.alive and (self.max_maps is None or self.maps_played < self.max_maps):
+                map_list = self.map_prefetcher.take(3)
+                next_map = defs.select_option_from_list(map_list, "Select your next map:\n") or map_list[0]   # A map has to be picked, skipping takes the first
+                self.current_map = next_map
+                self.map_sizes.append(sum(len(step) for step in next_map.map))
+                self.event_store.prepare(next_map)
+                self.choose_starting_node(next_map)
+                self.move_to_next_node()
+                self.maps_played += 1
+                self.power_curve.append(self.power_level)
+        finally:
+            defs.fight_listeners.remove(self.battle_finished)
+            if self.map_prefetcher:
+                self.map_prefetcher.stop()
+
+    # Plays a single StreamingMap, only a window of its steps is kept and the next one is generated as the player moves onto it
+    def play_stream(self):
+        stream = mapgen.StreamingMap(self.map_random.randint(4, 8), self.stream_height, round(self.map_random.uniform(0.2, 0.5), 2), rng=self.map_random)
+        self.current_map = stream
+        self.choose_starting_node(stream)
+        self.event_store.prepare(stream)
+        self.move_to_next_node()
+        self.maps_played += 1
+        self.power_curve.append(self.power_level)
     
@@ -0,0 +1,193 @@
+# This file holds the map topology analytics: path counts, path lengths, expected events per path and unreachable nodes of generated maps
+# Every measure is a dynamic programming pass over the layered DAG of a mapgraph.CompactMap, O(V + E) per map, instead of enumerating paths
+# Nodes are numbered step by step and connections only go from one step to the next, so node index order is already a topological order
+# analyze_ranges and sweep aggregate over many generated maps, spread over a process pool like the battle and campaign simulators
+
+import math
+import random
+from collections import Counter
+import mapgen
+import mapgraph
+import chunkpool
+
+COUNTED_EVENTS = ("battle", "choice", "treasure", "garage", "merchant")
+
+#-------------------------------------------------
+#SINGLE MAPS
+#-------------------------------------------------
+
+# Topology measures of one map, paths run from any node of the first step to the boss
+# Expected event counts are given for a path picked uniformly among all distinct paths, and for a player picking the start and every next node uniformly
+def analyze(compact_map):
+    nodes = compact_map.node_count
+    out_offsets, out_targets = compact_map.out_offsets, compact_map.out_targets
+    starts = compact_map.step(0) if compact_map.step_count else range(0)
+    boss = compact_map.step_offsets[-1] - 1 if compact_map.step_count and compact_map.event_type(compact_map.step_offsets[-1] - 1) == "boss" else None
+
+    # Forward pass: paths from the start, shortest and longest path into every node (in nodes), and random walk visit chances
+    paths_to = [0] * nodes
+    shortest = [0] * nodes
+    longest = [0] * nodes
+    visit_chance = [0.0] * nodes
+    for start in starts:
+        paths_to[start] = 1
+        shortest[start] = longest[start] = 1
+        visit_chance[start] = 1 / len(starts)
+    for node in range(nodes):
+        if not paths_to[node]:
+            continue
+        successors = out_targets[out_offsets[node]:out_offsets[node + 1]]
+        share = visit_chance[node] / len(successors) if successors else 0.0
+        for successor in successors:
+            paths_to[successor] += paths_to[node]
+            visit_chance[successor] += share
+            if not shortest[successor] or shortest[node] + 1 < shortest[successor]:
+                shortest[successor] = shortest[node] + 1
+            if longest[node] + 1 > longest[successor]:
+                longest[successor] = longest[node] + 1
+
+    # Backward pass: paths from every node to the boss
+    paths_from = [0] * nodes
+    if boss is not None:
+        paths_from[boss] = 1
+    for node in reversed(range(nodes)):
+        for successor in out_targets[out_offsets[node]:out_offsets[node + 1]]:
+            paths_from[node] += paths_from[successor]
+
+    total_paths = paths_to[boss] if boss is not None else 0
+    per_path = dict.fromkeys(COUNTED_EVENTS, 0.0)
+    random_walk = dict.fromkeys(COUNTED_EVENTS, 0.0)
+    for node in range(nodes):
+        event_type = compact_map.event_type(node)
+        if event_type in per_path:
+            if total_paths:
+                per_path[event_type] += paths_to[node] * paths_from[node] / total_paths
+            random_walk[event_type] += visit_chance[node]
+
+    grid_nodes = compact_map.map_width * compact_map.map_height
+    return {
+        "nodes": nodes,
+        "connections": len(out_targets),
+        "paths": total_paths,
+        "min_length": shortest[boss] if total_paths else 0,
+        "max_length": longest[boss] if total_paths else 0,
+        "expected_per_path": per_path,
+        "expected_random_walk": random_walk,
+        "unreachable": sum(1 for node in range(nodes) if not paths_to[node]),      # Kept nodes no start leads to
+        "dead_ends": sum(1 for node in range(nodes) if not paths_from[node]),      # Kept nodes that can't lead to the boss
+        "pruned_rate": 1 - (nodes - (boss is not None)) / grid_nodes if grid_nodes else 0.0,   # Grid positions generate_map dropped as never reached
+    }
+
+def analyze_map(game_map):
+    return analyze(mapgraph.CompactMap.from_map(game_map))
+
+# Generates and populates a map the same way Game.generate_new_map does, then analyzes it
+def generate_and_analyze(width, height, density):
+    new_map = mapgen.Map(width, height, density)
+    new_map.generate_map()
+    new_map.assign_events()
+    return analyze_map(new_map)
+
+#-------------------------------------------------
+#RESULT AGGREGATION
+#-------------------------------------------------
+
+# Aggregated map measures, lengths are value -> count histograms and path counts are kept as a histogram of their order of magnitude, since they grow exponentially with height
+class MapStats(chunkpool.Stats):
+    def __init__(self):
+        self.maps = 0
+        self.nodes = 0
+        self.connections = 0
+        self.path_magnitudes = Counter()           # floor(log10(paths)) -> maps
+        self.log_paths = 0.0                        # Sum of log10(paths), for the geometric mean
+        self.min_lengths = Counter()
+        self.max_lengths = Counter()
+        self.expected_per_path = dict.fromkeys(COUNTED_EVENTS, 0.0)
+        self.expected_random_walk = dict.fromkeys(COUNTED_EVENTS, 0.0)
+        self.unreachable = 0
+        self.dead_ends = 0
+        self.pruned_rate = 0.0
+
+    def add(self, result):
+        self.maps += 1
+        self.nodes += result["nodes"]
+        self.connections += result["connections"]
+        if result["paths"]:
+            magnitude = math.log10(result["paths"])
+            self.path_magnitudes[int(magnitude)] += 1
+            self.log_paths += magnitude
+        self.min_lengths[result["min_length"]] += 1
+        self.max_lengths[result["max_length"]] += 1
+        for event_type in COUNTED_EVENTS:
+            self.expected_per_path[event_type] += result["expected_per_path"][event_type]
+            self.expected_random_walk[event_type] += result["expected_random_walk"][event_type]
+        self.unreachable += result["unreachable"]
+        self.dead_ends += result["dead_ends"]
+        self.pruned_rate += result["pruned_rate"]
+
+    def merge(self, other):
+        self.maps += other.maps
+        self.nodes += other.nodes
+        self.connections += other.connections
+        self.path_magnitudes.update(other.path_magnitudes)
+        self.log_paths += other.log_paths
+        self.min_lengths.update(other.min_lengths)
+        self.max_lengths.update(other.max_lengths)
+        for event_type in COUNTED_EVENTS:
+            self.expected_per_path[event_type] += other.expected_per_path[event_type]
+            self.expected_random_walk[event_type] += other.expected_random_walk[event_type]
+        self.unreachable += other.unreachable
+        self.dead_ends += other.dead_ends
+        self.pruned_rate += other.pruned_rate
+        return self
+
+    def summary(self):
+        maps = self.maps or 1
+        return {
+            "maps": self.maps,
+            "mean_nodes": self.nodes / maps,
+            "mean_connections": self.connections / maps,
+            "paths_geometric_mean": 10 ** (self.log_paths / sum(self.path_magnitudes.values())) if self.path_magnitudes else 0.0,
+            "paths_magnitudes": dict(sorted(self.path_magnitudes.items())),
+            "min_length": self.describe(self.min_lengths),
+            "max_length": self.describe(self.max_lengths),
+            "expected_per_path": {event_type: total / maps for event_type, total in self.expected_per_path.items()},
+            "expected_random_walk": {event_type: total / maps for event_type, total in self.expected_random_walk.items()},
+            "unreachable_rate": self.unreachable / self.nodes if self.nodes else 0.0,
+            "dead_end_rate": self.dead_ends / self.nodes if self.nodes else 0.0,
+            "pruned_rate": self.pruned_rate / maps,
+        }
+
+#-------------------------------------------------
+#PROCESS POOL
+#-------------------------------------------------
+
+# Worker entry point, generates and analyzes a chunk of maps with sizes drawn from the ranges, (low, high) with high included
+def run_map_chunk(maps, width_range, height_range, density_range, seed):
+    random.seed(seed)
+    stats = MapStats()
+    for _ in range(maps):
+        width = random.randint(*width_range)
+        height = random.randint(*height_range)
+        density = round(random.uniform(*density_range), 2)
+        stats.add(generate_and_analyze(width, height, density))
+    return stats
+
+# Analyzes the given amount of maps with sizes drawn from the ranges, the defaults are the ranges Game draws its maps from
+# Chunks are merged as they finish with at most two per worker in flight, so millions of maps never sit in memory, workers=1 runs in the current process
+def analyze_ranges(maps=10000, width_range=(4, 8), height_range=(10, 18), density_range=(0.2, 0.5), workers=None, chunk_size=500, seed=None):
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+    chunks = [(min(chunk_size, maps - start), width_range, height_range, density_range, base_seed + index) for index, start in enumerate(range(0, maps, chunk_size))]
+    return chunkpool.run_chunks(run_map_chunk, chunks, MapStats(), workers)
+
+# Analyzes maps_per_setting maps for every (width, height, density) setting, returns {setting: MapStats}
+def sweep(settings, maps_per_setting=1000, workers=None, chunk_size=500, seed=None):
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+    return {(width, height, density): analyze_ranges(maps_per_setting, (width, width), (height, height), (density, density), workers, chunk_size, base_seed + index * 100003)
+            for index, (width, height, density) in enumerate(settings)}
+
+#Map analytics testing, summarizes maps in Game's ranges and a small sweep over density
+if __name__ == "__main__":
+    print(analyze_ranges(maps=2000).summary())
+    for setting, stats in sweep([(6, 14, density) for density in (0.2, 0.35, 0.5)], maps_per_setting=500).items():
+        print(setting, stats.summary())
@@ -1,9 +1,10 @@
 import random
 import objs
 import defs
-from copy import deepcopy
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+import enemyai
+import profiling
+import eventbus
+from collections import deque
 
 # Event parent class
 class Event():
@@ -23,23 +24,28 @@ class Event():
     def resolve(self):
         self.execute()
         if self.next:
-            self.next.execute()
+            self.next.resolve()
         pass
 
 # Subclass for regular battle events
 class Battle(Event):
-    def __init__(self, name, rank_odds_dict, next = None):
+    def __init__(self, name, rank_odds_dict, next = None, ai_tier = None):
         super().__init__(name, next)
-        self.part_rank_odds = rank_odds_dict
-        self.enemy = self.create_enemy_vehicle()
+        self.part_rank_odds = defs.static_sampler(rank_odds_dict)
+        with profiling.span("create_enemy_vehicle"):
+            self.enemy = self.create_enemy_vehicle()
+        if ai_tier:                             # Search based enemy policy of the given enemyai tier, instead of the heuristic one
+            self.enemy.ai = enemyai.for_tier(ai_tier)
     
     # Enemy creation function
     def create_enemy_vehicle(self):
         # Select random chassis
         chassis_rank = defs.dynamic_weighted_choice(self.part_rank_odds)
-        chassis_list = [part for part in objs.part_list if part.type == "chassis" and part.rank == chassis_rank]
-        chassis = random.choice(chassis_list)
-        enemy_vehicle = objs.Vehicle("Enemy Vehicle", "Enemy", [deepcopy(chassis)])
+        chassis_options = objs.part_catalog.find("chassis", chassis_rank)
+        if not chassis_options:                 # No chassis of that rank in the catalog yet, any chassis will do
+            chassis_options = objs.part_catalog.find("chassis")
+        chassis = random.choice(chassis_options)
+        enemy_vehicle = objs.Vehicle("Enemy Vehicle", "Enemy", [chassis.instantiate()])
 
         # Add random parts to enemy vehicle according to the current part rank probabilities
         tech_points_used = 0
@@ -49,13 +55,11 @@ class Battle(Event):
         for part_type, slots in slot_items:
             for _ in range(slots):
                 part_rank = defs.dynamic_weighted_choice(self.part_rank_odds)
-                parts = [part for part in objs.part_list if part.rank == part_rank and part.type == part_type and part.tech_points + tech_points_used <= chassis.tech_points]
-                if parts:
-                    part = random.choice(parts)
-                    enemy_vehicle.add_part(deepcopy(part))
+                part = objs.part_catalog.random_part(part_type, part_rank, chassis.tech_points - tech_points_used)
+                if part:
+                    enemy_vehicle.add_part(part)
                     tech_points_used += part.tech_points
-        enemy_vehicle.reset_stats()
-        enemy_vehicle.calculate_stats()
+        profiling.count("part_instances", len(enemy_vehicle.parts))
         return enemy_vehicle
 
     def rewards(self):
@@ -63,7 +67,8 @@ class Battle(Event):
     
     #execute
     def execute(self):
-        defs.battle(self.player, self.enemy)
+        with profiling.span("battle"):
+            defs.fight(self.player, self.enemy)
         self.rewards()
 
 # Subclass for multiple choice events, the choices parameter will be a dictionary where keys are the choice flavor texts and the values are the associated consequences    
@@ -71,13 +76,21 @@ class Choice(Event):
     def __init__(self, name, flavor_text, choices, next = None):
         super().__init__(name, next)
         self.flavor_text = flavor_text          # The event's flavor text explaining what is happening and giving context
-        self.choices = choices                  # The choices the player can make given the context, with associated effects
+        self.choices = choices                  # The choices the player can make given the context, with associated effects (an event, a function building one, or None)
 
     def present_choice(self):
         choices = [key for key in self.choices.keys()]                          # Convert choices dictionary keys into list so it cna be fed into select_option_from_list function
         outcome = defs.select_option_from_list(choices, self.flavor_text)
-        if type(self.choices[outcome] == Event):                                # Check if value of chosen key is another event object to set it as next
-            self.next = self.choices[outcome]
+        if outcome is None:                                                     # Skipped, leave without taking any of the choices
+            return
+        result = self.choices[outcome]
+        if callable(result):                                                    # Outcomes can be given as functions building the event, so only the chosen one is ever built
+            result = result()
+        if isinstance(result, Event):                                           # Check if value of chosen key is another event object to set it as next
+            self.next = result
+
+    def execute(self):
+        self.present_choice()
 
 # Subclass for vehicle editing
 class Garage(Event):
@@ -125,7 +138,7 @@ class Boss(Event):
     
     #execute
     def execute(self):
-        defs.battle(self.player, self.boss_vehicle)
+        defs.fight(self.player, self.boss_vehicle)
         self.rewards()
 
 # Subclass for item rewards
@@ -141,10 +154,9 @@ class Treasure(Event):
     # Helper function to trim dict probabilities based on rank_floor or rank_ceiling
     def trim_ranks(self, dict):
         rank_indices = [r for r in dict.keys()]
-        for key in dict.keys():
-            if self.rank_floor and rank_indices.index(key) < rank_indices.index(self.rank_floor) or self.rank_ceiling and rank_indices.index(key) > rank_indices.index(self.rank_ceiling):
-                dict.remove(key)
-        return dict
+        floor_index = rank_indices.index(self.rank_floor) if self.rank_floor else 0
+        ceiling_index = rank_indices.index(self.rank_ceiling) if self.rank_ceiling else len(rank_indices) - 1
+        return {key: value for index, (key, value) in enumerate(dict.items()) if floor_index <= index <= ceiling_index}
 
     # Logic for players choosing to open or skip the treasure
     def open_choice(self):
@@ -155,41 +167,35 @@ class Treasure(Event):
 
         if choice == "Open treasure":
 
-            possible_rewards = []
-
-            # Filter parts by criteria
-            for part in objs.part_list:
-                if (self.part_type is None or part.type == self.part_type) and part.rank >= self.rank_floor and part.rank <= self.rank_ceiling:
-                    possible_rewards.append(part)
-            
-            # Establish a trimmed rank odds dictionary based on rank floor and ceiling
-            odds_dict = deepcopy(self.rank_odds_dict)
+            # Establish a trimmed rank odds sampler based on rank floor and ceiling
+            odds_dict = defs.static_sampler(self.rank_odds_dict)
             if self.rank_floor or self.rank_ceiling:
-                odds_dict = self.trim_ranks(odds_dict)
+                odds_dict = defs.AliasSampler(self.trim_ranks(odds_dict))
 
             if self.player_chooses:
                 # Let player select from random subset
                 subset = []
                 for _ in range(3):
                     chosen_rank = defs.dynamic_weighted_choice(odds_dict)
-                    rank_sublist = [part for part in possible_rewards if part.rank == chosen_rank]
-                    chosen_reward = random.choice(rank_sublist)
-                    while chosen_reward in subset:
-                        chosen_reward = random.choice(rank_sublist)
-                    subset.append(chosen_reward)
-                reward = defs.select_option_from_list(subset, "Select your reward:")
+                    # Only parts not offered yet, ranks without any left are skipped
+                    rank_sublist = [part for part in objs.part_catalog.find(self.part_type, chosen_rank) if part not in subset]
+                    if rank_sublist:
+                        subset.append(random.choice(rank_sublist))
+                reward = defs.select_option_from_list(subset, "Select your reward:") if subset else None
 
             else:
                 # Randomly choose reward
                 chosen_rank = defs.dynamic_weighted_choice(odds_dict)
-                rank_sublist = [part for part in possible_rewards if part.rank == chosen_rank]
-                reward = random.choice(rank_sublist)
+                rank_sublist = objs.part_catalog.find(self.part_type, chosen_rank)
+                reward = random.choice(rank_sublist) if rank_sublist else None
 
             # Give reward to player
             if reward:
-                # Add deep copy to inventory
-                defs.inventory[reward.type].append(deepcopy(reward)) 
-                print(f"You received a {reward.name}!")
+                # Add an instance of the reward to inventory
+                defs.inventory.add(reward.instantiate())
+                eventbus.emit("reward", reward.name)
+            else:
+                eventbus.emit("treasure_empty")
 
         else:
             print("Leaving treasure untouched.")
@@ -206,6 +212,8 @@ class Merchant(Event):
 
 # Path node class, including a list for which other nodes it is connected to, and a type attribute
 class Node():
+    __slots__ = ("x", "y", "active", "connections_to", "connections_from", "connect_right", "connect_left", "type")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -221,8 +229,9 @@ class Node():
 
 # Map class for creating, populating, connecting and defining path nodes
 class Map():
-    def __init__(self, map_width, map_height, density_min):
+    def __init__(self, map_width, map_height, density_min, rng=None):
         self.map = []
+        self.random = rng or random             # Source of every roll made while generating, a random.Random instance keeps generation off the shared module state
         self.map_width = map_width
         self.map_height = map_height
         self.density_min = density_min
@@ -250,13 +259,16 @@ class Map():
     
     # Helper function for checking if a node rolls a special_event and there is already the same special event in an incoming connecting node, reroll until it doesn't
     def reroll_until_no_adjacent_special_node(self, node, special_event_list, curr_odds):
+        rolls = 0
         while True:
-            event_type = defs.dynamic_weighted_choice(curr_odds)
+            rolls += 1
+            event_type = defs.dynamic_weighted_choice(curr_odds, self.random)
             if event_type in special_event_list:
                 if self.prevent_subsequent_special_events(node, event_type):
                     break
             else:
                 break
+        profiling.count("event_rolls", rolls)
         return event_type
 
     # Helper function for adjusting odds of non-chosen special events
@@ -267,53 +279,60 @@ class Map():
 
     # Function for generating connections to the next step
     def generate_connections(self, node_list, next_step):
-        next_index = self.map.index(next_step) + 1
-        # Check if last step
-        if next_index == len(self.map):
-            return
         # Shuffle node order while preserving indices, to remove left to right bias during generation
         nodes = list(enumerate(node_list)) 
-        random.shuffle(nodes)
+        self.random.shuffle(nodes)
         nodes = [n[1] for n in nodes]
         for node in nodes:
             # Only process the node if it has incoming connections or has been set to active randomly on the first step
             if not node.active:
                 continue
             i = node.x
-            random_density = round(random.uniform(self.density_min, self.density_max), 2)
+            random_density = round(self.random.uniform(self.density_min, self.density_max), 2)
             left = next_step[i-1] if i > 0 else None
             up = next_step[i]
             right = next_step[i+1] if i < len(next_step) - 1 else None
 
             # Loop until at least one connection is made
             while not node.connections_to:
+                profiling.count("connection_rolls")
                 # Check if not left extremity, or if left adjacent node does not have a right connection
-                if left and random.random() < random_density and not node_list[i - 1].connect_right:
+                if left and self.random.random() < random_density and not node_list[i - 1].connect_right:
                     self.connect_nodes(node, left)
                     node.connect_left = True  
-                if right and random.random() < random_density and not node_list[i + 1].connect_left:
+                if right and self.random.random() < random_density and not node_list[i + 1].connect_left:
                     self.connect_nodes(node, right)
                     node.connect_right = True                       
-                if random.random() < random_density:
+                if self.random.random() < random_density:
                     self.connect_nodes(node, up)
 
+    # Randomly assigns an event type to a node, updating the running odds
+    def assign_event(self, node, special_events, current_odds):
+        # ignore node if it already has an assigned type (prevents reassigning boss node)
+        if node.type:
+            return
+        event_type = self.reroll_until_no_adjacent_special_node(node, special_events, current_odds)
+        node.type = event_type
+        # If the chosen type was in special_events, reset their odds to base, to avoid overpopulating the map with these node types
+        if event_type and event_type in special_events:
+            current_odds[event_type] = self.event_odds[event_type]
+        # Increase odds of all special_events until they are rolled (excludes current node type if it rolled a special_events type)
+        self.adjust_special_event_odds(event_type, special_events, current_odds)
+
     # Randomly assigns event types to each node in the created map
     def assign_events(self):
         special_events = ["treasure", "merchant", "garage"]
-        current_odds = deepcopy(self.event_odds)
+        current_odds = defs.FenwickSampler(self.event_odds)
         for step in self.map:
             for node in step:
-                # ignore iteration if node already has an assigned type (prevents reassigning boss node)
-                if node.type:
-                    continue
-                event_type = self.reroll_until_no_adjacent_special_node(node, special_events, current_odds)
-                node.type = event_type
-                # If the chosen type was in special_events, reset their odds to base, to avoid overpopulating the map with these node types
-                if event_type and event_type in special_events:
-                    current_odds[event_type] = self.event_odds[event_type]
-                # Increase odds of all special_events until they are rolled (excludes current node type if it rolled a special_events type)
-                self.adjust_special_event_odds(event_type, special_events, current_odds)
-                
+                self.assign_event(node, special_events, current_odds)
+
+    # Roll a random number between 2 and map_width (1 for single column maps), and activate that amount of nodes from the first step
+    def activate_first_nodes(self, first_step):
+        first_node_amount = self.random.randint(min(2, len(first_step)), len(first_step))
+        for node in self.random.sample(first_step, first_node_amount):
+            node.active = True
+
 
     # Main function for generating a new map
     def generate_map(self):
@@ -328,12 +347,8 @@ class Map():
             self.map.append([])
             generate_nodes(self.map[-1], self.map_width)
         
-        # Roll a random number between 2 and map_width, select that amount of nodes from the lowest index list, then generate connections to the next index list randomly, avoiding criss crossing
-        first_node_amount = random.randint(2, self.map_width)
-        first_nodes = random.sample(self.map[0], first_node_amount)
-        for node in first_nodes:
-            if node in self.map[0]:
-                node.active = True
+        # Activate a random selection of nodes from the lowest index list, then generate connections to the next index list randomly, avoiding criss crossing
+        self.activate_first_nodes(self.map[0])
         # Create final boss step and node
         boss_node = Node(self.map_width // 2, len(self.map))
         boss_node.type = "boss"
@@ -354,68 +369,91 @@ class Map():
             else:
                 step[:] = [node for node in step if node.connections_from]        
 
-    def visualize_map(self):
-        # Create a new figure for the visualization
-        fig, ax = plt.subplots()
-
-        # Define a dictionary to map event types to symbols or colors
-        event_type_symbols = {
-            "battle": "ro",   # Red circles for battles
-            "choice": "bs",   # Blue squares for choices
-            "treasure": "g^", # Green triangles for treasures
-            "garage": "yp",   # Yellow pentagons for garages
-            "merchant": "cv", # Cyan diamonds for merchants
-            "boss": "ms"      # Magenta stars for Boss nodes
-        }
-
-        for _, step in enumerate(self.map):
-            for node in step:
-                # Use the appropriate symbol or color based on the node's event type
-                symbol = event_type_symbols.get(node.type, "wo")  # Default to white circles for unknown types
-
-                # Plot the node with the chosen symbol
-                ax.plot(node.x, node.y, symbol, markersize=8, label=node.type)
-
-                # Plot connections to other nodes (excluding Boss nodes)
-                if node.type != "Boss":
-                    for connected_node in node.connections_to:
-                        ax.plot([node.x, connected_node.x], [node.y, connected_node.y], "b-")
-
-        # Set axis limits to fit the entire plot within the figure (approximately 80% zoom out)
-        x_min = -3  # Adjust as needed
-        x_max = self.map_width + 3  # Adjust as needed
-        y_min = -3  # Adjust as needed
-        y_max = self.map_height + 3  # Adjust as needed
-        ax.set_xlim(x_min, x_max)
-        ax.set_ylim(y_min, y_max)
-
-        # Set axis limits and labels as needed
-        ax.set_xlim(0, self.map_width)
-        ax.set_ylim(0, self.map_height)
-        ax.set_xlabel("X")
-        ax.set_ylabel("Y")
-
-        # Create custom legend elements for event types and densities
-        legend_elements = [
-            mpatches.Patch(color=symbol[0], label=event_type) for event_type, symbol in event_type_symbols.items()
-        ]
-
-        # Additional legend elements for map information
-        map_info_elements = [
-            mpatches.Patch(color="white", label=f"Map width: {self.map_width}"),
-            mpatches.Patch(color="white", label=f"Map height: {self.map_height}"),
-            mpatches.Patch(color="white", label=f"Map min density: {self.density_min}"),
-            mpatches.Patch(color="white", label=f"Map max density: {self.density_max}")
-        ]
-
-        # Combine the legend elements
-        legend_elements.extend(map_info_elements)
-
-        # Add a legend to the plot
-        ax.legend(handles=legend_elements, title="Event Types and Map Information")
-
-        # Show the visualization
-        plt.show()
+    # Step y of the map, a Map is generated whole so this only looks it up, StreamingMap generates its steps when they are asked for
+    def step(self, y):
+        return self.map[y]
+
+    # Shows the map with a maprender renderer, by default a matplotlib window, maprender is only imported here
+    def visualize_map(self, renderer=None):
+        import maprender
+        (renderer or maprender.MatplotlibRenderer()).display(self)
+
+# Map generated a step at a time as the player advances, keeping only a bounded window of finished steps in memory
+# Steps follow the same connection, no-crossing and event rules as Map.generate_map, a map_height of None makes an endless map without a boss step
+class StreamingMap(Map):
+    def __init__(self, map_width, map_height, density_min, window_size=32, rng=None):
+        super().__init__(map_width, map_height, density_min, rng)
+        self.window_size = window_size
+        self.map = deque()                              # Finished steps still in the window, oldest first
+        self.offset = 0                                 # Step index (y) of the oldest step in the window
+        self.finished = False                           # Whether the boss step has been generated
+        self.special_events = ["treasure", "merchant", "garage"]
+        self.current_odds = defs.FenwickSampler(self.event_odds)
+        self.step_generator = self.generate_steps()
+
+    # Total amount of steps generated so far
+    @property
+    def generated_height(self):
+        return self.offset + len(self.map)
+
+    # Generator producing finished steps in order: connections to the next step made, unreachable nodes removed and events assigned
+    def generate_steps(self):
+        y = 0
+        current_step = [Node(x, 0) for x in range(self.map_width)]
+        self.activate_first_nodes(current_step)
+        while self.map_height is None or y < self.map_height - 1:
+            next_step = [Node(x, y + 1) for x in range(self.map_width)]
+            self.generate_connections(current_step, next_step)
+            yield self.finish_step(current_step, y == 0)
+            current_step = next_step
+            y += 1
+        # Connect boss node to all active nodes in the last step
+        boss_node = Node(self.map_width // 2, y + 1)
+        boss_node.type = "boss"
+        for node in current_step:
+            if node.active:
+                self.connect_nodes(node, boss_node)
+        yield self.finish_step(current_step, y == 0)
+        self.finished = True
+        yield [boss_node]
+
+    # Removes nodes the same way generate_map's clean up does and assigns their events
+    def finish_step(self, step, first):
+        if first:
+            step = [node for node in step if node.connections_to]
+        else:
+            step = [node for node in step if node.connections_from]
+        for node in step:
+            self.assign_event(node, self.special_events, self.current_odds)
+        return step
+
+    # Generates steps until step y is finished, then returns it; raises IndexError for steps that left the window or lie past the boss
+    def step(self, y):
+        while not self.finished and y >= self.generated_height:
+            try:
+                self.map.append(next(self.step_generator))
+            except StopIteration:
+                self.finished = True
+                break
+            if len(self.map) > self.window_size:
+                self.map.popleft()
+                self.offset += 1
+                # Drop links back into the evicted step, so it can be freed
+                for node in self.map[0]:
+                    node.connections_from = []
+        if not self.offset <= y < self.generated_height:
+            raise IndexError(f"Step {y} is not in the generated window ({self.offset} to {self.generated_height - 1})")
+        return self.map[y - self.offset]
+
+    # Iterates over the steps from the oldest one in the window, generating them as needed
+    def __iter__(self):
+        y = self.offset
+        while not (self.finished and y >= self.generated_height):
+            try:
+                yield self.step(y)
+            except IndexError:
+                return
+            y += 1
 
 #Map generation testing, uncomment to test
 #maptest = Map(random.randint(4,8), random.randint(10,18), round(random.uniform(0.2, 0.6), 2))
@@ -0,0 +1,97 @@
+# This file holds the compact map storage: node data in flat arrays and connections as CSR adjacency in both directions
+# Nodes are numbered step by step in the same order as Map.map, so step i holds the nodes from step_offsets[i] to step_offsets[i + 1]
+
+from array import array
+import mapgen
+
+# Event types stored as small integer codes, the empty string is a node without an assigned event
+EVENT_TYPES = ("", "battle", "choice", "treasure", "garage", "merchant", "boss")
+EVENT_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+
+# Node flag bits
+ACTIVE = 1
+CONNECT_LEFT = 2
+CONNECT_RIGHT = 4
+
+class CompactMap():
+    def __init__(self, map_width, map_height, density_min, xs, ys, types, flags, step_offsets, out_offsets, out_targets, in_offsets, in_sources):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.density_min = density_min
+        self.xs = xs                                    # Node x coordinates
+        self.ys = ys                                    # Node y coordinates
+        self.types = types                              # Event type codes, see EVENT_TYPES
+        self.flags = flags                              # ACTIVE, CONNECT_LEFT and CONNECT_RIGHT bits
+        self.step_offsets = step_offsets                # First node index of every step, plus the node count at the end
+        self.out_offsets = out_offsets                  # connections_to of node i are out_targets[out_offsets[i]:out_offsets[i + 1]]
+        self.out_targets = out_targets
+        self.in_offsets = in_offsets                    # connections_from of node i are in_sources[in_offsets[i]:in_offsets[i + 1]]
+        self.in_sources = in_sources
+
+    # Converts a Map (or the window of a StreamingMap) into flat arrays, links to nodes outside the map are left out
+    @classmethod
+    def from_map(cls, game_map):
+        nodes = [node for step in game_map.map for node in step]
+        index = {id(node): position for position, node in enumerate(nodes)}
+        step_offsets = array("i", [0])
+        for step in game_map.map:
+            step_offsets.append(step_offsets[-1] + len(step))
+
+        def adjacency(connections):
+            offsets = array("i", [0])
+            targets = array("i")
+            for node in nodes:
+                targets.extend(index[id(other)] for other in connections(node) if id(other) in index)
+                offsets.append(len(targets))
+            return offsets, targets
+
+        out_offsets, out_targets = adjacency(lambda node: node.connections_to)
+        in_offsets, in_sources = adjacency(lambda node: node.connections_from)
+        return cls(
+            game_map.map_width, game_map.map_height, game_map.density_min,
+            array("i", [node.x for node in nodes]),
+            array("i", [node.y for node in nodes]),
+            array("b", [EVENT_CODES[node.type] for node in nodes]),
+            array("b", [node.active * ACTIVE | node.connect_left * CONNECT_LEFT | node.connect_right * CONNECT_RIGHT for node in nodes]),
+            step_offsets, out_offsets, out_targets, in_offsets, in_sources,
+        )
+
+    # Rebuilds a regular Map with Node objects, the inverse of from_map
+    def to_map(self):
+        game_map = mapgen.Map(self.map_width, self.map_height, self.density_min)
+        nodes = []
+        for position in range(self.node_count):
+            node = mapgen.Node(self.xs[position], self.ys[position])
+            node.type = EVENT_TYPES[self.types[position]]
+            node.active = bool(self.flags[position] & ACTIVE)
+            node.connect_left = bool(self.flags[position] & CONNECT_LEFT)
+            node.connect_right = bool(self.flags[position] & CONNECT_RIGHT)
+            nodes.append(node)
+        for position, node in enumerate(nodes):
+            node.connections_to = [nodes[target] for target in self.successors(position)]
+            node.connections_from = [nodes[source] for source in self.predecessors(position)]
+        game_map.map = [nodes[self.step_offsets[step]:self.step_offsets[step + 1]] for step in range(self.step_count)]
+        return game_map
+
+    @property
+    def node_count(self):
+        return len(self.xs)
+
+    @property
+    def step_count(self):
+        return len(self.step_offsets) - 1
+
+    def step(self, step):                               # Node indices of a step
+        return range(self.step_offsets[step], self.step_offsets[step + 1])
+
+    def successors(self, node):                         # Node indices of a node's connections_to
+        return self.out_targets[self.out_offsets[node]:self.out_offsets[node + 1]]
+
+    def predecessors(self, node):                       # Node indices of a node's connections_from
+        return self.in_sources[self.in_offsets[node]:self.in_offsets[node + 1]]
+
+    def event_type(self, node):
+        return EVENT_TYPES[self.types[node]]
+
+    def __repr__(self):
+        return f"CompactMap({self.map_width}x{self.map_height}, {self.node_count} nodes, {len(self.out_targets)} connections)"
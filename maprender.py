@@ -0,0 +1,207 @@
+# This file holds the map renderers: a terminal ASCII renderer, a dependency free SVG writer and a matplotlib renderer
+# matplotlib is only imported when a MatplotlibRenderer is created, so importing mapgen or this file stays cheap, mapgen itself only imports this file when visualize_map is called
+# Every renderer draws a Map (or the window of a StreamingMap) with render(), writes it to a file with write() and shows it with display(), and render_batch() writes many maps reusing one renderer
+
+import os
+import random
+from abc import ABC, abstractmethod
+import mapgen
+
+# Drawing style of every event type: ASCII character, SVG color, matplotlib marker
+EVENT_STYLES = {
+    "battle": ("B", "red", "ro"),
+    "choice": ("C", "blue", "bs"),
+    "treasure": ("T", "green", "g^"),
+    "garage": ("G", "gold", "yp"),
+    "merchant": ("M", "cyan", "cv"),
+    "boss": ("X", "magenta", "ms"),
+}
+UNASSIGNED_STYLE = ("o", "white", "wo")
+
+def event_style(event_type):
+    return EVENT_STYLES.get(event_type, UNASSIGNED_STYLE)
+
+# Renderer interface, render returns the drawing, write saves it to a file and display shows it to the player, by printing it unless overridden
+class Renderer(ABC):
+    extension = ""
+
+    @abstractmethod
+    def render(self, game_map):
+        pass
+
+    def write(self, game_map, path):
+        with open(path, "w") as file:
+            file.write(self.render(game_map))
+
+    def display(self, game_map):
+        print(self.render(game_map))
+
+#-------------------------------------------------
+#ASCII
+#-------------------------------------------------
+
+# Text drawing with the boss step at the top, one row per step and a row of connections between steps
+# Node x sits in column 2x, so connections up are "|" in the same column and diagonal ones "/" or "\" in the column between the two nodes
+# Connections spanning more than one column (into the boss node) are marked with "|" above their start node
+class AsciiRenderer(Renderer):
+    extension = ".txt"
+
+    def __init__(self, legend=True):
+        self.legend = legend
+
+    def render(self, game_map):
+        width = 2 * max((node.x for step in game_map.map for node in step), default=0) + 1
+        rows = []
+        for step in game_map.map:
+            node_row = [" "] * width
+            link_row = [" "] * width
+            for node in step:
+                node_row[2 * node.x] = event_style(node.type)[0]
+                for target in node.connections_to:
+                    if target.x == node.x + 1:
+                        link_row[2 * node.x + 1] = "/"
+                    elif target.x == node.x - 1:
+                        link_row[2 * node.x - 1] = "\\"
+                    else:
+                        link_row[2 * node.x] = "|"
+            rows.append("".join(node_row).rstrip())
+            rows.append("".join(link_row).rstrip())
+        lines = [row for row in reversed(rows)]
+        while lines and not lines[0]:
+            lines.pop(0)
+        if self.legend:
+            lines.append("")
+            lines.append("  ".join(f"{style[0]} {event_type}" for event_type, style in EVENT_STYLES.items()))
+        return "\n".join(lines) + "\n"
+
+#-------------------------------------------------
+#SVG
+#-------------------------------------------------
+
+# Standalone SVG document, nodes as colored circles over their connection lines, with the boss step at the top
+class SvgRenderer(Renderer):
+    extension = ".svg"
+
+    def __init__(self, cell_size=40, radius=10, margin=30):
+        self.cell_size = cell_size
+        self.radius = radius
+        self.margin = margin
+
+    def render(self, game_map):
+        steps = len(game_map.map)
+        columns = max((node.x for step in game_map.map for node in step), default=0) + 1
+        width = 2 * self.margin + (columns - 1) * self.cell_size
+        height = 2 * self.margin + max(steps - 1, 0) * self.cell_size
+        first_y = game_map.map[0][0].y if steps and game_map.map[0] else 0
+        position = lambda node: (self.margin + node.x * self.cell_size, height - self.margin - (node.y - first_y) * self.cell_size)
+
+        lines = []
+        circles = []
+        for step in game_map.map:
+            for node in step:
+                x, y = position(node)
+                for target in node.connections_to:
+                    target_x, target_y = position(target)
+                    lines.append(f'<line x1="{x}" y1="{y}" x2="{target_x}" y2="{target_y}"/>')
+                circles.append(f'<circle cx="{x}" cy="{y}" r="{self.radius}" fill="{event_style(node.type)[1]}"><title>{node.type or "unassigned"} ({node.x}, {node.y})</title></circle>')
+        return "\n".join([
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+            f'<rect width="{width}" height="{height}" fill="white"/>',
+            '<g stroke="steelblue" stroke-width="2">', *lines, '</g>',
+            '<g stroke="black" stroke-width="1">', *circles, '</g>',
+            '</svg>',
+        ]) + "\n"
+
+#-------------------------------------------------
+#MATPLOTLIB
+#-------------------------------------------------
+
+# Plot of the map with an event type and map information legend, matplotlib is imported when the renderer is created
+# Files are drawn on one reused Figure without pyplot, display() opens a pyplot window instead
+class MatplotlibRenderer(Renderer):
+    extension = ".png"
+
+    def __init__(self, dpi=100):
+        from matplotlib.figure import Figure
+        import matplotlib.patches as mpatches
+        self.patches = mpatches
+        self.figure = Figure()
+        self.axes = self.figure.subplots()
+        self.dpi = dpi
+
+    def draw(self, game_map, axes):
+        axes.clear()
+        for step in game_map.map:
+            for node in step:
+                # Plot the node with the symbol of its event type, then its connections to other nodes
+                axes.plot(node.x, node.y, event_style(node.type)[2], markersize=8, label=node.type)
+                for connected_node in node.connections_to:
+                    axes.plot([node.x, connected_node.x], [node.y, connected_node.y], "b-")
+
+        axes.set_xlim(0, game_map.map_width)
+        axes.set_ylim(0, game_map.map_height)
+        axes.set_xlabel("X")
+        axes.set_ylabel("Y")
+
+        # Legend of the event types, followed by the map information
+        legend_elements = [self.patches.Patch(color=style[2][0], label=event_type) for event_type, style in EVENT_STYLES.items()]
+        legend_elements += [
+            self.patches.Patch(color="white", label=f"Map width: {game_map.map_width}"),
+            self.patches.Patch(color="white", label=f"Map height: {game_map.map_height}"),
+            self.patches.Patch(color="white", label=f"Map min density: {game_map.density_min}"),
+            self.patches.Patch(color="white", label=f"Map max density: {game_map.density_max}")
+        ]
+        axes.legend(handles=legend_elements, title="Event Types and Map Information")
+
+    def render(self, game_map):
+        self.draw(game_map, self.axes)
+        return self.figure
+
+    def write(self, game_map, path):
+        self.render(game_map).savefig(path, dpi=self.dpi)
+
+    def display(self, game_map):
+        import matplotlib.pyplot as plt
+        figure, axes = plt.subplots()
+        self.draw(game_map, axes)
+        plt.show()
+
+RENDERERS = {
+    "ascii": AsciiRenderer,
+    "svg": SvgRenderer,
+    "matplotlib": MatplotlibRenderer,
+}
+
+#-------------------------------------------------
+#BATCH RENDERING
+#-------------------------------------------------
+
+# Writes every map to directory as map_0000.svg, map_0001.svg and so on with the same renderer, returns the written paths
+def render_batch(maps, directory, renderer=None, name="map_{index:04d}"):
+    renderer = renderer or SvgRenderer()
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index, game_map in enumerate(maps):
+        path = os.path.join(directory, name.format(index=index) + renderer.extension)
+        renderer.write(game_map, path)
+        paths.append(path)
+    return paths
+
+# Generates and populates count maps with sizes drawn from the given ranges, one at a time as render_batch takes them
+def generated_maps(count, width_range=(4, 8), height_range=(10, 18), density_range=(0.2, 0.5)):
+    for _ in range(count):
+        new_map = mapgen.Map(random.randint(*width_range), random.randint(*height_range), round(random.uniform(*density_range), 2))
+        new_map.generate_map()
+        new_map.assign_events()
+        yield new_map
+
+# Renders generated maps from the command line: python maprender.py [count] [directory] [ascii|svg|matplotlib]
+if __name__ == "__main__":
+    import sys
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    directory = sys.argv[2] if len(sys.argv) > 2 else "maps"
+    renderer = RENDERERS[sys.argv[3] if len(sys.argv) > 3 else "svg"]()
+    if count == 1 and isinstance(renderer, AsciiRenderer):
+        print(renderer.render(next(generated_maps(1))))
+    else:
+        print(f"Wrote {len(render_batch(generated_maps(count), directory, renderer))} maps to {directory}")
@@ -0,0 +1,37 @@
+# Memory benchmark, measures how many bytes an enemy vehicle and a map node take up, run directly to print the results
+
+import random
+import tracemalloc
+import mapgen
+
+# Average allocated bytes per enemy vehicle, including its part and action instances
+def bytes_per_enemy_vehicle(count=2000):
+    rank_odds = {"starter": 1}
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    enemies = [mapgen.Battle("Battle", rank_odds).enemy for _ in range(count)]
+    for enemy in enemies:
+        enemy.actions                               # Materialize the per vehicle action copies, as a battle would
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used / len(enemies)
+
+# Average allocated bytes per node of generated and populated maps, including connection lists
+def bytes_per_map_node(maps=200, width=8, height=18, density=0.4):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    generated = []
+    for _ in range(maps):
+        new_map = mapgen.Map(width, height, density)
+        new_map.generate_map()
+        new_map.assign_events()
+        generated.append(new_map)
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    node_count = sum(len(step) for new_map in generated for step in new_map.map)
+    return used / node_count
+
+if __name__ == "__main__":
+    random.seed(0)
+    print(f"Bytes per enemy vehicle: {bytes_per_enemy_vehicle():.0f}")
+    print(f"Bytes per map node: {bytes_per_map_node():.0f}")
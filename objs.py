@@ -1,16 +1,19 @@
 # This file will hold all class definitions and instances
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import List, Optional
 from collections import OrderedDict
-from copy import deepcopy
+from operator import attrgetter
+from bisect import bisect_right
 import random
+import profiling
+import eventbus
 
 #-------------------------------------------------
 #CLASS DEFINITIONS
 #-------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class Action:
     name: str
     integrity_change: int = 0
@@ -20,7 +23,8 @@ class Action:
     energy_cost: int = 0
     available: bool = True
     curr_cooldown: int = 0
-    
+    curr_uses: int = field(init=False, repr=False)
+
     def __post_init__(self):
         self.curr_uses = self.max_uses
 
@@ -52,11 +56,44 @@ class Action:
             self.curr_uses -= 1
         if self.damage > 0:
             if target.dodged():                     #Checks for dodge before applying damage
-                print(f"The {target.name} dodged the {self.name}!\n")
+                eventbus.emit("dodge", target.name, self.name)
             else:
                 target.take_damage(self.damage)
 
-@dataclass
+    def instantiate(self):                          # Creates a live copy of the action for a vehicle, sharing this action as its template
+        return ActionInstance(self)
+
+# Live copy of an Action on a vehicle, only holds the state that changes in battle and reads everything else from the shared template
+class ActionInstance():
+    __slots__ = ("template", "available", "curr_cooldown", "curr_uses", "integrity_change", "damage")
+
+    def __init__(self, template, available=None, curr_cooldown=None, curr_uses=None):
+        self.template = template
+        self.available = template.available if available is None else available
+        self.curr_cooldown = template.curr_cooldown if curr_cooldown is None else curr_cooldown
+        self.curr_uses = template.curr_uses if curr_uses is None else curr_uses
+        self.integrity_change = template.integrity_change   # Kept per instance, since RAM! recalculates them on use
+        self.damage = template.damage
+
+    use = Action.use
+
+    def instantiate(self):                          # Copy of the instance, still sharing the same template
+        copy = ActionInstance(self.template, self.available, self.curr_cooldown, self.curr_uses)
+        copy.integrity_change = self.integrity_change
+        copy.damage = self.damage
+        return copy
+
+    def __deepcopy__(self, memo):                   # Templates are shared, so deep copies only duplicate the live state
+        profiling.count("deepcopies")
+        return self.instantiate()
+
+    def __repr__(self):
+        return f"Action(name={self.name!r}, integrity_change={self.integrity_change!r}, damage={self.damage!r}, cooldown={self.cooldown!r}, max_uses={self.max_uses!r}, energy_cost={self.energy_cost!r}, available={self.available!r}, curr_cooldown={self.curr_cooldown!r})"
+
+for _name in ("name", "cooldown", "max_uses", "energy_cost"):                       # Read-only access to the template's fields
+    setattr(ActionInstance, _name, property(attrgetter(f"template.{_name}")))
+
+@dataclass(slots=True, weakref_slot=True)                     # Weak references let catalogdb hand out the same template for as long as it is in use
 class Part:
     name: str
     type: str
@@ -70,23 +107,36 @@ class Part:
     energy_regen: int = 0
     action: Optional[Action] = None
     curr_integrity: int = field(init=False)
-    stats: Dict[str, int] = field(default_factory=dict)  
+
+    stat_fields = (                                 # Vehicle stat names paired with the part field they are summed from
+        ("integrity", "max_integrity"),
+        ("weight", "weight"),
+        ("speed", "speed"),
+        ("dodge", "dodge"),
+        ("energy_pool", "energy_pool"),
+        ("energy_regen", "energy_regen"),
+    )
 
     def __post_init__(self):
         self.curr_integrity = self.max_integrity
-        self.stats = {
-            "integrity": self.max_integrity,
-            "weight": self.weight,
-            "speed": self.speed,
-            "dodge": self.dodge,
-            "energy_pool": self.energy_pool,
-            "energy_regen": self.energy_regen,
-        }
+
+    @property                                       # Part stats as a dictionary, built from the fields on request instead of being stored on every part
+    def stats(self):
+        return {stat: getattr(self, field_name) for stat, field_name in self.stat_fields}
+
+    @property                                       # Part stats as a tuple in STAT_NAMES order, the delta a vehicle applies when the part is added or removed
+    def stat_vector(self):
+        return (self.max_integrity, self.weight, self.speed, self.dodge, self.energy_pool, self.energy_regen)
+
+    def instantiate(self):                          # Creates an inventory or build copy of the part, sharing this part as its template
+        return PartInstance(self)
 
     def __repr__(self):
         return f"{self.name}\nRank: {self.rank}\nTech Point cost: {self.tech_points}\nStats as Integrity | weight | speed | dodge | energy pool | energy regen | action\n{self.max_integrity} | {self.weight} | {self.speed} | {self.dodge}% | {self.energy_pool} | {self.energy_regen} | {self.action}\n"
 
 class Chassis(Part):
+    __slots__ = ("slots",)
+
     def __init__(self, name, type, rank, tech_points, slots, integrity, weight, speed=0, dodge=0, energy_pool=0, energy_regen=0, action=None):
         super().__init__(name, type, rank, tech_points, integrity, weight, speed, dodge, energy_pool, energy_regen, action)
         slot_names = ("wheels", "engine", "bumper", "item_mount", "turret")
@@ -95,62 +145,155 @@ class Chassis(Part):
     def __repr__(self):
         return f"{self.name}\nRank: {self.rank}\nTech Points: {self.tech_points}\nSlots: {self.slots['wheels']} wheels, {self.slots['engine']} engine, {self.slots['bumper']} bumper, {self.slots['item_mount']} item mount, {self.slots['turret']} turret\n Stats as Integrity | weight | speed | dodge | energy pool | energy regen | action\n{self.max_integrity} | {self.weight} | {self.speed} | {self.dodge}% | {self.energy_pool} | {self.energy_regen} | {self.action}\n"
 
-@dataclass
+# Copy of a Part held in an inventory or build, only holds its current integrity and reads everything else from the shared template
+class PartInstance():
+    __slots__ = ("template", "curr_integrity")
+
+    def __init__(self, template, curr_integrity=None):
+        self.template = template
+        self.curr_integrity = template.max_integrity if curr_integrity is None else curr_integrity
+
+    def instantiate(self):                          # Copy of the instance, still sharing the same template
+        return PartInstance(self.template, self.curr_integrity)
+
+    def __deepcopy__(self, memo):                   # Templates are shared, so deep copies only duplicate the live state
+        profiling.count("deepcopies")
+        return self.instantiate()
+
+    def __repr__(self):
+        return repr(self.template)
+
+for _name in ("name", "type", "rank", "tech_points", "max_integrity", "weight", "speed", "dodge", "energy_pool", "energy_regen", "action", "stats", "stat_vector", "slots"):
+    setattr(PartInstance, _name, property(attrgetter(f"template.{_name}")))
+
+# Fixed layout of vehicle stats: the part stats summed over the build, followed by the derived current energy and max integrity
+STAT_NAMES = tuple(stat for stat, _ in Part.stat_fields) + ("curr_energy", "max_integrity")
+STAT_INDEX = {stat: index for index, stat in enumerate(STAT_NAMES)}
+BASE_STAT_COUNT = len(Part.stat_fields)
+INTEGRITY = STAT_INDEX["integrity"]
+ENERGY_POOL = STAT_INDEX["energy_pool"]
+CURR_ENERGY = STAT_INDEX["curr_energy"]
+MAX_INTEGRITY = STAT_INDEX["max_integrity"]
+
+# Vehicle stats as a list in STAT_NAMES order, read and written by stat name like a dictionary
+class VehicleStats():
+    __slots__ = ("values",)
+
+    def __init__(self, values=None):
+        self.values = list(values) if values is not None else [0] * len(STAT_NAMES)
+
+    def __getitem__(self, stat):
+        return self.values[STAT_INDEX[stat]]
+
+    def __setitem__(self, stat, value):
+        self.values[STAT_INDEX[stat]] = value
+
+    def __contains__(self, stat):
+        return stat in STAT_INDEX
+
+    def __iter__(self):
+        return iter(STAT_NAMES)
+
+    def __len__(self):
+        return len(STAT_NAMES)
+
+    def get(self, stat, default=None):
+        return self.values[STAT_INDEX[stat]] if stat in STAT_INDEX else default
+
+    def keys(self):
+        return list(STAT_NAMES)
+
+    def items(self):
+        return list(zip(STAT_NAMES, self.values))
+
+    def update(self, stats):
+        for stat, value in stats.items():
+            self.values[STAT_INDEX[stat]] = value
+
+    def __eq__(self, other):
+        if isinstance(other, VehicleStats):
+            return self.values == other.values
+        return dict(self.items()) == other
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+@dataclass(slots=True)
 class Vehicle:
     name: str                                       # Vehicle name
     entity: str                                     # Player or Enemy
     parts: List[Part]                               # List of parts the build is comprised of
+    chassis: Part = field(init=False, repr=False, compare=False)
+    stats: VehicleStats = field(init=False, repr=False, compare=False)
+    alive: bool = field(init=False, repr=False, compare=False)
+    _totals: List[int] = field(init=False, repr=False, compare=False)
+    _action_copies: List[ActionInstance] = field(init=False, repr=False, compare=False)
+    ai: object = field(default=None, repr=False, compare=False)    # Enemy policy choosing actions in defs.enemy_turn (like enemyai.EnemyAI), None uses the heuristic
 
     def __post_init__(self):
         self.chassis = self.get_chassis_part()      # Retrieves the chassis from the parts list for easy access
-        self.stats = self.calculate_stats()         # Dictionary of stats the vehicle has, like integrity, weight, speed, dodge chance, etc. as a sum from all the equipped parts including chassis
+        self.stats = VehicleStats()                 # Stats the vehicle has, like integrity, weight, speed, dodge chance, etc. as a sum from all the equipped parts including chassis
+        self.calculate_stats()
         self.alive = True                           # Vehicle alive state
 
     @property                                       # Creates copies of actions, to avoid similar actions sharing things like cooldown, uses etc.
     def actions(self):
         if not hasattr(self, "_action_copies"):
-            self._action_copies = [deepcopy(part.action) for part in self.parts if part.action is not None]
-            self._action_copies.append(deepcopy(reload))
-            self._action_copies.append(deepcopy(ram))
+            self._action_copies = [part.action.instantiate() for part in self.parts if part.action is not None]
+            self._action_copies.append(reload.instantiate())
+            self._action_copies.append(ram.instantiate())
         return self._action_copies
 
     @actions.setter
     def actions(self, value):
-        self._actions = value
+        self._action_copies = value
+
+    def instantiate(self):                          # Fresh copy of the build, with new part instances sharing the same templates
+        profiling.count("part_instances", len(self.parts))
+        return Vehicle(self.name, self.entity, [part.instantiate() for part in self.parts], self.ai)
 
     def get_chassis_part(self):                     # Retrieve chassis
         for part in self.parts:
-            if isinstance(part, Chassis):
+            if part.type == "chassis":
                 return part
         return blank_chassis
 
+    # Part stats summed over the build are kept unclamped in _totals, stats shows them clamped at 0 with integrity and curr_energy as the live values
     def calculate_stats(self):                      # Calculate's vehicles total stats based on all equipped parts
-        total_stats = {}
+        self._totals = [0] * BASE_STAT_COUNT
         for part in self.parts:
-            for key, value in part.stats.items():
-                total_stats[key] = total_stats.get(key, 0) + value
-        total_stats["curr_energy"] = total_stats.get("energy_pool", 0)
-        total_stats["max_integrity"] = total_stats.get("integrity", 0)
-        for stat, value in total_stats.items():
-            total_stats[stat] = max(value, 0)
-
-        self._stats = total_stats
-        return total_stats
+            for index, value in enumerate(part.stat_vector):
+                self._totals[index] += value
+        values = self.stats.values
+        for index, total in enumerate(self._totals):
+            values[index] = max(total, 0)
+        values[MAX_INTEGRITY] = values[INTEGRITY]
+        values[CURR_ENERGY] = values[ENERGY_POOL]
+        return self.stats
+
+    def apply_stat_delta(self, vector, sign=1):     # Adds (or with sign -1 removes) a part's stat vector, keeping damage taken and energy spent
+        values = self.stats.values
+        integrity = values[INTEGRITY]
+        curr_energy = values[CURR_ENERGY]
+        old_max_integrity = values[MAX_INTEGRITY]
+        old_energy_pool = values[ENERGY_POOL]
+        for index, value in enumerate(vector):
+            total = self._totals[index] + sign * value
+            self._totals[index] = total
+            values[index] = max(total, 0)
+        max_integrity = values[INTEGRITY]
+        values[MAX_INTEGRITY] = max_integrity
+        values[INTEGRITY] = min(max(integrity + max_integrity - old_max_integrity, 0), max_integrity)
+        values[CURR_ENERGY] = min(max(curr_energy + values[ENERGY_POOL] - old_energy_pool, 0), values[ENERGY_POOL])
 
     def reset_stats(self):                           # Reset stats to 0
-        for stat in self.stats.keys():
-            self.stats[stat] = 0
-
-    def update_stats(self):                          # Update vehicle stats
-        for stat, value in self.stats.items():
-            for part in self.parts:
-                part_value = getattr(part, stat, 0)
-                self.stats[stat] = value + part_value
-                self.stats["curr_energy"] = self.stats.get("energy_pool", 0)
-                self.stats["max_integrity"] = self.stats.get("integrity", 0)
-            if self.stats[stat] < 0:
-                self.stats[stat] = 0
-    
+        self._totals = [0] * BASE_STAT_COUNT
+        self.stats.values[:] = [0] * len(STAT_NAMES)
+
+    def update_stats(self):                          # Update vehicle stats, after the parts list was replaced
+        self.chassis = self.get_chassis_part()
+        self.calculate_stats()
+
     def regenerate_energy(self):                    # Execute energy regen, checking for ceiling
         curr = self.stats["curr_energy"]
         regen = self.stats["energy_regen"]
@@ -159,16 +302,16 @@ class Vehicle:
             curr += regen
         else:
             curr = max
-        self._stats["curr_energy"] = curr
+        self.stats["curr_energy"] = curr
 
     def reduce_cooldowns(self):                     # Execute cooldown reduction for every action
         for action in self.actions:
             if action.curr_cooldown > 0 and action.cooldown > 0:
                 action.curr_cooldown -= 1
 
-    def update_action_availability(self):           # Checks which actions are available and updates their status
-        curr = self._stats["curr_energy"]
-        for action in self.actions:
+    def update_action_availability(self, actions=None):    # Checks which actions (all by default) are available and updates their status
+        curr = self.stats["curr_energy"]
+        for action in self.actions if actions is None else actions:
             if action.energy_cost > 0:
                 if curr < action.energy_cost:
                     action.available = False
@@ -193,7 +336,7 @@ class Vehicle:
     def take_damage(self, damage):                   # Damage the vehicle
         integrity = self.stats["integrity"]
         integrity -= damage
-        print(f"The {self.name} takes {damage} integrity damage!\n")
+        eventbus.emit("damage", self.name, damage)
         if integrity <= 0:
             integrity = 0
             self.alive = False
@@ -204,11 +347,11 @@ class Vehicle:
         current_integrity = self.stats["integrity"]
         new_integrity = min(current_integrity + amount, max_integrity)
         healed_amount = new_integrity - current_integrity
-        print(f"The {self.name} is healed for {healed_amount} integrity.\n")
+        eventbus.emit("heal", self.name, healed_amount)
         self.stats["integrity"] = new_integrity
 
     def add_part(self, part):                        # Add a part to the build
-        if isinstance(part, Chassis):
+        if part.type == "chassis":
             print("Cannot add chassis as a separate part. Use the Chassis instance while creating the vehicle.")
             return
 
@@ -234,18 +377,86 @@ class Vehicle:
             return
 
         # Add the part to the build
-        self.parts.append(deepcopy(part))
-        self._chassis = self.get_chassis_part()
-        self.stats = self.calculate_stats()
+        instance = part.instantiate()
+        self.parts.append(instance)
+        self.apply_stat_delta(instance.stat_vector)
 
     def remove_part(self, part):                     # Remove a part from the build
         self.parts.remove(part)
-        self.stats = self.calculate_stats()
+        self.apply_stat_delta(part.stat_vector, -1)
 
     def clear_parts(self):                           # Clear all parts from the build and reset stats
         self.parts = []
         self.reset_stats()
 
+# Stats of many builds (vehicles or part lists) at once, as a NumPy matrix with one row per build in STAT_NAMES order
+# Builds are turned into a builds x templates count matrix, so the part sums become a single product with the templates' stat vectors
+def stat_matrix(builds):
+    import numpy as np
+    templates = {}                                  # id(template) -> (column, template)
+    rows = []
+    columns = []
+    for row, build in enumerate(builds):
+        for part in getattr(build, "parts", build):
+            template = getattr(part, "template", part)
+            columns.append(templates.setdefault(id(template), (len(templates), template))[0])
+            rows.append(row)
+    counts = np.zeros((len(builds), len(templates)), dtype=np.int64)
+    np.add.at(counts, (rows, columns), 1)
+    vectors = np.array([template.stat_vector for _, template in templates.values()], dtype=np.int64).reshape(-1, BASE_STAT_COUNT)
+    stats = np.empty((len(builds), len(STAT_NAMES)), dtype=np.int64)
+    stats[:, :BASE_STAT_COUNT] = np.maximum(counts @ vectors, 0)
+    stats[:, CURR_ENERGY] = stats[:, ENERGY_POOL]
+    stats[:, MAX_INTEGRITY] = stats[:, INTEGRITY]
+    return stats
+
+# Index of all registered parts, bucketed by type and rank with each bucket sorted by tech points, so filtered lookups do not scan the whole part list
+class PartCatalog():
+    def __init__(self):
+        self.parts = []                             # Every registered part, in registration order
+        self.index = {}                             # type -> rank -> (sorted tech point costs, parts in the same order)
+        self.names = {}                             # name -> part
+
+    def register(self, *parts):                     # Add parts to the catalog and its index
+        for part in parts:
+            self.parts.append(part)
+            self.names[part.name] = part
+            tech_points, bucket = self.index.setdefault(part.type, {}).setdefault(part.rank, ([], []))
+            position = bisect_right(tech_points, part.tech_points)
+            tech_points.insert(position, part.tech_points)
+            bucket.insert(position, part)
+
+    def get(self, name):                            # Registered part with the given name, None if there is none
+        return self.names.get(name)
+
+    def buckets(self, type=None, rank=None):        # Yield the (tech points, parts) buckets matching the type and rank, None matches any
+        type_indices = self.index.values() if type is None else [self.index.get(type, {})]
+        for rank_index in type_indices:
+            if rank is None:
+                yield from rank_index.values()
+            elif rank in rank_index:
+                yield rank_index[rank]
+
+    def find(self, type=None, rank=None, max_tech_points=None):    # Parts of the given type and rank costing at most max_tech_points
+        found = []
+        for tech_points, bucket in self.buckets(type, rank):
+            end = len(bucket) if max_tech_points is None else bisect_right(tech_points, max_tech_points)
+            found.extend(bucket[:end])
+        return found
+
+    def count(self, type=None, rank=None, max_tech_points=None):   # Amount of parts find would return, without building the list
+        total = 0
+        for tech_points, bucket in self.buckets(type, rank):
+            total += len(bucket) if max_tech_points is None else bisect_right(tech_points, max_tech_points)
+        return total
+
+    def random_part(self, type, rank, max_tech_points=None):       # Uniformly random part of the given type and rank within budget, None if there are none
+        tech_points, bucket = next(self.buckets(type, rank), ([], []))
+        end = len(bucket) if max_tech_points is None else bisect_right(tech_points, max_tech_points)
+        if end == 0:
+            return None
+        return bucket[random.randrange(end)]
+
 #-------------------------------------------------
 #OBJECT INSTANCES
 #-------------------------------------------------
@@ -268,7 +479,8 @@ trt_catapult = Action("Fire Catapult", 0, 75, 3)
 #Chassis - slots format = ["wheels", "engine", "bumper", "item_mount", "turret"]
 #-------------------------------------------------
 
-part_list = []
+part_catalog = PartCatalog()
+part_list = part_catalog.parts
 
 blank_chassis = Chassis("Blank", "chassis", 0, 0, [0, 0, 0, 0, 0], 0, 0)
 
@@ -300,4 +512,10 @@ medkit = Part("Medkit", "item_mount", "starter", 2, 0, 6, -2, -2, 0, -2, medkit)
 #Turret
 harpoon = Part("Harpoon", "turret", "starter", 2, 50, 5, action=trt_harpoon)
 catapult = Part("Catapult", "turret", "starter", 3, 100, 10, -4, -4, action=trt_catapult)
-plas_spoiler = Part("Plastic Spoiler", "turret", "starter", 1, 25, 2, 5, 4)
\ No newline at end of file
+plas_spoiler = Part("Plastic Spoiler", "turret", "starter", 1, 25, 2, 5, 4)
+
+#Registering chassis and parts in the catalog
+#-------------------------------------------------
+
+part_catalog.register(tuktuk, lada, tractor)
+part_catalog.register(bicycle, tractorwh, mopedeng, steameng, spikes, tractorshovel, smg, flamethrower, laser, medkit, harpoon, catapult, plas_spoiler)
@@ -0,0 +1,155 @@
+# This file holds the profiling hooks, named spans timing the phases of a run and counters for the work done inside hot loops
+# Profiling is off unless enable() is called or the PROFILE environment variable is set, while off span() hands back one shared no-op context and count() returns straight away
+# Call sites go through the module (profiling.span, profiling.count) so enable() and disable() can swap the real hooks in and out
+# Results export as JSON, or as collapsed stacks ("outer;inner microseconds" lines) read by flamegraph.pl and speedscope
+# With PROFILE set to a file path the results are written there when the program exits, as collapsed stacks for .folded and .txt paths and JSON otherwise
+
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import nullcontext
+
+NULL_SPAN = nullcontext()
+
+#-------------------------------------------------
+#RECORDING
+#-------------------------------------------------
+
+# Aggregated spans and counters, spans are keyed by their full path of enclosing span names so the same phase under different callers stays apart
+class Profile():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()                      # Stack of open spans per thread, the map prefetcher generates maps on its own thread
+        self.spans = {}                                     # path tuple -> [calls, total_ns, self_ns, min_ns, max_ns]
+        self.counters = {}                                  # name -> total
+
+    def stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def record(self, path, elapsed, self_time):
+        with self.lock:
+            stats = self.spans.get(path)
+            if stats is None:
+                self.spans[path] = [1, elapsed, self_time, elapsed, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] += self_time
+                stats[3] = min(stats[3], elapsed)
+                stats[4] = max(stats[4], elapsed)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Span and counter totals as plain data, times in milliseconds
+    def report(self):
+        with self.lock:
+            spans = [{"path": list(path), "calls": calls, "total_ms": total / 1e6, "self_ms": self_time / 1e6, "mean_ms": total / calls / 1e6, "min_ms": low / 1e6, "max_ms": high / 1e6}
+                     for path, (calls, total, self_time, low, high) in sorted(self.spans.items())]
+            return {"spans": spans, "counters": dict(sorted(self.counters.items()))}
+
+    # One "root;child;grandchild self_time" line per span path, in microseconds
+    def collapsed_stacks(self):
+        with self.lock:
+            return "\n".join(f"{';'.join(path)} {stats[2] // 1000}" for path, stats in sorted(self.spans.items()) if stats[2] >= 1000)
+
+# Times the code in its with block, nested spans are charged to their own path and subtracted from the self time of the enclosing one
+class Span():
+    __slots__ = ("name", "start", "child_time", "path")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = profile.stack()
+        self.path = (stack[-1].path if stack else ()) + (self.name,)
+        self.child_time = 0
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter_ns() - self.start
+        stack = profile.stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_time += elapsed
+        profile.record(self.path, elapsed, elapsed - self.child_time)
+        return False
+
+profile = Profile()
+
+#-------------------------------------------------
+#HOOKS
+#-------------------------------------------------
+
+def active_span(name):
+    return Span(name)
+
+def active_count(name, amount=1):
+    profile.count(name, amount)
+
+def null_span(name):
+    return NULL_SPAN
+
+def null_count(name, amount=1):
+    pass
+
+enabled = False
+span = null_span
+count = null_count
+
+def enable():
+    global enabled, span, count
+    enabled, span, count = True, active_span, active_count
+
+def disable():
+    global enabled, span, count
+    enabled, span, count = False, null_span, null_count
+
+# Clears everything recorded so far, spans still open keep running and are recorded when they close
+def reset():
+    with profile.lock:
+        profile.spans = {}
+        profile.counters = {}
+
+def report():
+    return profile.report()
+
+def collapsed_stacks():
+    return profile.collapsed_stacks()
+
+def write_json(path):
+    with open(path, "w") as file:
+        json.dump(report(), file, indent=2)
+
+def write_collapsed(path):
+    with open(path, "w") as file:
+        file.write(collapsed_stacks() + "\n")
+
+# Readable table of the spans, indented under their enclosing spans, followed by the counters
+def summary():
+    data = report()
+    lines = [f"{'span':60} {'calls':>8} {'total ms':>10} {'self ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for stats in data["spans"]:
+        name = "  " * (len(stats["path"]) - 1) + stats["path"][-1]
+        lines.append(f"{name:60} {stats['calls']:8} {stats['total_ms']:10.2f} {stats['self_ms']:10.2f} {stats['mean_ms']:9.3f} {stats['max_ms']:9.3f}")
+    for name, total in data["counters"].items():
+        lines.append(f"{name:60} {total:8}")
+    return "\n".join(lines)
+
+def write_on_exit(path):
+    if path.endswith((".folded", ".txt")):
+        write_collapsed(path)
+    else:
+        write_json(path)
+
+if os.environ.get("PROFILE"):
+    enable()
+    atexit.register(write_on_exit, os.environ["PROFILE"])
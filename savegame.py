@@ -0,0 +1,228 @@
+# This file holds the binary save format, a compact snapshot of a run: inventory, vehicle build with live stats and action state, and the current map with the player's position
+# Parts and actions are stored by template name and rebuilt from the catalog, the map is stored as mapgraph.CompactMap arrays and only turned back into Node objects when it is first accessed
+
+import mmap
+import struct
+from array import array
+import defs
+import objs
+import mapgraph
+
+MAGIC = b"OOPG"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHI")                     # magic, version, string table entry count
+U32 = struct.Struct("<I")
+I32 = struct.Struct("<i")
+PART = struct.Struct("<Ii")                         # template name, current integrity
+ACTION = struct.Struct("<I?iiqq")                   # template name, available, current cooldown, current uses, integrity change, damage
+STAT = struct.Struct("<Iq")                         # stat name, value
+MAP_HEADER = struct.Struct("<iidIIII")              # width, height (-1 for endless), min density, node count, step count, outgoing and incoming connection counts
+MAP_ARRAYS = ("xs", "ys", "step_offsets", "out_offsets", "out_targets", "in_offsets", "in_sources", "types", "flags")   # CompactMap arrays in file order, each starting on a 4 byte boundary
+
+#-------------------------------------------------
+#WRITING
+#-------------------------------------------------
+
+# Accumulates the sections of a save file, strings are stored once in a table and referenced by index
+class SnapshotWriter():
+    def __init__(self):
+        self.strings = {}
+        self.body = bytearray()
+
+    def string(self, text):
+        return self.strings.setdefault(text, len(self.strings))
+
+    def pack(self, packer, *values):
+        self.body += packer.pack(*values)
+
+    def align(self):                                # Pads to 4 bytes, so map arrays can be cast in place when loading
+        self.body += bytes(-len(self.body) % 4)
+
+    def parts(self, parts):
+        self.pack(U32, len(parts))
+        for part in parts:
+            self.pack(PART, self.string(part.name), part.curr_integrity)
+
+    def vehicle(self, vehicle):
+        self.pack(U32, self.string(vehicle.name))
+        self.pack(U32, self.string(vehicle.entity))
+        self.pack(U32, vehicle.alive)
+        self.parts(vehicle.parts)
+        self.pack(U32, len(vehicle.stats))
+        for stat, value in vehicle.stats.items():
+            self.pack(STAT, self.string(stat), int(value))
+        actions = vehicle.actions
+        self.pack(U32, len(actions))
+        for action in actions:
+            self.pack(ACTION, self.string(action.name), action.available, action.curr_cooldown, action.curr_uses, int(action.integrity_change), int(action.damage))
+
+    def map(self, game_map, current_node):
+        if game_map is None:
+            self.pack(U32, 0)
+            return
+        self.pack(U32, 1)
+        compact = mapgraph.CompactMap.from_map(game_map)
+        nodes = [node for step in game_map.map for node in step]
+        position = next((index for index, node in enumerate(nodes) if node is current_node), -1)
+        height = -1 if compact.map_height is None else compact.map_height
+        self.pack(MAP_HEADER, compact.map_width, height, compact.density_min, compact.node_count, compact.step_count, len(compact.out_targets), len(compact.in_sources))
+        self.pack(I32, position)
+        for values in (getattr(compact, name) for name in MAP_ARRAYS):
+            self.align()                                # Before every array, the sections in front of the first one end anywhere
+            self.body += values.tobytes()
+
+    def to_bytes(self):
+        table = bytearray()
+        for text in self.strings:
+            encoded = text.encode("utf-8")
+            table += U32.pack(len(encoded)) + encoded
+        table += bytes(-(HEADER.size + len(table)) % 4)
+        return HEADER.pack(MAGIC, VERSION, len(self.strings)) + table + self.body
+
+# Saves the inventory, player vehicle and the game's current map and node (if a game is given) to path
+def save_game(path, game=None):
+    writer = SnapshotWriter()
+    inventory_parts = [part for parts in defs.inventory.values() for part in parts]
+    writer.parts(inventory_parts)
+    writer.vehicle(defs.player_vehicle)
+    writer.map(game.current_map if game else None, game.current_node if game else None)
+    with open(path, "wb") as file:
+        file.write(writer.to_bytes())
+
+#-------------------------------------------------
+#LOADING
+#-------------------------------------------------
+
+# Action templates by name, for rebuilding action instances
+def action_templates():
+    templates = {part.action.name: part.action for part in objs.part_catalog.parts if part.action is not None}
+    templates[objs.reload.name] = objs.reload
+    templates[objs.ram.name] = objs.ram
+    return templates
+
+# Loaded save file, the inventory and vehicle are decoded straight away while the map stays as arrays over the memory mapped file until accessed
+class GameSnapshot():
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.buffer)
+        magic, version, string_count = HEADER.unpack_from(self.view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} save file")
+        self.offset = HEADER.size
+        self.strings = []
+        for _ in range(string_count):
+            length = self.read(U32)
+            self.strings.append(bytes(self.view[self.offset:self.offset + length]).decode("utf-8"))
+            self.offset += length
+        self.offset += -self.offset % 4
+
+        self.inventory_parts = self.read_parts()
+        self.vehicle = self.read_vehicle()
+        self.map_offset = self.offset                   # Map section is only decoded when first accessed
+        self._compact_map = None
+        self._map = None
+        self._node_position = -1
+
+    def read(self, packer):
+        values = packer.unpack_from(self.view, self.offset)
+        self.offset += packer.size
+        return values[0] if len(values) == 1 else values
+
+    def read_parts(self):
+        parts = []
+        for _ in range(self.read(U32)):
+            name, curr_integrity = self.read(PART)
+            template = objs.part_catalog.get(self.strings[name])
+            if template is None:
+                raise KeyError(f"Part {self.strings[name]!r} is not in the part catalog")
+            parts.append(objs.PartInstance(template, curr_integrity))
+        return parts
+
+    def read_vehicle(self):
+        name = self.strings[self.read(U32)]
+        entity = self.strings[self.read(U32)]
+        alive = bool(self.read(U32))
+        vehicle = objs.Vehicle(name, entity, self.read_parts())
+        vehicle.alive = alive
+        stats = {}
+        for _ in range(self.read(U32)):
+            stat, value = self.read(STAT)
+            stats[self.strings[stat]] = value
+        vehicle.stats.update(stats)
+        templates = action_templates()
+        actions = []
+        for _ in range(self.read(U32)):
+            name, available, curr_cooldown, curr_uses, integrity_change, damage = self.read(ACTION)
+            action = objs.ActionInstance(templates[self.strings[name]], available, curr_cooldown, curr_uses)
+            action.integrity_change = integrity_change
+            action.damage = damage
+            actions.append(action)
+        vehicle.actions = actions
+        return vehicle
+
+    # Map arrays as zero-copy views over the file
+    @property
+    def compact_map(self):
+        if self._compact_map is None and self.map_offset is not None:
+            self.offset = self.map_offset
+            if not self.read(U32):
+                self.map_offset = None
+                return None
+            width, height, density_min, node_count, step_count, out_count, in_count = self.read(MAP_HEADER)
+            self._node_position = self.read(I32)
+            arrays = []
+            for typecode, count in (("i", node_count), ("i", node_count), ("i", step_count + 1), ("i", node_count + 1), ("i", out_count), ("i", node_count + 1), ("i", in_count), ("b", node_count), ("b", node_count)):
+                self.offset += -self.offset % 4
+                size = count * array(typecode).itemsize
+                arrays.append(self.view[self.offset:self.offset + size].cast(typecode))
+                self.offset += size
+            xs, ys, step_offsets, out_offsets, out_targets, in_offsets, in_sources, types, flags = arrays
+            self._compact_map = mapgraph.CompactMap(width, None if height < 0 else height, density_min, xs, ys, types, flags, step_offsets, out_offsets, out_targets, in_offsets, in_sources)
+        return self._compact_map
+
+    # Map rebuilt with Node objects, materialized on first access
+    @property
+    def map(self):
+        if self._map is None and self.compact_map is not None:
+            self._map = self.compact_map.to_map()
+        return self._map
+
+    @property
+    def current_node(self):
+        if self.map is None or self._node_position < 0:
+            return None
+        return [node for step in self.map.map for node in step][self._node_position]
+
+    # Puts the saved state back into the game modules, and into the given game if any
+    def restore(self, game=None):
+        inventory = defs.Inventory()
+        for part in self.inventory_parts:
+            inventory.add(part)
+        defs.inventory = inventory
+        defs.player_vehicle = self.vehicle
+        if game:
+            game.inventory = inventory
+            game.player_vehicle = self.vehicle
+            game.current_map = self.map
+            if self.map:
+                game.event_store.prepare(self.map)
+            game.current_node = self.current_node
+            game.refresh_rank_odds()
+
+    # Copies the map arrays out of the file before unmapping it, so the map and a compact_map the caller still holds stay usable
+    def close(self):
+        compact = self.compact_map
+        if compact is not None:
+            for name in MAP_ARRAYS:
+                view = getattr(compact, name)
+                if isinstance(view, memoryview):
+                    setattr(compact, name, array(view.format, view))
+                    view.release()
+        self.view.release()
+        self.buffer.close()
+
+# Opens a save file
+def load_game(path):
+    return GameSnapshot(path)
@@ -0,0 +1,38 @@
+# This file holds the time unit scheduler used by defs.timed_battle, a heap of timed events in place of strictly alternating turns
+# Every combatant schedules its next action after a delay set by its speed and the cost of what it just did, and cooldowns end as their own events instead of being counted down every turn
+
+import heapq
+from itertools import count
+
+TURN_LENGTH = 100                                   # Time units of one action at speed 0 without energy cost, cooldowns last this long per turn of cooldown
+SPEED_BASE = 50                                     # Speed at which a vehicle acts twice as often as at speed 0
+
+# Time until a vehicle acts again after an action, faster vehicles act sooner and actions costing energy take longer
+def action_delay(speed, energy_cost=0):
+    return max(1, TURN_LENGTH * (SPEED_BASE + max(energy_cost, 0)) // (SPEED_BASE + max(speed, 0)))
+
+# Amount of a vehicle's own actions that time_left still spans, at least 1, for logic that counts cooldowns in turns like enemyai's search
+def turns_left(time_left, speed):
+    return max(1, -(-time_left // action_delay(speed)))
+
+class Scheduler():
+    def __init__(self):
+        self.now = 0                                # Time of the event being handled
+        self.queue = []                             # Heap of (time, sequence, callback, arguments), the sequence keeps same time events in scheduling order
+        self.sequence = count()
+
+    def schedule(self, delay, callback, *arguments):
+        heapq.heappush(self.queue, (self.now + delay, next(self.sequence), callback, arguments))
+
+    def run_next(self):                             # Advances the clock to the next event and handles it, returns False once nothing is left
+        if not self.queue:
+            return False
+        self.now, _, callback, arguments = heapq.heappop(self.queue)
+        callback(*arguments)
+        return True
+
+    def next_time(self):
+        return self.queue[0][0] if self.queue else None
+
+    def __len__(self):
+        return len(self.queue)
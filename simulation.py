@@ -0,0 +1,106 @@
+# This file holds the headless battle simulator, used to run large amounts of battles between vehicle builds for balance tuning
+
+import random
+from collections import Counter
+import defs
+import objs
+import eventbus
+import chunkpool
+
+#-------------------------------------------------
+#HEADLESS BATTLES
+#-------------------------------------------------
+
+# Automated player turn, mirrors the enemy heuristic from defs.enemy_turn with the roles swapped
+def auto_player_turn(player_vehicle, enemy_vehicle):
+    defs.enemy_turn(enemy_vehicle, player_vehicle)
+
+# Runs a single battle between fresh copies of both builds, returns (player_won, turns, damage_to_enemy, damage_to_player)
+def simulate_battle(player_build, enemy_build, player_turn_function=auto_player_turn):
+    player = player_build.instantiate()
+    enemy = enemy_build.instantiate()
+    winner, turns = defs.battle(player, enemy, player_turn_function)
+    damage_to_enemy = enemy.stats["max_integrity"] - enemy.stats["integrity"]
+    damage_to_player = player.stats["max_integrity"] - player.stats["integrity"]
+    return winner is player, turns, damage_to_enemy, damage_to_player
+
+#-------------------------------------------------
+#RESULT AGGREGATION
+#-------------------------------------------------
+
+# Aggregated battle results, distributions are kept as value -> count histograms so chunks can be merged cheaply
+class BattleStats(chunkpool.Stats):
+    def __init__(self):
+        self.battles = 0
+        self.player_wins = 0
+        self.stalemates = 0                 # Battles decided by the stalemate rule, counted in player_wins or losses as well
+        self.turns = Counter()
+        self.damage_to_enemy = Counter()
+        self.damage_to_player = Counter()
+
+    def add(self, result):
+        player_won, turns, damage_to_enemy, damage_to_player = result
+        self.battles += 1
+        self.player_wins += player_won
+        self.stalemates += turns >= defs.STALEMATE_TURN
+        self.turns[turns] += 1
+        self.damage_to_enemy[damage_to_enemy] += 1
+        self.damage_to_player[damage_to_player] += 1
+
+    def merge(self, other):
+        self.battles += other.battles
+        self.player_wins += other.player_wins
+        self.stalemates += other.stalemates
+        self.turns.update(other.turns)
+        self.damage_to_enemy.update(other.damage_to_enemy)
+        self.damage_to_player.update(other.damage_to_player)
+        return self
+
+    @property
+    def losses(self):
+        return self.battles - self.player_wins
+
+    @property
+    def win_rate(self):
+        return self.player_wins / self.battles if self.battles else 0.0
+
+    def summary(self):
+        return {
+            "battles": self.battles,
+            "win_rate": self.win_rate,
+            "stalemates": self.stalemates,
+            "turns": self.describe(self.turns),
+            "damage_to_enemy": self.describe(self.damage_to_enemy),
+            "damage_to_player": self.describe(self.damage_to_player),
+        }
+
+#-------------------------------------------------
+#PROCESS POOL
+#-------------------------------------------------
+
+# Worker entry point, runs battles first to first + battles - 1 with no sink listening to the battle events
+# Every battle is seeded from the base seed and its own index, so the results do not depend on how the battles were split into chunks
+def run_battle_chunk(player_build, enemy_build, first, battles, seed):
+    stats = BattleStats()
+    with eventbus.using(eventbus.NullSink()):
+        for index in range(first, first + battles):
+            random.seed(f"{seed}:{index}")
+            stats.add(simulate_battle(player_build, enemy_build))
+    return stats
+
+# Runs the given amount of battles between two builds, spread over a process pool (workers=1 runs in the current process)
+# engine="vectorized" runs them instead as batched lanes in the NumPy combat kernel, which needs numpy installed
+def simulate_battles(player_build, enemy_build, battles=1000, workers=None, chunk_size=250, seed=None, engine="object"):
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+    if engine == "vectorized":
+        import combatkernel
+        return combatkernel.simulate_matchup(player_build, enemy_build, battles, seed=base_seed)
+    chunks = [(player_build, enemy_build, start, min(chunk_size, battles - start), base_seed) for start in range(0, battles, chunk_size)]
+    return chunkpool.run_chunks(run_battle_chunk, chunks, BattleStats(), workers)
+
+#Battle simulation testing, builds a lada and a tractor from the starter parts and pits them against each other
+if __name__ == "__main__":
+    lada_build = objs.Vehicle("Lada", "Player", [objs.lada, objs.bicycle, objs.mopedeng, objs.spikes, objs.smg, objs.harpoon])
+    tractor_build = objs.Vehicle("Tractor", "Enemy", [objs.tractor, objs.tractorwh, objs.steameng, objs.tractorshovel, objs.flamethrower])
+    print(simulate_battles(lada_build, tractor_build, battles=10000).summary())
+    print(simulate_battles(lada_build, tractor_build, battles=10000, engine="vectorized").summary())
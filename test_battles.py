@@ -0,0 +1,58 @@
+# Tests of the battle loops, battle events fight in turns unless timed battles are switched on
+
+import random
+import defs
+import objs
+import mapgen
+import enemyai
+import eventbus
+import decisions
+import scheduler
+
+def starter_builds():
+    player = objs.Vehicle("Lada", "Player", [objs.lada, objs.bicycle, objs.mopedeng, objs.spikes, objs.smg, objs.harpoon])
+    enemy = objs.Vehicle("Tractor", "Enemy", [objs.tractor, objs.tractorwh, objs.steameng, objs.tractorshovel, objs.flamethrower])
+    return player, enemy
+
+def fought_battle(timed, monkeypatch):
+    player, _ = starter_builds()
+    monkeypatch.setattr(defs, "player_vehicle", player.instantiate())
+    monkeypatch.setattr(defs, "timed_battles", timed)
+    random.seed(0)
+    battle = mapgen.Battle("Battle", {"starter": 1})
+    with eventbus.using(eventbus.Recorder()) as recorder, decisions.using(decisions.HeuristicProvider()):
+        battle.execute()
+    return battle, recorder.counts()
+
+def test_battle_events_fight_in_turns_by_default(monkeypatch):
+    battle, counts = fought_battle(False, monkeypatch)
+    assert counts.get("turn") and not counts.get("time_step")
+    assert battle.player.alive != battle.enemy.alive
+
+def test_battle_events_use_the_scheduler_when_timed(monkeypatch):
+    battle, counts = fought_battle(True, monkeypatch)
+    assert counts.get("time_step") and not counts.get("turn")
+    assert battle.player.alive != battle.enemy.alive
+
+def test_turns_left():
+    assert scheduler.turns_left(3 * scheduler.TURN_LENGTH, 0) == 3
+    assert scheduler.turns_left(scheduler.TURN_LENGTH, scheduler.SPEED_BASE) == 2             # Twice as fast, twice the actions
+    assert scheduler.turns_left(1, 0) == 1
+
+def test_search_enemy_sees_cooldowns_in_turns():
+    player, enemy = starter_builds()
+    player, enemy = player.instantiate(), enemy.instantiate()
+    enemy.ai = enemyai.for_tier("normal")
+    seen = []
+    choose_action = enemy.ai.choose_action
+    def recording_choose_action(enemy_vehicle, player_vehicle):
+        seen.extend((action.cooldown, action.curr_cooldown) for action in enemy_vehicle.actions if action.cooldown > 0)
+        return choose_action(enemy_vehicle, player_vehicle)
+    enemy.ai.choose_action = recording_choose_action
+    random.seed(0)
+    auto_act = lambda player_vehicle, enemy_vehicle: defs.enemy_act(enemy_vehicle, player_vehicle)
+    with eventbus.using(eventbus.NullSink()):
+        winner, _ = defs.timed_battle(player, enemy, auto_act)
+    assert winner in (player, enemy)
+    assert any(current > 0 for _, current in seen)
+    assert all(current <= scheduler.turns_left(cooldown * scheduler.TURN_LENGTH, enemy.stats["speed"]) for cooldown, current in seen)
@@ -0,0 +1,17 @@
+# Tests of the benchmark runner's scaling fit and baseline handling
+
+import os
+import benchmarks
+
+def test_scaling_exponent_uses_node_count():
+    curve = [((4, 10, 0.2), 1.0), ((8, 20, 0.8), 8.0)]                   # 40 to 160 nodes, density left out
+    assert abs(benchmarks.scaling_exponent(curve) - 1.5) < 1e-9
+    assert abs(benchmarks.scaling_exponent([(10, 1.0), (1000, 100.0)]) - 1.0) < 1e-9
+
+def test_baseline_path_is_next_to_the_module():
+    assert os.path.dirname(benchmarks.BASELINE_PATH) == os.path.dirname(os.path.abspath(benchmarks.__file__))
+
+def test_check_fails_without_baseline(tmp_path):
+    missing = str(tmp_path / "missing.json")
+    assert benchmarks.main(["--check", "--baseline", missing, "--only", "rank_probabilities", "--quick"]) == 1
+    assert benchmarks.main(["--baseline", missing, "--only", "rank_probabilities", "--quick"]) == 0
@@ -0,0 +1,67 @@
+# Tests of the build solver, its best builds have to match trying every build and whole build objectives rerank its shortlist
+
+import random
+import itertools
+import pytest
+import objs
+import buildsolver
+
+def random_case(rng):
+    chassis = objs.Chassis("Frame", "chassis", "common", rng.randint(0, 9), [rng.randint(0, 2) for _ in buildsolver.PART_TYPES], 100, 10)
+    parts = [objs.Part(f"P{index}", rng.choice(buildsolver.PART_TYPES), rng.choice(list(buildsolver.RANK_MULTIPLIERS)), rng.randint(0, 5), 10, 1) for index in range(rng.randint(0, 9))]
+    scores = {part.name: rng.choice([0, -1, rng.randint(1, 6), rng.random() * 5]) for part in parts}
+    return chassis, parts, scores
+
+# Scores of every build that fits the chassis, trying each set of at most `slots` parts per type
+def brute_force_scores(chassis, parts, score):
+    per_type = []
+    for part_type in buildsolver.PART_TYPES:
+        of_type = [part for part in parts if part.type == part_type]
+        per_type.append([combination for count in range(chassis.slots[part_type] + 1) for combination in itertools.combinations(of_type, count)])
+    scores = []
+    for choice in itertools.product(*per_type):
+        chosen = [part for combination in choice for part in combination]
+        if sum(part.tech_points for part in chosen) <= chassis.tech_points:
+            scores.append(sum(score(part) for part in chosen) + score(chassis))
+    return sorted(scores, reverse=True)
+
+def test_best_build_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(200):
+        chassis, parts, scores = random_case(rng)
+        for objective in ("power", "speed", lambda part: scores.get(part.name, 0)):
+            expected = brute_force_scores(chassis, parts, buildsolver.part_scorer(objective))
+            build, score = buildsolver.BuildSolver(parts, objective).solve(chassis)
+            assert score == pytest.approx(expected[0])
+            assert build[0] is chassis and sum(part.tech_points for part in build[1:]) <= chassis.tech_points
+            assert all(sum(part.type == part_type for part in build[1:]) <= chassis.slots[part_type] for part_type in buildsolver.PART_TYPES)
+
+def test_shortlist_matches_brute_force():
+    rng = random.Random(1)
+    for _ in range(200):
+        chassis, parts, scores = random_case(rng)
+        score = lambda part: scores.get(part.name, 0)
+        positive_scores = brute_force_scores(chassis, [part for part in parts if scores[part.name] > 0], score)   # The solver leaves out parts that cannot raise a score
+        solver = buildsolver.BuildSolver(parts, score, shortlist=4)
+        shortlist = [total for total, _ in solver.solve_slots(chassis.slots, chassis.tech_points)]
+        assert shortlist == pytest.approx(positive_scores[:4])
+
+def test_win_rate_reranks_the_shortlist():
+    inventory = {
+        "chassis": [objs.lada, objs.tractor],
+        "wheels": [objs.bicycle, objs.tractorwh],
+        "engine": [objs.mopedeng, objs.steameng],
+        "bumper": [objs.spikes, objs.tractorshovel],
+        "item_mount": [objs.smg, objs.laser, objs.medkit, objs.flamethrower],
+        "turret": [objs.harpoon, objs.catapult, objs.plas_spoiler],
+    }
+    opponent = objs.Vehicle("Tractor", "Enemy", [objs.tractor, objs.tractorwh, objs.steameng, objs.tractorshovel, objs.flamethrower])
+    evaluate = buildsolver.win_rate([opponent], battles=40)
+    build, score = buildsolver.solve_build(inventory, evaluate=evaluate)
+    assert score == evaluate(objs.Vehicle("Candidate", "Player", build))
+    solver = buildsolver.BuildSolver([part for part_type in buildsolver.PART_TYPES for part in inventory[part_type]], "power", shortlist=8)
+    shortlist = [[chassis, *parts] for chassis in inventory["chassis"] for _, parts in solver.solve_slots(chassis.slots, chassis.tech_points)]
+    assert build in shortlist
+    assert score == max(evaluate(objs.Vehicle("Candidate", "Player", candidate)) for candidate in shortlist)
+    power_build, _ = buildsolver.solve_build(inventory)
+    assert score >= evaluate(objs.Vehicle("Candidate", "Player", power_build))
@@ -0,0 +1,16 @@
+# Tests of the campaign simulator, seeded runs give the same results however they are spread over processes
+
+import campaignsim
+
+def test_seeded_campaigns_repeat():
+    first = campaignsim.simulate_campaigns(runs=20, max_maps=2, workers=1, chunk_size=5, seed=11)
+    second = campaignsim.simulate_campaigns(runs=20, max_maps=2, workers=1, chunk_size=5, seed=11)
+    assert first.summary() == second.summary()
+
+def test_pool_matches_single_process():
+    single = campaignsim.simulate_campaigns(runs=20, max_maps=2, workers=1, chunk_size=5, seed=11)
+    pooled = campaignsim.simulate_campaigns(runs=20, max_maps=2, workers=2, chunk_size=5, seed=11)
+    assert pooled.runs == single.runs
+    assert pooled.nodes_visited == single.nodes_visited
+    assert pooled.maps_played == single.maps_played
+    assert pooled.battles_won == single.battles_won
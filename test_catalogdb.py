@@ -0,0 +1,59 @@
+# Tests of the SQLite part catalog against the in-memory one objs builds
+
+from collections import Counter
+import random
+import objs
+import mapgen
+import catalogdb
+
+def exported(tmp_path, **options):
+    path = str(tmp_path / "parts.db")
+    catalogdb.export_catalog(path)
+    return path, catalogdb.SQLitePartCatalog(path, **options)
+
+def test_export_into_existing_database(tmp_path):
+    path, catalog = exported(tmp_path)
+    catalog.close()
+    catalogdb.export_catalog(path)
+    catalog = catalogdb.SQLitePartCatalog(path)
+    assert catalog.count() == len(objs.part_catalog.parts)
+    actions = catalog.connection.execute("SELECT COUNT(*) FROM actions").fetchone()[0]
+    assert actions == sum(part.action is not None for part in objs.part_catalog.parts)
+    assert sorted(part.name for part in catalog.parts) == sorted(part.name for part in objs.part_catalog.parts)
+
+def test_evicted_templates_keep_their_identity(tmp_path):
+    _, catalog = exported(tmp_path, cache_size=1)
+    held = catalog.get("Lada")
+    for part in objs.part_catalog.parts:
+        catalog.get(part.name)
+    assert catalog.get("Lada") is held
+
+def test_random_part_matches_find(tmp_path):
+    _, catalog = exported(tmp_path)
+    random.seed(0)
+    for type, rank, budget in (("item_mount", "starter", None), ("chassis", "starter", None), ("wheels", "starter", 1)):
+        expected = {part.name for part in catalog.find(type, rank, budget)}
+        drawn = Counter(catalog.random_part(type, rank, budget).name for _ in range(400))
+        assert set(drawn) == expected
+    assert catalog.random_part("item_mount", "starter", -1) is None
+    assert catalog.random_part("item_mount", "no such rank") is None
+
+# Sparse matches: 300 wheels of one type and rank, only 4 of them scattered through the id range are within budget
+def test_random_part_is_uniform_over_sparse_matches(tmp_path):
+    catalog = catalogdb.SQLitePartCatalog(str(tmp_path / "wheels.db"))
+    catalog.register(*(objs.Part(f"W{index}", "wheels", "common", 1 if index in (0, 1, 2, 150) else 5, 20, 1) for index in range(300)))
+    random.seed(0)
+    drawn = Counter(catalog.random_part("wheels", "common", 1).name for _ in range(4000))
+    assert set(drawn) == {"W0", "W1", "W2", "W150"}
+    assert all(850 < count < 1150 for count in drawn.values()), drawn
+
+def test_installed_catalog_builds_enemies(tmp_path):
+    path = str(tmp_path / "parts.db")
+    previous = catalogdb.install(path)
+    try:
+        assert isinstance(objs.part_catalog, catalogdb.SQLitePartCatalog)
+        random.seed(1)
+        enemy = mapgen.Battle("Battle", {"starter": 1}).enemy
+        assert enemy.parts and all(objs.part_catalog.get(part.name) is part.template for part in enemy.parts)
+    finally:
+        objs.part_catalog = previous
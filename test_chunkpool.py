@@ -0,0 +1,31 @@
+# Tests of the shared chunk pool, chunks are merged the same way in the current process and over the pool
+
+from collections import Counter
+import chunkpool
+
+class CountStats(chunkpool.Stats):
+    def __init__(self, values=()):
+        self.values = Counter(values)
+
+    def merge(self, other):
+        self.values.update(other.values)
+        return self
+
+    def summary(self):
+        return {"values": self.describe(self.values)}
+
+def count_chunk(start, amount):
+    return CountStats(range(start, start + amount))
+
+def test_describe():
+    assert chunkpool.describe(Counter({2: 1, 4: 3})) == {"mean": 3.5, "min": 2, "max": 4}
+    assert chunkpool.describe(Counter()) == {"mean": 0.0, "min": 0, "max": 0}
+
+def test_run_chunks_merges_every_chunk():
+    chunks = [(start, 10) for start in range(0, 100, 10)]
+    seen = []
+    single = chunkpool.run_chunks(count_chunk, chunks, CountStats(), workers=1, on_chunk=lambda stats: seen.append(sum(stats.values.values())))
+    pooled = chunkpool.run_chunks(count_chunk, chunks, CountStats(), workers=2)
+    assert single.values == pooled.values == Counter(range(100))
+    assert seen == list(range(10, 101, 10))
+    assert repr(single).startswith("CountStats({'values'")
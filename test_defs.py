@@ -0,0 +1,112 @@
+# Tests of the inventory, removing parts keeps the remaining ones in the order they were added and the power tracker agrees with a full rescan
+# and of the weighted samplers, draws follow the weights, zero weights are never drawn and Fenwick updates apply to later draws
+
+import random
+import pytest
+from collections import Counter
+import defs
+import objs
+import gamelogic
+import powerleveltesting
+
+def test_remove_keeps_order():
+    inventory = defs.Inventory()
+    engines = [powerleveltesting.starter_engine, powerleveltesting.common_engine, powerleveltesting.rare_engine, powerleveltesting.common_engine]
+    for engine in engines:
+        inventory.add(engine)
+    inventory.remove(powerleveltesting.common_engine)                   # The oldest copy goes, like list.remove
+    assert inventory["engine"] == [powerleveltesting.starter_engine, powerleveltesting.rare_engine, powerleveltesting.common_engine]
+    assert inventory["engine"][0] is powerleveltesting.starter_engine
+    assert inventory["engine"][-1] is powerleveltesting.common_engine
+    assert len(inventory["engine"]) == 3
+
+def test_remove_missing_part():
+    inventory = defs.Inventory()
+    with pytest.raises(ValueError):
+        inventory.remove(powerleveltesting.rare_engine)
+
+# Game.update_player_power as it was before the power tracker, a full rescan of the inventory lists
+def rescan_power(inventory, rank_config=gamelogic.RANK_CONFIG, tech_point_multiplier=0.1, chassis_multiplier=0.1):
+    rank_list = list(rank_config)
+    if not inventory["chassis"]:
+        return 0
+    highest_tech_point_chassis = max(inventory["chassis"], key=lambda chassis: chassis.tech_points)
+    highest_rarity_chassis = max(inventory["chassis"], key=lambda chassis: rank_list.index(chassis.rank))
+    highest_slot_amounts = {}
+    for chassis in inventory["chassis"]:
+        for part_type, slots in chassis.slots.items():
+            highest_slot_amounts[part_type] = max(highest_slot_amounts.get(part_type, 0), slots)
+    total_power_level = 0
+    for part_type, amount in highest_slot_amounts.items():
+        parts_of_type = list(inventory[part_type])
+        for _ in range(min(amount, len(parts_of_type))):
+            part = max(parts_of_type, key=lambda part: rank_list.index(part.rank))
+            parts_of_type.remove(part)
+            total_power_level += rank_config[part.rank]["prob_multiplier"] + tech_point_multiplier * part.tech_points
+    for chassis in (highest_rarity_chassis, highest_tech_point_chassis):
+        total_power_level += rank_config[chassis.rank]["prob_multiplier"] + tech_point_multiplier * chassis.tech_points * chassis_multiplier
+    return total_power_level
+
+def test_power_tracker_matches_rescan():
+    rng = random.Random(0)
+    # Same rank, different tech points, so ties between them are decided by inventory order
+    parts = powerleveltesting.sample_parts + [
+        objs.Part("Cheap V8", "engine", "rare", 1, 30, 4, 40, 5, 35, 5),
+        objs.Part("Heavy Tires", "wheels", "rare", 5, 25, 2, 10, 10, 0, 4),
+        objs.Chassis("Light Buggy", "chassis", "rare", 6, [1, 2, 1, 2, 1], 250, 8, 18, 12, 50, 6),
+    ]
+    inventory = defs.Inventory()
+    held = []
+    for _ in range(2000):
+        if held and rng.random() < 0.45:
+            part = held.pop(rng.randrange(len(held)))
+            inventory.remove(part)
+        else:
+            part = rng.choice(parts)
+            part = part.instantiate() if rng.random() < 0.5 else part         # Instances and the same template held several times
+            inventory.add(part)
+            held.append(part)
+        assert abs(inventory.power_tracker.power_level(gamelogic.RANK_CONFIG) - rescan_power(inventory)) < 1e-9
+
+def drawn_frequencies(sampler, draws, seed=0):
+    rng = random.Random(seed)
+    counts = Counter(sampler.choice(rng) for _ in range(draws))
+    return {outcome: count / draws for outcome, count in counts.items()}
+
+def assert_frequencies_match(sampler, weights, draws=40000):
+    frequencies = drawn_frequencies(sampler, draws)
+    total = sum(weights.values())
+    for outcome, weight in weights.items():
+        if weight:
+            assert abs(frequencies.get(outcome, 0) - weight / total) < 0.01
+        else:
+            assert outcome not in frequencies
+
+ODDS = {"battle": 0.6, "choice": 1, "treasure": 0.1, "garage": 0.2, "merchant": 0.1}
+
+def test_sampler_frequencies_match_weights():
+    for sampler_class in (defs.AliasSampler, defs.FenwickSampler):
+        assert_frequencies_match(sampler_class(ODDS), ODDS)
+
+def test_samplers_never_draw_zero_weights():
+    weights = {"first": 0, "a": 1, "middle": 0, "b": 2.5, "c": 1e-3, "last": 0}
+    for sampler_class in (defs.AliasSampler, defs.FenwickSampler):
+        assert_frequencies_match(sampler_class(weights), weights)
+
+def test_fenwick_updates_apply_to_later_draws():
+    sampler = defs.FenwickSampler(ODDS)
+    weights = dict(ODDS)
+    rng = random.Random(1)
+    for _ in range(200):
+        outcome = rng.choice(list(weights))
+        weights[outcome] = rng.choice([0, 0.05, 0.5, 1, 3])
+        sampler[outcome] = weights[outcome]
+        assert sampler.tree == pytest.approx(defs.FenwickSampler(weights).tree)
+    weights.update(battle=0, choice=0, treasure=2, garage=0, merchant=1)
+    for outcome, weight in weights.items():
+        sampler[outcome] = weight
+    assert_frequencies_match(sampler, weights)
+    sampler["treasure"] = 0                                            # Down to a single outcome with weight
+    assert set(drawn_frequencies(sampler, 2000)) == {"merchant"}
+    sampler["battle"] = 1                                              # Back from zero
+    assert_frequencies_match(sampler, {"battle": 1, "merchant": 1})
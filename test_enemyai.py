@@ -0,0 +1,50 @@
+# Tests of the search based enemy policy, it has to see wins the one move heuristic misses and stay inside its time budget
+
+import time
+import objs
+import enemyai
+
+# The searching side has a heal that looks best one move ahead, while either attack starts a two move kill of the badly damaged target
+def forced_win_position():
+    searcher = objs.Vehicle("Lada", "Enemy", [objs.lada, objs.bicycle, objs.mopedeng, objs.laser, objs.medkit, objs.harpoon]).instantiate()
+    target = objs.Vehicle("Tractor", "Player", [objs.tractor, objs.tractorwh, objs.steameng, objs.tractorshovel, objs.flamethrower]).instantiate()
+    searcher.stats["integrity"] = 100
+    target.stats["integrity"] = 85
+    target.stats["dodge"] = 0
+    flamethrower = next(action for action in target.actions if action.name == "Use Flamethrower")
+    flamethrower.curr_cooldown, flamethrower.available = 3, False       # No threat back for the next turns
+    return searcher, target
+
+def test_one_move_search_prefers_the_heal():
+    searcher, target = forced_win_position()
+    assert enemyai.EnemyAI(max_depth=1, time_budget=1.0).choose_action(searcher, target).name == "Medkit heal"
+
+def test_forced_win_is_found():
+    searcher, target = forced_win_position()
+    ai = enemyai.EnemyAI(max_depth=3, time_budget=1.0)
+    action = ai.choose_action(searcher, target)
+    assert ai.last_depth == 3
+    assert action.name in ("Fire Laser", "Fire Harpoon")
+    enemy, player = enemyai.SideModel(searcher), enemyai.SideModel(target)
+    move = enemy.actions.index(action)
+    assert ai.expected(enemy, enemy.state(), player, player.state(), move, 0, 3) >= enemyai.DISCOUNT ** 3 * enemyai.WIN      # The kill lands on the third move
+
+def test_time_budget_is_respected():
+    searcher, target = forced_win_position()
+    ai = enemyai.EnemyAI(max_depth=40, time_budget=0.005)
+    start = time.perf_counter()
+    ai.choose_action(searcher, target)
+    assert time.perf_counter() - start < 0.05
+    assert 1 <= ai.last_depth < 40
+
+def test_spent_budget_still_plays_an_evaluated_action():
+    searcher, target = forced_win_position()
+    ai = enemyai.EnemyAI(max_depth=8, time_budget=0)
+    assert ai.choose_action(searcher, target).name == "Medkit heal"       # The depth 1 choice, not the first available action
+    assert ai.last_depth == 1
+
+def test_table_is_keyed_on_the_state():
+    searcher, target = forced_win_position()
+    ai = enemyai.EnemyAI(max_depth=3, time_budget=1.0)
+    ai.choose_action(searcher, target)
+    assert ai.table and all(isinstance(key, tuple) and len(key) == 3 for key in ai.table)
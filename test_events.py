@@ -0,0 +1,43 @@
+# Tests of the event store and choice events, chosen outcomes are built on demand and skipping a choice leaves it
+
+import defs
+import mapgen
+import eventbus
+import eventdb
+import decisions
+
+RANK_ODDS = {"starter": 1}
+
+def stranded_trader():
+    store = eventdb.EventStore()
+    template = next(template for template in store.load("choice") if template.fields["name"] == "Stranded Trader")
+    return template.build(RANK_ODDS)
+
+def test_outcomes_are_built_when_chosen():
+    choice = stranded_trader()
+    assert not any(isinstance(outcome, mapgen.Event) for outcome in choice.choices.values())
+    defs.reset_player_state()
+    with eventbus.using(eventbus.NullSink()), decisions.using(decisions.ScriptedProvider([2])):
+        choice.execute()
+    assert isinstance(choice.next, mapgen.Battle)
+    assert choice.next.name == "Angry Trader"
+
+def test_skipping_a_choice_leaves():
+    choice = stranded_trader()
+    with eventbus.using(eventbus.NullSink()), decisions.using(decisions.ScriptedProvider([0])):
+        choice.execute()
+    assert choice.next is None
+
+def test_random_provider_skips():
+    defs.reset_player_state()
+    with eventbus.using(eventbus.NullSink()), decisions.using(decisions.RandomProvider(seed=1, skip_chance=1.0)):
+        for _ in range(10):
+            choice = stranded_trader()
+            choice.resolve()
+            assert choice.next is None
+
+def test_leaving_without_an_outcome():
+    choice = stranded_trader()
+    with eventbus.using(eventbus.NullSink()), decisions.using(decisions.ScriptedProvider([3])):
+        choice.execute()
+    assert choice.next is None
@@ -0,0 +1,91 @@
+# Tests of the game loop: map generation draws from the game's own seeded generator, and the compiled rank odds match calculating them
+
+import random
+import pytest
+import defs
+import mapgen
+import eventbus
+import decisions
+import eventdb
+import gamelogic
+
+def node_data(game_map):
+    return [(node.x, node.y, node.type, [(other.x, other.y) for other in node.connections_to]) for step in game_map.map for node in step]
+
+def generated_map(rng):
+    new_map = mapgen.Map(rng.randint(4, 8), rng.randint(10, 18), round(rng.uniform(0.2, 0.5), 2), rng)
+    new_map.generate_map()
+    new_map.assign_events()
+    return new_map
+
+def test_seeded_maps_ignore_the_random_module():
+    random.seed(1)
+    first = [node_data(generated_map(random.Random(5))) for _ in range(3)]
+    random.seed(2)
+    second = [node_data(generated_map(random.Random(5))) for _ in range(3)]
+    assert first == second
+
+def seeded_game(map_seed, seed=0):
+    defs.reset_player_state()
+    random.seed(seed)
+    with eventbus.using(eventbus.NullSink()):
+        return gamelogic.Game(map_prefetch_limit=3, decision_provider=decisions.HeuristicProvider(), max_maps=2, map_seed=map_seed)
+
+def test_seeded_games_play_the_same_maps():
+    first, second = seeded_game(11), seeded_game(11)
+    assert first.run_summary() == second.run_summary()
+    assert node_data(first.current_map) == node_data(second.current_map)
+
+def rank_odds_power_levels(table):
+    rng = random.Random(0)
+    edges = [edge + offset for edge in table.breakpoints if edge != float("inf") for offset in (-1e-9, 0, 1e-9)]
+    return [power_level for power_level in edges if power_level >= 0] + [rng.uniform(0, 100) for _ in range(1000)] + [1e6]
+
+def test_rank_odds_table_matches_calculation():
+    table = gamelogic.RankOddsTable(gamelogic.RANK_CONFIG)
+    for power_level in rank_odds_power_levels(table):
+        assert table.lookup(power_level) == gamelogic.calculate_rank_probabilities(power_level, gamelogic.RANK_CONFIG)
+
+def test_rank_odds_lookup_many_matches_lookup():
+    pytest.importorskip("numpy")
+    table = gamelogic.RankOddsTable(gamelogic.RANK_CONFIG)
+    power_levels = rank_odds_power_levels(table)
+    for power_level, row in zip(power_levels, table.lookup_many(power_levels)):
+        assert dict(zip(table.rank_list, row.tolist())) == table.lookup(power_level)
+
+def test_streamed_run_finishes_every_step_before_moving_onto_it():
+    defs.reset_player_state()
+    random.seed(0)
+    with eventbus.using(eventbus.NullSink()):
+        game = gamelogic.Game(decision_provider=decisions.HeuristicProvider(), map_seed=1, streaming=True, stream_height=8)
+    assert isinstance(game.current_map, mapgen.StreamingMap)
+    assert game.map_prefetcher is None
+    assert "" not in game.node_types
+    assert game.player_vehicle.alive and game.current_map.finished
+    assert game.node_types["boss"] == 2                                  # The tutorial boss and the one ending the stream
+
+def test_map_prefetcher_needs_a_slot():
+    with pytest.raises(ValueError):
+        gamelogic.MapPrefetcher(lambda: None, limit=0)
+
+def test_map_prefetcher_stop_joins_the_worker():
+    prefetcher = gamelogic.MapPrefetcher(lambda: generated_map(random.Random(0)), limit=2)
+    assert len(prefetcher.take(3)) == 3
+    prefetcher.stop()
+    assert not prefetcher.thread.is_alive()
+    assert prefetcher.maps.qsize() <= 2
+
+# Every node leads into a battle through its event's next event
+class ChainedBattleStore(eventdb.EventStore):
+    def create(self, node_type, rank_odds):
+        return mapgen.Event("Crossroads", next=mapgen.Battle("Ambush", rank_odds))
+
+def test_battles_reached_through_next_events_are_counted():
+    defs.reset_player_state()
+    random.seed(0)
+    with eventbus.using(eventbus.Recorder()) as recorder:
+        game = gamelogic.Game(map_prefetch_limit=3, event_store=ChainedBattleStore(), decision_provider=decisions.HeuristicProvider(), max_maps=1, map_seed=2)
+    counts = recorder.counts()
+    assert game.battles_fought == game.nodes_visited == counts["battle_start"]
+    assert game.battles_won == counts.get("enemy_destroyed", 0) + counts.get("enemy_out_of_fuel", 0)
+    assert game.battle_finished not in defs.fight_listeners
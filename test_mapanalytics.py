@@ -0,0 +1,59 @@
+# Tests of the map analytics, the dynamic programming passes have to agree with enumerating every path of small maps
+
+import random
+import mapgen
+import mapgraph
+import mapanalytics
+
+# Every walk from a start that follows connections until there are none, with its chance for a player picking uniformly at every step
+def walks(compact_map):
+    starts = compact_map.step(0)
+    pending = [([start], 1 / len(starts)) for start in starts]
+    while pending:
+        path, chance = pending.pop()
+        successors = compact_map.successors(path[-1])
+        if not successors:
+            yield path, chance
+        for successor in successors:
+            pending.append((path + [successor], chance / len(successors)))
+
+def brute_force(compact_map):
+    boss = compact_map.node_count - 1
+    all_walks = list(walks(compact_map))
+    paths = [path for path, _ in all_walks if path[-1] == boss]
+    per_path = dict.fromkeys(mapanalytics.COUNTED_EVENTS, 0.0)
+    random_walk = dict.fromkeys(mapanalytics.COUNTED_EVENTS, 0.0)
+    for path, chance in all_walks:
+        for node in path:
+            event_type = compact_map.event_type(node)
+            if event_type in per_path:
+                random_walk[event_type] += chance
+                if path[-1] == boss:
+                    per_path[event_type] += 1 / len(paths)
+    visited = {node for path, _ in all_walks for node in path}
+    reaches_boss = lambda node: node == boss or any(reaches_boss(successor) for successor in compact_map.successors(node))
+    return {
+        "paths": len(paths),
+        "min_length": min(map(len, paths)),
+        "max_length": max(map(len, paths)),
+        "expected_per_path": per_path,
+        "expected_random_walk": random_walk,
+        "unreachable": compact_map.node_count - len(visited),
+        "dead_ends": sum(1 for node in range(compact_map.node_count) if not reaches_boss(node)),
+    }
+
+def test_analyze_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(200):
+        game_map = mapgen.Map(rng.randint(1, 5), rng.randint(2, 8), round(rng.uniform(0.2, 0.8), 2), rng)
+        game_map.generate_map()
+        game_map.assign_events()
+        compact = mapgraph.CompactMap.from_map(game_map)
+        result, expected = mapanalytics.analyze(compact), brute_force(compact)
+        for key in ("paths", "min_length", "max_length", "unreachable", "dead_ends"):
+            assert result[key] == expected[key], key
+        for key in ("expected_per_path", "expected_random_walk"):
+            for event_type in mapanalytics.COUNTED_EVENTS:
+                assert abs(result[key][event_type] - expected[key][event_type]) < 1e-9, (key, event_type)
+        assert result["nodes"] == compact.node_count
+        assert result["connections"] == len(compact.out_targets)
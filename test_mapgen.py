@@ -0,0 +1,47 @@
+# Tests of StreamingMap, steps are generated on request inside a bounded window and follow the same rules as a whole Map
+
+import random
+import pytest
+import mapgen
+
+def streamed_steps(stream):
+    return [[(node.x, [(other.x, other.y) for other in node.connections_to]) for node in step] for step in stream]
+
+def test_window_stays_bounded_and_evicts_old_steps():
+    stream = mapgen.StreamingMap(6, None, 0.3, window_size=4, rng=random.Random(0))
+    for y in range(40):
+        step = stream.step(y)
+        assert all(node.y == y for node in step)
+        assert len(stream.map) <= 4
+    assert (stream.offset, stream.generated_height) == (36, 40)
+    assert all(not node.connections_from for node in stream.map[0])    # Links back into the evicted step are dropped
+    with pytest.raises(IndexError):
+        stream.step(35)
+
+def test_no_paths_cross_across_window_borders():
+    for seed in range(20):
+        stream = mapgen.StreamingMap(7, 60, 0.4, window_size=3, rng=random.Random(seed))
+        for step in streamed_steps(stream)[:-1]:
+            edges = {(x, target_x) for x, targets in step for target_x, _ in targets}
+            assert not any((x, x + 1) in edges and (x + 1, x) in edges for x, _ in step)
+
+def test_boss_connects_at_the_end_of_a_finite_stream():
+    for seed in range(20):
+        stream = mapgen.StreamingMap(5, 12, 0.3, window_size=4, rng=random.Random(seed))
+        steps = list(stream)
+        assert stream.finished and stream.generated_height == 13
+        boss = steps[-1][0]
+        assert (boss.type, boss.y, boss.connections_to) == ("boss", 12, [])
+        assert steps[-2] and all(node.connections_to == [boss] for node in steps[-2])
+        assert all(node.type for step in steps for node in step)
+        with pytest.raises(IndexError):
+            stream.step(13)
+
+def test_visualize_map_delegates_to_the_renderer(capsys):
+    import maprender
+    game_map = mapgen.Map(4, 6, 0.4, random.Random(2))
+    game_map.generate_map()
+    game_map.assign_events()
+    for renderer in (maprender.AsciiRenderer(), maprender.SvgRenderer()):
+        game_map.visualize_map(renderer)
+        assert capsys.readouterr().out == renderer.render(game_map) + "\n"
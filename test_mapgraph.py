@@ -0,0 +1,38 @@
+# Tests of the compact map arrays, converting a map to arrays and back keeps every node, flag and connection
+
+import random
+import mapgen
+import mapgraph
+
+def generated_maps(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        game_map = mapgen.Map(rng.randint(1, 8), rng.randint(2, 18), round(rng.uniform(0.2, 0.8), 2), rng)
+        game_map.generate_map()
+        game_map.assign_events()
+        yield game_map
+
+def position(node):
+    return (node.x, node.y)
+
+def node_data(game_map):
+    return [[(node.x, node.y, node.type, node.active, node.connect_left, node.connect_right,
+              [position(other) for other in node.connections_to], [position(other) for other in node.connections_from]) for node in step] for step in game_map.map]
+
+def test_round_trip():
+    for game_map in generated_maps(200):
+        compact = mapgraph.CompactMap.from_map(game_map)
+        rebuilt = compact.to_map()
+        assert (rebuilt.map_width, rebuilt.map_height, rebuilt.density_min) == (game_map.map_width, game_map.map_height, game_map.density_min)
+        assert node_data(rebuilt) == node_data(game_map)
+
+def test_adjacency_matches_nodes():
+    for game_map in generated_maps(50, seed=1):
+        compact = mapgraph.CompactMap.from_map(game_map)
+        nodes = [node for step in game_map.map for node in step]
+        assert compact.node_count == len(nodes)
+        assert compact.step_count == len(game_map.map)
+        for index, node in enumerate(nodes):
+            assert [nodes[target] for target in compact.successors(index)] == node.connections_to
+            assert [nodes[source] for source in compact.predecessors(index)] == node.connections_from
+            assert compact.event_type(index) == node.type
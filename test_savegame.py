@@ -0,0 +1,49 @@
+# Tests of the binary save format, a saved run has to load back into the same inventory, vehicle and map
+
+import random
+import types
+import defs
+import mapgen
+import savegame
+
+def saved_game(tmp_path, seed=3):
+    defs.reset_player_state()
+    random.seed(seed)
+    game_map = mapgen.Map(5, 12, 0.3)
+    game_map.generate_map()
+    game_map.assign_events()
+    game = types.SimpleNamespace(current_map=game_map, current_node=game_map.map[2][0])
+    path = tmp_path / "run.sav"
+    savegame.save_game(path, game)
+    return path, game
+
+def node_data(game_map):
+    return [(node.x, node.y, node.type, node.active, [(other.x, other.y) for other in node.connections_to]) for step in game_map.map for node in step]
+
+def test_map_round_trip(tmp_path):
+    path, game = saved_game(tmp_path)
+    assert len(defs.player_vehicle.actions) % 4                 # Action records are 29 bytes, so the map arrays start unaligned
+    snapshot = savegame.load_game(path)
+    try:
+        assert node_data(snapshot.compact_map.to_map()) == node_data(game.current_map)
+        assert (snapshot.current_node.x, snapshot.current_node.y) == (game.current_node.x, game.current_node.y)
+    finally:
+        snapshot.close()
+
+def test_vehicle_round_trip(tmp_path):
+    path, _ = saved_game(tmp_path)
+    snapshot = savegame.load_game(path)
+    try:
+        assert [part.name for part in snapshot.vehicle.parts] == [part.name for part in defs.player_vehicle.parts]
+        assert [action.name for action in snapshot.vehicle.actions] == [action.name for action in defs.player_vehicle.actions]
+        assert dict(snapshot.vehicle.stats) == {stat: int(value) for stat, value in defs.player_vehicle.stats.items()}
+    finally:
+        snapshot.close()
+
+def test_close_keeps_held_map(tmp_path):
+    path, game = saved_game(tmp_path)
+    snapshot = savegame.load_game(path)
+    compact_map = snapshot.compact_map
+    snapshot.close()
+    assert node_data(compact_map.to_map()) == node_data(game.current_map)
+    assert node_data(snapshot.map) == node_data(game.current_map)
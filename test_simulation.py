@@ -0,0 +1,48 @@
+# Tests of the headless battle simulator, both engines have to agree on the same builds
+
+import pytest
+import objs
+import simulation
+
+def starter_builds():
+    player = objs.Vehicle("Lada", "Player", [objs.lada, objs.bicycle, objs.mopedeng, objs.spikes, objs.smg, objs.harpoon])
+    enemy = objs.Vehicle("Tractor", "Enemy", [objs.tractor, objs.tractorwh, objs.steameng, objs.tractorshovel, objs.flamethrower])
+    return player, enemy
+
+def unarmed_build():
+    return objs.Vehicle("Tractor", "Enemy", [objs.tractor, objs.tractorwh, objs.steameng])
+
+def test_engines_agree_on_win_rates():
+    pytest.importorskip("numpy")
+    player, enemy = starter_builds()
+    for first, second in ((player, enemy), (enemy, player)):
+        by_objects = simulation.simulate_battles(first, second, battles=2000, workers=1, seed=1)
+        vectorized = simulation.simulate_battles(first, second, battles=2000, seed=1, engine="vectorized")
+        assert abs(by_objects.win_rate - vectorized.win_rate) < 0.05      # Close to 4 standard deviations of the difference at these win rates
+        assert abs(by_objects.describe(by_objects.turns)["mean"] - vectorized.describe(vectorized.turns)["mean"]) < 0.5
+
+def test_engines_agree_on_deterministic_battles():
+    pytest.importorskip("numpy")
+    player, _ = starter_builds()
+    for first, second, turns in ((player, unarmed_build(), None), (unarmed_build(), unarmed_build(), {100: 200})):
+        for engine in ("object", "vectorized"):
+            stats = simulation.simulate_battles(first, second, battles=200, workers=1, seed=2, engine=engine)
+            assert stats.win_rate == 1.0                                      # Unarmed enemies never hurt, and even integrity breaks stalemates for the player
+            assert dict(stats.damage_to_player) == {0: 200}
+            assert turns is None or dict(stats.turns) == turns
+
+def test_seed_reproduces_results_across_workers_and_chunk_sizes():
+    player, enemy = starter_builds()
+    runs = [simulation.simulate_battles(player, enemy, battles=300, workers=workers, chunk_size=chunk_size, seed=7) for workers, chunk_size in ((1, 300), (1, 7), (2, 50), (3, 64))]
+    assert all(vars(stats) == vars(runs[0]) for stats in runs)
+
+def test_outcome_counts_add_up_to_battles():
+    pytest.importorskip("numpy")
+    player, enemy = starter_builds()
+    for first, second in ((player, enemy), (unarmed_build(), unarmed_build())):
+        for engine in ("object", "vectorized"):
+            stats = simulation.simulate_battles(first, second, battles=250, workers=1, chunk_size=60, seed=3, engine=engine)
+            assert stats.player_wins + stats.losses == stats.battles == 250
+            assert stats.stalemates == stats.turns[100] <= stats.battles
+            assert sum(stats.turns.values()) == sum(stats.damage_to_enemy.values()) == stats.battles
+    assert stats.stalemates == 250